@@ -2,10 +2,917 @@ import tkinter as tk
 from tkinter import ttk
 import serial
 from tkinter import messagebox
+from tkinter import filedialog
 import threading
 import queue
 import serial.tools.list_ports
 import configparser
+import itertools
+import re
+import time
+import capture
+import decoders
+import discovery
+import replay
+import search
+import sequencer
+import stats
+import telemetry
+import upload
+from formatting import SEND_FORMATS, VIEWS, encode_payload, format_frames
+from serial_core import (
+    COMMANDS,
+    FLOW_CONTROL,
+    LISTENING_PROMPT,
+    LISTENING_REPLY,
+    LogBuffer,
+    SessionManager,
+    Settings,
+    is_listening_prompt,
+)
+
+class LogMonitor:
+    # Keeps a tk.Text showing only the newest view_lines lines of a LogBuffer.
+    # Items are raw frames (bytes) rendered in the current view, or notes (str).
+    # tags, where given, hold the highlight rule index of each item.
+    def __init__(self, text_widget, view_lines=2000, view="Text", prefix="", rules=None):
+        self.text = text_widget
+        self.view_lines = view_lines
+        self.view = view
+        self.prefix = prefix
+        self.trim_slack = max(1, view_lines // 4)  # Trim in bulk, not per insert
+        self.line_count = 0
+        self.rule_names = rules.names if rules is not None else []
+        if rules is not None:
+            for name, color in rules.colors.items():
+                self.text.tag_configure(name, foreground=color)
+        self.text.tag_configure("current", background="yellow")
+
+    def render(self, items, tags=None):
+        # Arguments for one Text.insert call, and the number of lines
+        if tags is None or not any(tag is not None for tag in tags):
+            lines = format_frames(items, self.view, self.prefix)
+            return ["".join(line + "\n" for line in lines)], len(lines)
+        args = []
+        count = 0
+        # One insert argument per run of equally tagged items
+        for tag, run in itertools.groupby(zip(items, tags), key=lambda pair: pair[1]):
+            lines = format_frames([item for item, _tag in run], self.view, self.prefix)
+            args += ["".join(line + "\n" for line in lines), (self.rule_names[tag],) if tag is not None else ()]
+            count += len(lines)
+        return args, count
+
+    def append(self, items, tags=None):
+        if not items:
+            return
+        args, count = self.render(items, tags)
+        at_bottom = self.text.yview()[1] >= 1.0
+        self.text.insert(tk.END, *args)
+        self.line_count += count
+        if self.line_count > self.view_lines + self.trim_slack:
+            excess = self.line_count - self.view_lines
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.line_count -= excess
+        if at_bottom:
+            self.text.see(tk.END)
+
+    def load(self, log_buffer, index=None):
+        self.clear()
+        if index is None:
+            self.append(log_buffer.tail(self.view_lines))
+            return
+        rows = index.frames(log_buffer.next_seq - self.view_lines, log_buffer.next_seq)
+        self.append([frame for _seq, frame, _tag in rows], [tag for _seq, _frame, tag in rows])
+
+    def show_items(self, items, tags, mark):
+        # Replace the contents with items and scroll to items[mark]
+        self.clear()
+        args, before = self.render(items[:mark], tags[:mark])
+        if before:
+            self.text.insert(tk.END, *args)
+        args, after = self.render(items[mark:], tags[mark:])
+        if after:
+            self.text.insert(tk.END, *args)
+        self.line_count = before + after
+        marked = len(format_frames(items[mark:mark + 1], self.view, self.prefix))
+        self.text.tag_add("current", f"{before + 1}.0", f"{before + 1 + marked}.0")
+        self.text.see(f"{before + 1}.0")
+
+    def set_view(self, view, log_buffer, index=None):
+        # The buffer keeps raw bytes, so any view can be rebuilt at any time
+        self.view = view
+        self.load(log_buffer, index)
+
+    def clear(self):
+        self.text.delete("1.0", tk.END)
+        self.line_count = 0
+
+class SearchBar:
+    # Find/filter controls for a LogMonitor backed by a LogBuffer and its
+    # search.LogIndex. "Only matching" shows the newest matches and keeps
+    # adding matching frames as they arrive; Previous/Next jump between
+    # matches over the whole buffer and hold the monitor still until Follow.
+    def __init__(self, parent, row, monitor, log_buffer, index):
+        self.monitor = monitor
+        self.log_buffer = log_buffer
+        self.index = index
+        self.query = None
+        self.matches = 0
+        self.cursor = None  # Sequence number of the match being shown
+        self.pending = None
+
+        self.frame = ttk.Frame(parent)
+        self.frame.grid(row=row, column=0, columnspan=4, padx=5, pady=5, sticky="ew")
+        ttk.Label(self.frame, text="Find:").pack(side=tk.LEFT)
+        self.query_var = tk.StringVar()
+        self.entry = ttk.Entry(self.frame, textvariable=self.query_var, width=30)
+        self.entry.pack(side=tk.LEFT, padx=5)
+        self.entry.bind("<KeyRelease>", self.schedule_search)
+        self.entry.bind("<Return>", lambda event: self.next_match())
+        self.filter_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.frame, text="Only matching", variable=self.filter_var, command=self.search).pack(side=tk.LEFT)
+        ttk.Button(self.frame, text="Previous", command=self.previous_match).pack(side=tk.LEFT)
+        ttk.Button(self.frame, text="Next", command=self.next_match).pack(side=tk.LEFT)
+        ttk.Button(self.frame, text="Follow", command=self.follow).pack(side=tk.LEFT)
+        self.status = tk.StringVar(value="words, re:REGEX or rule:NAME")
+        ttk.Label(self.frame, textvariable=self.status).pack(side=tk.LEFT, padx=5)
+
+    def schedule_search(self, event=None):
+        # Wait for a pause in typing rather than searching on every key
+        if event is not None and event.keysym == "Return":
+            return
+        if self.pending is not None:
+            self.frame.after_cancel(self.pending)
+        self.pending = self.frame.after(200, self.search)
+
+    def search(self):
+        self.pending = None
+        text = self.query_var.get().strip()
+        self.cursor = None
+        self.query = None
+        if text:
+            try:
+                self.query = search.Query(text, self.index.rules)
+            except (re.error, ValueError) as error:
+                self.status.set(f"Bad query: {error}")
+        if self.query is not None:
+            self.matches = self.index.count(self.query)
+            self.status.set(f"{self.matches} matches")
+        elif not text:
+            self.status.set("")
+        self.reload()
+
+    def reload(self):
+        if self.query is not None and self.filter_var.get():
+            seqs = self.index.search(self.query, limit=self.monitor.view_lines)
+            rows = self.rows(seqs)
+            self.monitor.clear()
+            self.monitor.append([frame for _seq, frame, _tag in rows], [tag for _seq, _frame, tag in rows])
+        else:
+            self.monitor.load(self.log_buffer, self.index)
+
+    def rows(self, seqs):
+        wanted = set(seqs)
+        if not seqs:
+            return []
+        return [row for row in self.index.frames(seqs[0], seqs[-1] + 1) if row[0] in wanted]
+
+    def accept(self, frames, tags):
+        # Called with every new batch: returns what the monitor should append
+        if self.query is None:
+            return ([], []) if self.cursor is not None else (frames, tags)
+        matching = [(frame, tag) for frame, tag in zip(frames, tags) if self.query.matches(frame, tag)]
+        self.matches += len(matching)
+        if self.cursor is not None:
+            return [], []  # Holding still on a match
+        if matching:
+            self.status.set(f"{self.matches} matches")
+        if not self.filter_var.get():
+            return frames, tags
+        return [frame for frame, _tag in matching], [tag for _frame, tag in matching]
+
+    def discard_before(self, seq):
+        # Called before the index drops the lines the LogBuffer trimmed, so
+        # the count stays that of the lines still held
+        if self.query is None or seq <= self.index.oldest:
+            return
+        gone = self.index.count_between(self.query, self.index.oldest, seq)
+        if gone:
+            self.matches -= gone
+            if self.cursor is None:
+                self.status.set(f"{self.matches} matches")
+
+    def next_match(self):
+        if self.query is None:
+            return
+        after = self.cursor if self.cursor is not None else self.index.oldest - 1
+        self.show_match(self.index.next_match(self.query, after))
+
+    def previous_match(self):
+        if self.query is None:
+            return
+        before = self.cursor if self.cursor is not None else self.log_buffer.next_seq
+        self.show_match(self.index.previous_match(self.query, before))
+
+    def show_match(self, seq):
+        if seq is None:
+            self.status.set(f"{self.matches} matches, no more in this direction")
+            return
+        self.cursor = seq
+        half = self.monitor.view_lines // 2
+        if self.filter_var.get():
+            seqs = [match for match in self.index.search(self.query) if abs(match - seq) <= half]
+            rows = self.rows(seqs)
+        else:
+            rows = self.index.frames(seq - half, seq + half)
+        mark = next(position for position, row in enumerate(rows) if row[0] == seq)
+        self.monitor.show_items([frame for _seq, frame, _tag in rows], [tag for _seq, _frame, tag in rows], mark)
+        self.status.set(f"{self.matches} matches, showing line {seq - self.index.oldest + 1}")
+
+    def follow(self):
+        self.cursor = None
+        self.reload()
+
+class SequenceWindow:
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Sequence Runner")
+        self.steps = None
+        self.labels = None
+        self.runner = None
+        self.session = None
+        self.closed = False
+
+        self.file_label = ttk.Label(self.window, text="No sequence loaded")
+        self.file_label.grid(row=0, column=0, columnspan=3, padx=5, pady=5)
+
+        self.load_button = ttk.Button(self.window, text="Load Sequence", command=self.load)
+        self.load_button.grid(row=1, column=0, padx=5, pady=5)
+
+        self.run_button = ttk.Button(self.window, text="Run", command=self.run)
+        self.run_button.grid(row=1, column=1, padx=5, pady=5)
+
+        self.stop_button = ttk.Button(self.window, text="Stop", command=self.stop)
+        self.stop_button.grid(row=1, column=2, padx=5, pady=5)
+
+        self.status = tk.StringVar(value="Idle")
+        self.status_label = ttk.Label(self.window, textvariable=self.status)
+        self.status_label.grid(row=2, column=0, columnspan=3, padx=5, pady=5)
+
+        self.event_text = tk.Text(self.window, height=12, width=60)
+        self.event_text.grid(row=3, column=0, columnspan=3, padx=5, pady=5)
+        self.event_view = LogMonitor(self.event_text, app.settings.view_lines)
+
+    def load(self):
+        path = filedialog.askopenfilename(parent=self.window, title="Load Sequence",
+                                          filetypes=[("Sequence files", "*.seq *.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.steps, self.labels = sequencer.load_sequence(path)
+        except (OSError, ValueError) as error:
+            tk.messagebox.showerror("Error", f"Could not load sequence: {error}", parent=self.window)
+            return
+        self.file_label.configure(text=path)
+        self.status.set(f"Loaded {len(self.steps)} steps")
+
+    def run(self):
+        if self.steps is None:
+            tk.messagebox.showerror("Error", "Load a sequence first.", parent=self.window)
+            return
+        if self.runner is not None and self.runner.result is None:
+            tk.messagebox.showinfo("Info", "A sequence is already running.", parent=self.window)
+            return
+        session = self.app.receive_session
+        if session is None or not session.running:
+            tk.messagebox.showerror("Error", "Open the port first.", parent=self.window)
+            return
+        self.event_view.clear()
+        self.session = session
+        self.runner = sequencer.SequenceRunner(self.steps, self.labels, self.send, self.on_event)
+        session.frame_listeners.append(self.runner.feed_frames)
+        self.status.set("Running")
+        self.runner.start()
+
+    def send(self, data):
+        # Runner thread: wait for room in the outgoing queue instead of failing
+        return self.session.send(data, on_done=self.app.on_transmit_done, timeout=None)
+
+    def on_event(self, kind, text):
+        # Runner thread; hand over to Tk through the root, which outlives
+        # this window (after() on a destroyed window raises)
+        self.app.root.after(0, self.show_event, kind, text)
+
+    def show_event(self, kind, text):
+        if self.closed:
+            return
+        self.event_view.append([f"[{kind}] {text}"])
+        if kind in ("pass", "fail"):
+            self.status.set(f"{'PASSED' if kind == 'pass' else 'FAILED'}: {text}")
+            self.status_label.configure(foreground="green" if kind == "pass" else "red")
+            self.detach()
+
+    def detach(self):
+        if self.session is not None and self.runner is not None:
+            if self.runner.feed_frames in self.session.frame_listeners:
+                self.session.frame_listeners.remove(self.runner.feed_frames)
+
+    def stop(self):
+        if self.runner is not None:
+            self.runner.stop()
+
+    def close(self):
+        self.closed = True
+        self.stop()
+        self.detach()
+        self.window.destroy()
+
+class UploadWindow:
+    # Bulk upload with block checksums and ACKs (see upload.py). The transfer
+    # runs on the uploader thread; progress reaches Tk at most refresh_rate
+    # times a second.
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Bulk Upload")
+        self.payload = None
+        self.uploader = None
+        self.session = None
+        self.progress_pending = False
+        self.closed = False
+
+        self.source_label = ttk.Label(self.window, text="No payload loaded")
+        self.source_label.grid(row=0, column=0, columnspan=4, padx=5, pady=5)
+
+        self.load_button = ttk.Button(self.window, text="Load File", command=self.load)
+        self.load_button.grid(row=1, column=0, padx=5, pady=5)
+
+        self.library_button = ttk.Button(self.window, text="IR Library", command=self.load_ir_library)
+        self.library_button.grid(row=1, column=1, padx=5, pady=5)
+
+        self.start_button = ttk.Button(self.window, text="Start / Resume", command=self.start)
+        self.start_button.grid(row=1, column=2, padx=5, pady=5)
+
+        self.stop_button = ttk.Button(self.window, text="Stop", command=self.stop)
+        self.stop_button.grid(row=1, column=3, padx=5, pady=5)
+
+        self.progress = ttk.Progressbar(self.window, length=400, mode="determinate")
+        self.progress.grid(row=2, column=0, columnspan=4, padx=5, pady=5)
+
+        self.status = tk.StringVar(value="Idle")
+        self.status_label = ttk.Label(self.window, textvariable=self.status)
+        self.status_label.grid(row=3, column=0, columnspan=4, padx=5, pady=5)
+
+    def load(self):
+        path = filedialog.askopenfilename(parent=self.window, title="Load Payload",
+                                          filetypes=[("Binary files", "*.bin *.hex *.img"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, "rb") as payload_file:
+                payload = payload_file.read()
+        except OSError as error:
+            tk.messagebox.showerror("Error", f"Could not load payload: {error}", parent=self.window)
+            return
+        self.set_payload(payload, path)
+
+    def load_ir_library(self):
+        # The library the "Set IR Library" command sends as one line of hex
+        command = dict(COMMANDS)["Set IR Library"]
+        self.set_payload(bytes.fromhex(command[len(b"3:irdev-"):].strip().decode("ascii")), "IR library")
+
+    def set_payload(self, payload, source):
+        if self.uploader is not None and self.uploader.result is None:
+            tk.messagebox.showinfo("Info", "An upload is in progress.", parent=self.window)
+            return
+        if not payload:
+            tk.messagebox.showerror("Error", "The payload is empty.", parent=self.window)
+            return
+        self.payload = payload
+        self.source_label.configure(text=f"{source} ({len(payload)} bytes)")
+        self.progress.configure(value=0)
+        self.status.set("Ready")
+        self.status_label.configure(foreground="")
+
+    def start(self):
+        if self.payload is None:
+            tk.messagebox.showerror("Error", "Load a payload first.", parent=self.window)
+            return
+        if self.uploader is not None and self.uploader.result is None:
+            tk.messagebox.showinfo("Info", "An upload is already running.", parent=self.window)
+            return
+        session = self.app.receive_session
+        if session is None or not session.running:
+            tk.messagebox.showerror("Error", "Open the port first.", parent=self.window)
+            return
+        self.detach()
+        self.session = session
+        # A new uploader each time; the device says how much it already has
+        self.uploader = upload.BulkUploader(self.payload, self.send, self.on_progress, session.connected.is_set,
+                                            **self.app.settings.upload_options())
+        self.progress.configure(maximum=self.uploader.total_blocks)
+        self.status_label.configure(foreground="")
+        session.frame_listeners.append(self.uploader.feed_frames)
+        self.uploader.start()
+
+    def send(self, data):
+        # Uploader thread: wait for room in the outgoing queue instead of failing
+        return self.session.send(data, timeout=None)
+
+    def on_progress(self, uploader):
+        # Uploader thread; only one update is waiting for Tk at a time
+        if self.progress_pending and uploader.result is None:
+            return
+        self.progress_pending = True
+        self.app.root.after(int(1000 / self.app.settings.refresh_rate), self.show_progress, uploader)
+
+    def show_progress(self, uploader):
+        self.progress_pending = False
+        if self.closed or uploader is not self.uploader:
+            return
+        self.progress.configure(value=uploader.acked)
+        if uploader.result is not None:
+            passed, message = uploader.result
+            self.status.set(f"{'DONE' if passed else 'FAILED'}: {message}")
+            self.status_label.configure(foreground="green" if passed else "red")
+            self.detach()
+            return
+        resumed = f", resumed at block {uploader.resumed_from}" if uploader.resumed_from else ""
+        self.status.set(f"{uploader.state}: block {uploader.acked}/{uploader.total_blocks}, "
+                        f"{uploader.throughput / 1000:.1f} kB/s, {uploader.retransmits} blocks resent{resumed}")
+
+    def detach(self):
+        if self.session is not None and self.uploader is not None:
+            if self.uploader.feed_frames in self.session.frame_listeners:
+                self.session.frame_listeners.remove(self.uploader.feed_frames)
+
+    def stop(self):
+        if self.uploader is not None:
+            self.uploader.stop()
+
+    def close(self):
+        self.closed = True
+        self.stop()
+        self.detach()
+        self.window.destroy()
+
+class MultiPortWindow:
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Multi-Port Monitor")
+        settings = app.settings
+        self.manager = SessionManager(
+            app.schedule_ui_drain,
+            splitter_factory=settings.create_frame_splitter,
+            queue_size=settings.port_queue_size,
+            read_timeout=settings.read_timeout,
+            chunk_size=settings.read_chunk_size,
+            port_options=settings.port_options(),
+            **settings.transmit_options(),
+            **settings.reconnect_options(),
+        )
+        self.views = {}  # port name -> (tab frame, LogBuffer, LogMonitor)
+
+        self.create_widgets()
+        self.refresh_ports()
+
+    def create_widgets(self):
+        self.port_listbox = tk.Listbox(self.window, selectmode=tk.MULTIPLE, height=8, width=30, exportselection=False)
+        self.port_listbox.grid(row=0, column=0, rowspan=4, padx=5, pady=5, sticky="ns")
+
+        self.refresh_button = ttk.Button(self.window, text="Refresh Ports", command=self.refresh_ports)
+        self.refresh_button.grid(row=0, column=1, padx=5, pady=5)
+
+        self.open_button = ttk.Button(self.window, text="Open Selected", command=self.open_selected)
+        self.open_button.grid(row=1, column=1, padx=5, pady=5)
+
+        self.close_button = ttk.Button(self.window, text="Close Selected", command=self.close_selected)
+        self.close_button.grid(row=2, column=1, padx=5, pady=5)
+
+        self.notebook = ttk.Notebook(self.window)
+        self.notebook.grid(row=4, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+        self.window.grid_rowconfigure(4, weight=1)
+        self.window.grid_columnconfigure(0, weight=1)
+
+    def refresh_ports(self):
+        # The list comes from the app's port watcher; keep the selection
+        selected = set(self.selected_ports())
+        self.port_listbox.delete(0, tk.END)
+        for index, port in enumerate(self.app.port_watcher.snapshot()):
+            self.port_listbox.insert(tk.END, port.device)
+            if port.device in selected:
+                self.port_listbox.selection_set(index)
+
+    def selected_ports(self):
+        return [self.port_listbox.get(index) for index in self.port_listbox.curselection()]
+
+    def open_selected(self):
+        try:
+            baud_rate = int(self.app.serial_config["baud_rate"].get())
+        except ValueError:
+            tk.messagebox.showerror("Error", "The baud rate must be a whole number.")
+            return
+        for port_name in self.selected_ports():
+            if port_name in self.views:
+                continue
+            try:
+                self.manager.open(port_name, baud_rate, self.app.port_resolver(port_name))
+            except (serial.SerialException, OSError, ValueError) as error:
+                tk.messagebox.showerror("Error", f"Could not open {port_name}: {error}")
+                continue
+            tab = ttk.Frame(self.notebook)
+            text = tk.Text(tab, height=10, width=60)
+            text.pack(fill=tk.BOTH, expand=True)
+            self.notebook.add(tab, text=port_name)
+            settings = self.app.settings
+            self.views[port_name] = (tab, LogBuffer(settings.log_max_lines, settings.log_max_bytes), LogMonitor(text, settings.view_lines))
+
+    def close_selected(self):
+        for port_name in self.selected_ports():
+            self.manager.close(port_name)
+            view = self.views.pop(port_name, None)
+            if view is not None:
+                view[0].destroy()
+
+    def show_frames(self, session, frames):
+        view = self.views.get(session.port_name)
+        if view is None:
+            return
+        view[1].extend(frames)
+        view[2].append(frames)
+
+    def close(self):
+        self.manager.close_all()
+        self.window.destroy()
+
+class StatsWindow:
+    # Shows the snapshots the app takes every stats_interval; it never samples
+    # itself, so the rates are not skewed by having the window open
+    LABELS = [
+        ("RX", "rx"),
+        ("TX", "tx"),
+        ("RX queue depth", "rx_queue_depth"),
+        ("TX queue depth", "tx_queue_depth"),
+        ("UI drain lag", "drain_lag"),
+        ("Dropped batches", "dropped_batches"),
+        ("Read / write errors", "io_errors"),
+        ("Framing / parity errors", "line_errors"),
+        ("Overruns (UART / buffer)", "overruns"),
+        ("Reconnects", "reconnects"),
+    ]
+
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Link Statistics")
+
+        self.values = {}
+        for row, (text, key) in enumerate(self.LABELS):
+            ttk.Label(self.window, text=f"{text}:").grid(row=row, column=0, padx=5, pady=2, sticky="w")
+            self.values[key] = tk.StringVar(value="-")
+            ttk.Label(self.window, textvariable=self.values[key]).grid(row=row, column=1, padx=5, pady=2, sticky="w")
+
+        self.export_button = ttk.Button(self.window, command=self.toggle_export)
+        self.export_button.grid(row=len(self.LABELS), column=0, columnspan=2, padx=5, pady=5)
+        self.update_export_button()
+
+    def show(self, row):
+        def count(value):
+            return "n/a" if value is None else str(value)
+
+        self.values["rx"].set(f"{stats.format_rate(row['rx_bytes_per_s'])}B/s, {row['rx_frames_per_s']:.1f} frames/s")
+        self.values["tx"].set(f"{stats.format_rate(row['tx_bytes_per_s'])}B/s, {row['tx_frames_per_s']:.1f} frames/s")
+        self.values["rx_queue_depth"].set(str(row["rx_queue_depth"]))
+        self.values["tx_queue_depth"].set(str(row["tx_queue_depth"]))
+        self.values["drain_lag"].set(f"{row['drain_lag_ms']:.1f} ms (max {row['max_drain_lag_ms']:.1f} ms)")
+        self.values["dropped_batches"].set(str(row["dropped_batches"]))
+        self.values["io_errors"].set(f"{row['read_errors']} / {row['write_errors']}")
+        self.values["line_errors"].set(f"{count(row['framing_errors'])} / {count(row['parity_errors'])}")
+        self.values["overruns"].set(f"{count(row['overruns'])} / {count(row['buffer_overruns'])}")
+        self.values["reconnects"].set(str(row["reconnects"]))
+
+    def toggle_export(self):
+        if self.app.stats_exporter is not None:
+            self.app.stop_stats_export()
+        else:
+            path = filedialog.asksaveasfilename(parent=self.window, title="Export Statistics", defaultextension=".csv",
+                                                filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.json")])
+            if not path:
+                return
+            try:
+                self.app.start_stats_export(path)
+            except OSError as error:
+                tk.messagebox.showerror("Error", f"Could not open {path}: {error}", parent=self.window)
+        self.update_export_button()
+
+    def update_export_button(self):
+        exporter = self.app.stats_exporter
+        self.export_button.configure(text=f"Stop Export ({exporter.path})" if exporter else "Export to File")
+
+    def close(self):
+        self.window.destroy()
+
+class PlotWindow:
+    # Plots the numeric fields of received frames. Frames are parsed when the
+    # app drains them, and the canvas is redrawn at most plot_refresh_rate
+    # times a second and only after new samples, so the reader never waits on
+    # drawing and the drawing cost depends on the canvas width.
+    COLORS = ["blue", "red", "green", "orange", "purple", "brown", "magenta", "teal"]
+    MARGIN = 50
+
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        settings = app.settings
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Telemetry Plot")
+        try:
+            parser = telemetry.FieldParser(settings.plot_pattern)
+        except re.error as error:
+            tk.messagebox.showerror("Error", f"Invalid [Plot] pattern, plotting every number: {error}", parent=self.window)
+            parser = telemetry.FieldParser()
+        self.telemetry = telemetry.Telemetry(parser, settings.plot_capacity, settings.plot_max_channels)
+
+        self.canvas = tk.Canvas(self.window, width=800, height=300, background="white")
+        self.canvas.grid(row=0, column=0, columnspan=5, padx=5, pady=5, sticky="nsew")
+        self.window.grid_rowconfigure(0, weight=1)
+        self.window.grid_columnconfigure(4, weight=1)
+        self.high_label = self.canvas.create_text(5, 5, anchor="nw", text="")
+        self.low_label = self.canvas.create_text(5, 295, anchor="sw", text="")
+        self.lines = []  # One canvas line per channel, moved with coords()
+
+        ttk.Label(self.window, text="Samples Shown:").grid(row=1, column=0, padx=5, pady=5)
+        sizes = sorted({size for size in (1000, 10000, 100000, settings.plot_capacity) if size <= settings.plot_capacity})
+        self.shown_var = tk.StringVar(value=str(min(10000, settings.plot_capacity)))
+        shown_combobox = ttk.Combobox(self.window, textvariable=self.shown_var, values=sizes, width=10, state="readonly")
+        shown_combobox.grid(row=1, column=1, padx=5, pady=5)
+        shown_combobox.bind("<<ComboboxSelected>>", lambda event: self.mark_dirty())
+        self.paused = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.window, text="Pause", variable=self.paused).grid(row=1, column=2, padx=5, pady=5)
+        ttk.Button(self.window, text="Clear", command=self.clear).grid(row=1, column=3, padx=5, pady=5)
+        self.status = tk.StringVar(value="Waiting for numeric data")
+        ttk.Label(self.window, textvariable=self.status).grid(row=1, column=4, padx=5, pady=5, sticky="w")
+
+        self.dirty = False
+        self.interval = int(1000 / settings.plot_refresh_rate)
+        self.pending = self.window.after(self.interval, self.redraw)
+
+    def add(self, frames):
+        if not self.paused.get() and self.telemetry.add(frames):
+            self.dirty = True
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def clear(self):
+        self.telemetry.clear()
+        for line in self.lines:
+            self.canvas.delete(line)
+        self.lines = []
+        self.dirty = True
+
+    def redraw(self):
+        self.pending = self.window.after(self.interval, self.redraw)
+        if not self.dirty:
+            return
+        self.dirty = False
+        width = max(1, self.canvas.winfo_width() - self.MARGIN - 5)
+        height = max(1, self.canvas.winfo_height() - 20)
+        shown = int(self.shown_var.get())
+        decimated = [channel.decimate(shown, width) for channel in self.telemetry.channels]
+        values = [value for points in decimated for value in points[1::2]]
+        if not values:
+            self.status.set(f"Waiting for numeric data ({self.telemetry.skipped} lines without numbers)")
+            return
+        low = min(values)
+        high = max(values)
+        if high == low:
+            high = low + 1.0
+        scale = height / (high - low)
+        for index, points in enumerate(decimated):
+            if index == len(self.lines):
+                self.lines.append(self.canvas.create_line(0, 0, 0, 0, fill=self.COLORS[index % len(self.COLORS)]))
+            coords = []
+            for position in range(0, len(points), 2):
+                coords += (self.MARGIN + points[position], 10 + (high - points[position + 1]) * scale)
+            if len(coords) < 4:
+                coords = coords * 2 or [0, 0, 0, 0]
+            self.canvas.coords(self.lines[index], *coords)
+        self.canvas.itemconfigure(self.high_label, text=f"{high:g}")
+        self.canvas.coords(self.low_label, 5, self.canvas.winfo_height() - 5)
+        self.canvas.itemconfigure(self.low_label, text=f"{low:g}")
+        legend = ", ".join(f"ch{index + 1} {self.COLORS[index % len(self.COLORS)]}" for index in range(len(self.lines)))
+        self.status.set(f"{self.telemetry.samples} samples; {legend}")
+
+    def close(self):
+        self.window.after_cancel(self.pending)
+        self.window.destroy()
+
+class DecoderWindow:
+    # Decoded records from the receive port. The pipeline runs on a
+    # DecoderWorker thread fed by the port's reader; this window only shows
+    # the records it drains and the per-stage cost sampled every
+    # stats_interval. Records are shown here only; the monitors keep
+    # showing the frames as received.
+    COLUMNS = [("stage", "Stage", 120), ("items", "Items/s", 90), ("cost", "us/item", 90), ("cpu", "CPU %", 70)]
+
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Protocol Decoder")
+        self.worker = None
+        self.session = None
+        self.last_costs = None
+        self.last_sample = None
+
+        ttk.Label(self.window, text="Pipeline:").grid(row=0, column=0, padx=5, pady=5)
+        self.pipeline_var = tk.StringVar(value=app.settings.decode_pipeline)
+        pipeline_entry = ttk.Entry(self.window, textvariable=self.pipeline_var, width=40)
+        pipeline_entry.grid(row=0, column=1, padx=5, pady=5)
+        pipeline_entry.bind("<Return>", lambda event: self.apply())
+        ttk.Button(self.window, text="Apply", command=self.apply).grid(row=0, column=2, padx=5, pady=5)
+
+        self.record_text = tk.Text(self.window, height=15, width=80)
+        self.record_text.grid(row=1, column=0, columnspan=3, padx=5, pady=5)
+        self.record_view = LogMonitor(self.record_text, app.settings.view_lines)
+
+        self.cost_table = ttk.Treeview(self.window, columns=[key for key, _text, _width in self.COLUMNS],
+                                       show="headings", height=4)
+        for key, text, width in self.COLUMNS:
+            self.cost_table.heading(key, text=text)
+            self.cost_table.column(key, width=width, anchor="e" if key != "stage" else "w")
+        self.cost_table.grid(row=2, column=0, columnspan=3, padx=5, pady=5)
+
+        self.status = tk.StringVar(value="")
+        ttk.Label(self.window, textvariable=self.status).grid(row=3, column=0, columnspan=3, padx=5, pady=5)
+        self.apply()
+
+    def apply(self):
+        try:
+            pipeline = decoders.Pipeline.from_spec(self.pipeline_var.get())
+        except ValueError as error:
+            tk.messagebox.showerror("Error", f"Invalid decoder pipeline: {error}", parent=self.window)
+            return
+        self.stop_worker()
+        self.worker = decoders.DecoderWorker(pipeline, self.app.schedule_ui_drain, self.app.settings.port_queue_size,
+                                             self.app.settings.idle_gap).start()
+        self.last_costs = None
+        self.cost_table.delete(*self.cost_table.get_children())
+        for name, _seconds, _items_in, _items_out in pipeline.costs():
+            self.cost_table.insert("", tk.END, values=(name, "-", "-", "-"))
+        if self.app.receive_session is not None:
+            self.attach(self.app.receive_session)
+        self.status.set(f"Decoding with {pipeline.spec}; records are shown here, the monitors keep the raw frames"
+                        if pipeline.stages else "No stages; nothing is decoded")
+
+    def attach(self, session):
+        # Called again whenever the app opens a new receive session
+        self.detach()
+        self.session = session
+        session.frame_listeners.append(self.worker.feed_frames)
+
+    def detach(self):
+        if self.session is not None and self.worker is not None:
+            if self.worker.feed_frames in self.session.frame_listeners:
+                self.session.frame_listeners.remove(self.worker.feed_frames)
+        self.session = None
+
+    def stop_worker(self):
+        self.detach()
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+
+    def show_records(self, records):
+        # Records become one line each; frames no stage recognised keep the Text view
+        self.record_view.append([item if isinstance(item, bytes) else str(item) for item in records])
+
+    def show_costs(self):
+        if self.worker is None:
+            return
+        now = time.monotonic()
+        costs = self.worker.pipeline.costs()
+        if self.last_costs is not None and now > self.last_sample:
+            elapsed = now - self.last_sample
+            rows = zip(self.cost_table.get_children(), costs, self.last_costs)
+            for row, (name, seconds, items_in, _out), (_name, last_seconds, last_in, _last_out) in rows:
+                items = items_in - last_in
+                spent = seconds - last_seconds
+                cost = f"{spent / items * 1e6:.2f}" if items else "-"
+                self.cost_table.item(row, values=(name, f"{items / elapsed:.0f}", cost, f"{spent / elapsed * 100:.1f}"))
+        self.last_costs = costs
+        self.last_sample = now
+        if self.worker.dropped_batches:
+            self.status.set(f"Decoding with {self.worker.pipeline.spec}; "
+                            f"{self.worker.dropped_batches} batches dropped, decoders are behind")
+
+    def close(self):
+        self.stop_worker()
+        self.window.destroy()
+
+class ReplayWindow:
+    # Plays capture files back into the app. Replayed RX goes into a
+    # PortSession that is never opened, so it reaches the monitors, index and
+    # plot through the same drain as live data; TX goes to the send monitor.
+    # At "Max" the replay waits for the drain instead of dropping batches, so
+    # it runs as fast as the UI keeps up.
+    SPEEDS = ["1x", "2x", "10x", "100x", "Max"]
+
+    def __init__(self, parent, app):
+        self.parent = parent
+        self.app = app
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Replay Capture")
+        self.paths = []
+        self.replayer = None
+        self.session = app.settings.create_session("replay", app.schedule_ui_drain)
+
+        self.file_label = ttk.Label(self.window, text="No capture loaded")
+        self.file_label.grid(row=0, column=0, columnspan=4, padx=5, pady=5)
+
+        self.load_button = ttk.Button(self.window, text="Load Captures", command=self.load)
+        self.load_button.grid(row=1, column=0, padx=5, pady=5)
+
+        self.speed_var = tk.StringVar(value=self.SPEEDS[0])
+        ttk.Combobox(self.window, textvariable=self.speed_var, values=self.SPEEDS, width=6).grid(row=1, column=1, padx=5, pady=5)
+
+        self.include_tx = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.window, text="Include TX", variable=self.include_tx).grid(row=1, column=2, padx=5, pady=5)
+
+        self.start_button = ttk.Button(self.window, text="Start", command=self.start)
+        self.start_button.grid(row=2, column=0, padx=5, pady=5)
+
+        self.stop_button = ttk.Button(self.window, text="Stop", command=self.stop)
+        self.stop_button.grid(row=2, column=1, padx=5, pady=5)
+
+        self.status = tk.StringVar(value="Idle")
+        ttk.Label(self.window, textvariable=self.status).grid(row=3, column=0, columnspan=4, padx=5, pady=5)
+
+    def load(self):
+        paths = filedialog.askopenfilenames(parent=self.window, title="Load Captures",
+                                            initialdir=self.app.settings.capture_directory,
+                                            filetypes=[("Capture files", "*.sgcap"), ("All files", "*.*")])
+        if not paths:
+            return
+        # Rotated files are named by the time they were opened
+        self.paths = sorted(paths)
+        self.file_label.configure(text=f"{len(self.paths)} file(s), starting with {self.paths[0]}")
+        self.status.set("Ready")
+
+    def start(self):
+        if not self.paths:
+            tk.messagebox.showerror("Error", "Load a capture first.", parent=self.window)
+            return
+        if self.replayer is not None and self.replayer.result is None:
+            tk.messagebox.showinfo("Info", "A replay is already running.", parent=self.window)
+            return
+        text = self.speed_var.get().rstrip("x")
+        try:
+            speed = 0.0 if text == "Max" else float(text)
+        except ValueError:
+            tk.messagebox.showerror("Error", "Speed must be a number such as 10x, or Max.", parent=self.window)
+            return
+        directions = (capture.RX, capture.TX) if self.include_tx.get() else (capture.RX,)
+        self.replayer = replay.Replayer(self.paths, self.deliver, speed, directions).start()
+        self.show_status()
+
+    def deliver(self, direction, frames):
+        # Replay thread
+        if direction == capture.TX:
+            self.app.root.after(0, self.show_sent, frames)  # The window may be gone by then
+            return
+        if not self.replayer.speed:
+            while self.session.queue.full() and not self.replayer.stop_event.is_set():
+                time.sleep(0.001)
+        self.session.deliver(frames)
+
+    def show_sent(self, frames):
+        for frame in frames:
+            self.app.log_send_event(frame)
+
+    def show_status(self):
+        replayer = self.replayer
+        dropped = f", {self.session.dropped_batches} batches dropped" if self.session.dropped_batches else ""
+        if replayer.result is None:
+            self.status.set(f"Replaying: {replayer.summary()}{dropped}")
+            self.window.after(200, self.show_status)
+        else:
+            self.status.set(f"{replayer.result[1]}: {replayer.summary()}{dropped}")
+
+    def stop(self):
+        if self.replayer is not None:
+            self.replayer.stop()
+
+    def close(self):
+        self.stop()
+        self.window.destroy()
 
 class SerialConfigurationWindow:
     def __init__(self, parent):
@@ -17,6 +924,7 @@ class SerialConfigurationWindow:
         self.selected_data_bits = tk.StringVar(value="8")
         self.selected_stop_bits = tk.StringVar(value="1")
         self.selected_parity = tk.StringVar(value="None")
+        self.selected_flow_control = tk.StringVar(value="None")
 
         self.create_configuration_widgets()
         self.load_settings()  # Load saved settings
@@ -51,6 +959,12 @@ class SerialConfigurationWindow:
         self.parity_combobox = ttk.Combobox(self.config_window, textvariable=self.selected_parity, values=parity_options)
         self.parity_combobox.pack(padx=10, pady=5)
 
+        self.flow_control_label = ttk.Label(self.config_window, text="Flow Control:")
+        self.flow_control_label.pack(padx=10, pady=5)
+
+        self.flow_control_combobox = ttk.Combobox(self.config_window, textvariable=self.selected_flow_control, values=list(FLOW_CONTROL))
+        self.flow_control_combobox.pack(padx=10, pady=5)
+
         self.save_button = ttk.Button(self.config_window, text="Save", command=self.save_settings)
         self.save_button.pack(padx=10, pady=10)
 
@@ -59,12 +973,14 @@ class SerialConfigurationWindow:
         
     def save_settings(self):
         config = configparser.ConfigParser()
-        config["Serial"] = {
+        config.read("settings.ini")  # Keep the other sections and keys intact
+        config.read_dict({"Serial": {
             "baud_rate": self.selected_baud_rate.get(),
             "data_bits": self.selected_data_bits.get(),
             "stop_bits": self.selected_stop_bits.get(),
-            "parity": self.selected_parity.get()
-        }
+            "parity": self.selected_parity.get(),
+            "flow_control": self.selected_flow_control.get()
+        }})
         with open("settings.ini", "w") as config_file:
             config.write(config_file)
 
@@ -80,25 +996,64 @@ class SerialConfigurationWindow:
             self.selected_data_bits.set(serial_config.get("data_bits", "8"))
             self.selected_stop_bits.set(serial_config.get("stop_bits", "1"))
             self.selected_parity.set(serial_config.get("parity", "None"))
+            self.selected_flow_control.set(serial_config.get("flow_control", "None"))
 
     def set_default_settings(self):
         self.selected_baud_rate.set("19200")
         self.selected_data_bits.set("8")
         self.selected_stop_bits.set("1")
         self.selected_parity.set("None")
+        self.selected_flow_control.set("None")
 
 class SerialCommunicationApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Serial Communication App")
         self.serial_port = ""
-        self.after_id = None
+        self.receive_session = None
         self.configuration_window = None
         self.sending_data = True  # Set the flag to True while sending data
-        self.receive_thread_running = False
         self.root.protocol("WM_DELETE_WINDOW", self.confirm_exit)
-        self.data_queue = queue.Queue()  # Initialize data_queue here
         self.load_serial_settings()
+
+        # UI drain state: at most one drain is pending at any time
+        self.drain_lock = threading.Lock()
+        self.drain_pending = False
+        self.dirty_sessions = set()  # PortSessions with batches waiting for the UI
+        self.last_drain_time = 0.0
+        self.drain_interval = 1.0 / self.settings.refresh_rate
+        self.multi_port_window = None
+        self.sequence_window = None
+        self.upload_window = None
+        self.stats_window = None
+        self.plot_window = None
+        self.decoder_window = None
+        self.replay_window = None
+
+        self.stats_exporter = None
+        if self.settings.stats_export_file:
+            try:
+                self.start_stats_export(self.settings.stats_export_file)
+            except OSError as error:
+                tk.messagebox.showerror("Error", f"Could not open statistics export file: {error}")
+        self.root.after(int(self.settings.stats_interval * 1000), self.sample_stats)
+
+        # Monitors only show a window of these; the buffers own the history
+        self.receive_log = LogBuffer(self.settings.log_max_lines, self.settings.log_max_bytes)
+        self.send_log = LogBuffer(self.settings.log_max_lines, self.settings.log_max_bytes)
+        self.receive_view_backend = None
+        self.send_view = None
+        self.search_bar = None
+        self.capture_writer = None
+
+        # Received frames are indexed as they arrive so searches stay fast
+        try:
+            self.highlight_rules = search.HighlightRules(self.settings.highlight_rules)
+        except re.error as error:
+            tk.messagebox.showerror("Error", f"Invalid [Highlight] rule in settings: {error}")
+            self.highlight_rules = search.HighlightRules()
+        self.receive_index = search.LogIndex(self.highlight_rules)
+
         self.frontend_frame = ttk.LabelFrame(self.root, text="Frontend Window")
         self.frontend_frame.grid(row=0, column=0, sticky = "nsew")
         
@@ -111,14 +1066,19 @@ class SerialCommunicationApp:
 
         self.create_frontend_widgets()
         self.backend_frame = None
+
+        # Port list and hot-plug detection run off the Tk thread
+        self.port_watcher = discovery.PortWatcher(self.on_ports_changed, self.settings.scan_interval)
+        self.port_watcher.start()
         
 
     def create_frontend_widgets(self):
         self.port_label = ttk.Label(self.frontend_frame, text="Select COM Port:")
         self.port_label.grid(row=2, column=0, padx=5, pady=5)
 
-        self.available_ports = [port.device for port in serial.tools.list_ports.comports()]
-        self.selected_port = tk.StringVar(value=self.available_ports[0] if self.available_ports else "")
+        # Filled in by the port watcher once its first scan is done
+        self.available_ports = []
+        self.selected_port = tk.StringVar(value=self.settings.port)
         self.port_combobox = ttk.Combobox(self.frontend_frame, textvariable=self.selected_port, values=self.available_ports)
         self.port_combobox.grid(row=2, column=1, padx=5, pady=5)
 
@@ -135,6 +1095,7 @@ class SerialCommunicationApp:
         
         self.data_receive_monitor = tk.Text(self.frontend_frame, height=10, width=40)
         self.data_receive_monitor.grid(row=1, columnspan=2, padx=5, pady=5)
+        self.receive_view = LogMonitor(self.data_receive_monitor, self.settings.view_lines, rules=self.highlight_rules)
         
         self.password_label = ttk.Label(root, text="Password:")
         self.password_label.grid(row=3, column=0, padx=2, pady=2)
@@ -143,27 +1104,25 @@ class SerialCommunicationApp:
         self.password_entry.grid(row=4, column=0, padx=5, pady=5)
         
         self.backend_frame = None
-        self.receive_thread = None
 
     def open_command_panel(self):
         command_panel_window = tk.Toplevel(self.root)
         command_panel_window.title("Command Panel")
 
-        command_buttons = [
-            ("Product Info", b"3:PRD?\r\n"),
-            ("Firmware Version", b"3:FWV?\r\n"),
-            ("Set IR Library", b"3:irdev-B079010FE20FE20FE20F000100103600240ED80100000000100010001000320100000200051E0900001003C900860041090800100536008600410910001005360086004100240011DA2700C50000D711DA27004200005411DA270000392000A0000006600000C18000C5151E051501D4D80F051502D4D800081E003840004048D7081E013840104048E70B1003C8CC0A03C8CC0303C8CC0503C8CC071616045F004806043F003606083F04123704153F091E37040C0803CCD00F03CCD00000D4070104000216080605040111232302030217020A1A03B0B40303B0B40403B0B40006B0B406B8C03206B0B402B8C0C0170A1E05010300051E010100147F04090A081205036108064807801603F016010A078089C008890B06200100021B1C4149C13C007800B400F0002C016801A401E0011C0258029402D002010505036109063607801603F016010D078089C009890B061A0100021C1D414991C6038607460B060FC6128616461A061EC6210105060001A11E0001060001B1210084\r\n"),
-            ]
-        for label, data in command_buttons:
+        for label, data in COMMANDS:
             button = ttk.Button(command_panel_window, text=label, command=lambda d=data: self.send_command_data(d))
             button.pack(padx=10, pady=5)
+
+        sequence_button = ttk.Button(command_panel_window, text="Run Sequence", command=self.open_sequence_window)
+        sequence_button.pack(padx=10, pady=5)
+
+        upload_button = ttk.Button(command_panel_window, text="Bulk Upload", command=self.open_upload_window)
+        upload_button.pack(padx=10, pady=5)
     
     def send_command_data(self, data):
         if self.serial_port and self.serial_port.is_open:
-            self.serial_port.write(data)
-            self.data_send_monitor.insert(tk.END, f">> Sent: {data}\n")
-            self.data_send_monitor.see(tk.END)
-            self.sending_data = True
+            if self.queue_transmit(data):
+                self.sending_data = True
 
     def update_port_status(self):
         selected_port = self.selected_port.get()
@@ -176,112 +1135,182 @@ class SerialCommunicationApp:
             self.port_status.set(f"Port {selected_port} is Closed")
             self.port_status_label.configure(foreground="red")
 
-    def start_receive_thread(self):
-        if self.receive_thread_running:
-            return #to verify the thread is running
-
-        def receive_data():
-            self.receive_thread_running = True
-            while self.serial_port and self.serial_port.is_open:
-                    try:
-                        self.serial_port = self.serial_port
-                        if self.serial_port.baudrate == self.target_baud_rate:
-                            data = self.serial_port.readline().decode()
-                            if data:
-                                self.data_queue.put(data)
-                        else:
-                            tk.messagebox.showerror("Error", "Incorrect baud used. Please use 19200 for baud.")
-                            break
-                    except serial.SerialException:
-                        break                        
-            self.receive_thread_running = False
-
-        self.receive_thread = threading.Thread(target=receive_data)
-        self.receive_thread.daemon = True
-        self.receive_thread.start()
-        
-        self.root.after(1, self.update_received_data)
-
-    def stop_receive_thread(self):
-        if not self.receive_thread_running:
-            return  # Verify the thread is running
-
-        def stop_receive_data():
-            self.receive_thread_running = False
-            print(self.serial_port)
-            if self.serial_port and not self.serial_port.is_open:
-                self.serial_port.close()
-                print("Serial port closed.")
-
-        # Rename the thread object to avoid naming conflict
-        stop_thread = threading.Thread(target=stop_receive_data)
-        stop_thread.daemon = True
-        stop_thread.start()
-
-        self.root.after(1, self.update_received_data)
+    def schedule_ui_drain(self, session=None):
+        # Called from the I/O threads. Only the first item after a drain
+        # schedules a new one, and the delay caps the refresh rate.
+        with self.drain_lock:
+            if session is not None:
+                self.dirty_sessions.add(session)
+            if self.drain_pending:
+                return
+            self.drain_pending = True
+        delay = self.drain_interval - (time.monotonic() - self.last_drain_time)
+        self.root.after(max(0, int(delay * 1000)), self.update_received_data)
 
+    #data receive
     def update_received_data(self):
-        while not self.data_queue.empty():
-            received_data = self.data_queue.get()
-            self.data_receive_monitor.insert(tk.END, received_data + '\n')
-            self.data_receive_monitor_backend.insert(tk.END, received_data + '\n')
-            self.data_receive_monitor_backend.see(tk.END)   
-            if self.serial_port and self.serial_port.is_open:
-                    if received_data.strip() == ".":
-                        self.process_incoming_data(received_data)
+        with self.drain_lock:
+            self.drain_pending = False
+            dirty_sessions = self.dirty_sessions
+            self.dirty_sessions = set()
+        self.last_drain_time = time.monotonic()
+
+        # Only ports that produced data since the last drain are visited
+        for session in dirty_sessions:
+            frames = session.drain()
+            if isinstance(session, decoders.DecoderWorker):
+                # A worker replaced by Apply may still have had a drain pending
+                if frames and self.decoder_window is not None and session is self.decoder_window.worker:
+                    self.decoder_window.show_records(frames)
+                continue
+            if session is self.receive_session:
+                self.update_transmit_status()
+                self.update_session_status(session)
+            if not frames:
+                continue
+            if session is self.receive_session:
+                self.show_received_frames(frames)
+            elif self.replay_window is not None and session is self.replay_window.session:
+                self.show_received_frames(frames, live=False)
+            elif self.multi_port_window is not None:
+                self.multi_port_window.show_frames(session, frames)
+
+    def show_received_frames(self, frames, live=True):
+        tags = self.receive_index.add(frames, self.receive_log.next_seq)
+        self.receive_log.extend(frames)
+        if self.search_bar is not None:
+            self.search_bar.discard_before(self.receive_log.first_seq)
+        self.receive_index.discard_before(self.receive_log.first_seq)
+
+        # One insert per monitor per frame instead of one per line
+        self.receive_view.append(frames, tags)
+        if self.receive_view_backend is not None:
+            self.receive_view_backend.append(*self.search_bar.accept(frames, tags))
+        if self.plot_window is not None:
+            self.plot_window.add(frames)
+
+        # A replayed prompt must not send ESCs to whatever is connected now
+        if live and self.serial_port and self.serial_port.is_open:
+            if is_listening_prompt(frames):
+                self.process_incoming_data(LISTENING_PROMPT)
+
+    def update_session_status(self, session):
+        if session.reconnecting:
+            self.port_status.set(f"Port {session.device} lost, reconnecting: {session.error}")
+            self.port_status_label.configure(foreground="orange")
+        elif session.error is not None and not session.running:
+            self.port_status.set(f"Port {session.device} lost: {session.error}")
+            self.port_status_label.configure(foreground="red")
+        elif session.serial_port is not self.serial_port:
+            # Reopened, possibly under a new name after re-enumeration
+            self.serial_port = session.serial_port
+            self.selected_port.set(session.device)
+            self.update_port_status()
 
-        self.root.after(1, self.update_received_data)
+    def on_ports_changed(self, added, removed):
+        # Runs on the watcher thread
+        self.root.after(0, self.update_port_list)
+
+    def update_port_list(self):
+        self.available_ports = [port.device for port in self.port_watcher.snapshot()]
+        self.port_combobox.configure(values=self.available_ports)
+        if not self.selected_port.get() and self.available_ports:
+            self.selected_port.set(self.available_ports[0])
+        if self.multi_port_window is not None:
+            self.multi_port_window.refresh_ports()
+
+    def port_resolver(self, port_name):
+        # Finds the same physical device again, even under a new name
+        identity = self.port_watcher.identity_of(port_name)
+        return lambda: self.port_watcher.find(identity)
+
+    def sample_stats(self):
+        session = self.receive_session
+        if session is not None and session.serial_port is not None:
+            row = session.stats_snapshot()
+            if self.stats_exporter is not None:
+                self.stats_exporter.write(row)
+            if self.stats_window is not None:
+                self.stats_window.show(row)
+        if self.decoder_window is not None:
+            self.decoder_window.show_costs()
+        self.root.after(int(self.settings.stats_interval * 1000), self.sample_stats)
+
+    def start_stats_export(self, path):
+        self.stop_stats_export()
+        self.stats_exporter = stats.StatsExporter(path)
+
+    def stop_stats_export(self):
+        if self.stats_exporter is not None:
+            self.stats_exporter.close()
+            self.stats_exporter = None
+
+    def queue_transmit(self, data):
+        # The port's writer thread does the actual write, so a multi-KB payload
+        # at 19200 baud no longer holds up the UI
+        try:
+            self.receive_session.send(data, on_done=self.on_transmit_done)
+        except queue.Full:
+            tk.messagebox.showerror("Error", "Transmit queue is full. Wait for pending data to be sent.")
+            return False
+        self.update_transmit_status()
+        return True
+
+    def on_transmit_done(self, job):
+        # Runs on the writer thread; the monitors are only touched from Tk
+        self.root.after(0, self.log_sent_data, job)
+
+    def update_transmit_status(self):
+        if self.backend_frame is None or self.receive_session is None:
+            return
+        session = self.receive_session
+        self.transmit_status.set(f"TX queue: {session.tx_queue_depth} pending, {session.tx_bytes_pending} bytes in flight")
+
+    def log_sent_data(self, job):
+        if job.error is not None:
+            self.log_send_event(f">> Failed after {job.sent} of {len(job.data)} bytes: {job.error}")
+        else:
+            self.log_send_event(job.data)
 
-    def start_monitoring_data(self):
-        self.update_data_monitors()
-    
-    #data receive
-    def process_received_data(self):
-        while not self.data_queue.empty():
-            received_data = self.data_queue.get()
-            self.data_receive_monitor.insert(tk.END, received_data)
-            self.data_receive_monitor_backend.insert(tk.END, received_data)
-            self.data_receive_monitor_backend.see(tk.END)
-            self.root.update()  # Explicitly update the GUI
-        self.root.after(1, self.process_received_data)
-        
-    def update_data_monitors(self):
-        while not self.data_queue.empty():
-            received_data = self.data_queue.get()
-            self.data_receive_monitor.insert(tk.END, received_data)
-            self.data_receive_monitor_backend.insert(tk.END, received_data)
-            self.data_receive_monitor_backend.see(tk.END)
-
-        if not self.sending_data and self.serial_port and self.serial_port.is_open:
-            sent_data = self.send_data_entry.get()
-            if sent_data:
-                self.data_send_monitor.insert(tk.END, sent_data + '\n')
-                self.data_send_monitor_backend.insert(tk.END, sent_data + '\n')
-                self.data_send_monitor.see(tk.END)
-                self.data_send_monitor_backend.see(tk.END)
-                self.twoe_byte_detected = False
-
-        self.update_data_job = self.root.after(1, self.update_data_monitors)
+    def log_send_event(self, item):
+        self.send_log.extend([item])
+        if self.send_view is not None:
+            self.send_view.append([item])
+
+    def change_view(self, event=None):
+        view = self.display_view_var.get()
+        self.receive_view_backend.view = view
+        self.search_bar.follow()
+        self.send_view.set_view(view, self.send_log)
 
     def clear_log_frontend(self):
-        self.data_receive_monitor.delete('1.0', tk.END)
+        self.receive_view.clear()
 
     def open_port(self):
         port_name = self.selected_port.get()
+        if self.receive_session is not None and self.receive_session.reconnecting:
+            return  # Already being reopened in the background
         if not self.serial_port or not self.serial_port.is_open:
             baud_rate = int(self.serial_config["baud_rate"].get())  # Use the loaded value
-            self.serial_port = serial.Serial(port_name, baud_rate, timeout=0.5)
+            if baud_rate != self.target_baud_rate:
+                tk.messagebox.showerror("Error", "Incorrect baud used. Please use 19200 for baud.")
+                return
+            # A new session starts new statistics; only automatic reopens count as reconnects
+            self.receive_session = self.settings.create_session(port_name, self.schedule_ui_drain, baud_rate,
+                                                                resolve_port=self.port_resolver(port_name))
+            self.receive_session.capture_writer = self.capture_writer
+            self.receive_session.open()
+            if self.decoder_window is not None:
+                self.decoder_window.attach(self.receive_session)
+            self.serial_port = self.receive_session.serial_port
             self.update_port_status()
-            self.start_receive_thread()
             print(self.serial_port)
 
     def closed_port(self):
-        if self.serial_port and self.serial_port.is_open:
-            self.stop_receive_thread()
-            self.serial_port = self.serial_port
-            self.serial_port.close()
+        if (self.serial_port and self.serial_port.is_open) or (self.receive_session and self.receive_session.reconnecting):
+            self.receive_session.close()
             self.update_port_status()
-    
+
     def open_backend_window(self):
         entered_password = self.password_entry.get()
         
@@ -303,7 +1332,6 @@ class SerialCommunicationApp:
                             self.data_format_var = tk.StringVar(value="String")
                             self.data_format_label = ttk.Label(self.backend_frame, text="Data Format:")
                             self.data_format_label.grid(row=1, column=0, padx=5, pady=5)
-                            self.after_id = self.root.after(1, self.update_data_monitors)  # Store the after_id
 
                             config_button = ttk.Button(self.backend_frame, text="Configuration Window", command=app.open_configuration_window)
                             config_button.grid(row=2, column=1, pady=10)
@@ -311,8 +1339,22 @@ class SerialCommunicationApp:
                             command_panel_button = ttk.Button(self.backend_frame, text="Open Command Panel", command=self.open_command_panel)
                             command_panel_button.grid(row=2, column=2, pady=5)
 
-                            data_format_options = ["Hex", "Binary", "Octal", "String"]
-                            for idx, data_format in enumerate(data_format_options):
+                            multi_port_button = ttk.Button(self.backend_frame, text="Multi-Port Monitor", command=self.open_multi_port_window)
+                            multi_port_button.grid(row=2, column=3, pady=5)
+
+                            stats_button = ttk.Button(self.backend_frame, text="Link Statistics", command=self.open_stats_window)
+                            stats_button.grid(row=0, column=3, pady=5)
+
+                            plot_button = ttk.Button(self.backend_frame, text="Telemetry Plot", command=self.open_plot_window)
+                            plot_button.grid(row=1, column=5, pady=5)
+
+                            decoder_button = ttk.Button(self.backend_frame, text="Protocol Decoder", command=self.open_decoder_window)
+                            decoder_button.grid(row=0, column=5, pady=5)
+
+                            replay_button = ttk.Button(self.backend_frame, text="Replay Capture", command=self.open_replay_window)
+                            replay_button.grid(row=2, column=5, pady=5)
+
+                            for idx, data_format in enumerate(SEND_FORMATS):
                                 rb = ttk.Radiobutton(self.backend_frame, text=data_format, variable=self.data_format_var, value=data_format)
                                 rb.grid(row=1, column=idx + 1, padx=5, pady=5)
 
@@ -337,11 +1379,36 @@ class SerialCommunicationApp:
                             self.data_receive_monitor_backend = tk.Text(self.backend_frame, height=10, width=40)
                             self.data_receive_monitor_backend.grid(row=7, column=0, padx=5, pady=5, columnspan=3)
 
+                            # Show what was logged while the window was closed
+                            self.display_view_var = tk.StringVar(value="Text")
+                            self.send_view = LogMonitor(self.data_send_monitor, self.settings.view_lines, prefix=">> Sent: ")
+                            self.send_view.load(self.send_log)
+                            self.receive_view_backend = LogMonitor(self.data_receive_monitor_backend, self.settings.view_lines,
+                                                                   rules=self.highlight_rules)
+                            self.receive_view_backend.load(self.receive_log, self.receive_index)
+
                             self.clear_log_button_backend = ttk.Button(self.backend_frame, text="Clear Log", command=self.clear_log_backend)
                             self.clear_log_button_backend.grid(row=8, column=0, columnspan=3, padx=5, pady=5)
 
+                            self.capture_button = ttk.Button(self.backend_frame, command=self.toggle_capture)
+                            self.capture_button.grid(row=9, column=0, columnspan=3, padx=5, pady=5)
+                            self.update_capture_button()
+
+                            self.transmit_status = tk.StringVar(value="TX queue: idle")
+                            self.transmit_status_label = ttk.Label(self.backend_frame, textvariable=self.transmit_status)
+                            self.transmit_status_label.grid(row=10, column=0, columnspan=3, padx=5, pady=5)
+                            self.update_transmit_status()
+
+                            self.display_view_label = ttk.Label(self.backend_frame, text="Display View:")
+                            self.display_view_label.grid(row=11, column=0, padx=5, pady=5)
+                            self.display_view_combobox = ttk.Combobox(self.backend_frame, textvariable=self.display_view_var, values=VIEWS, state="readonly")
+                            self.display_view_combobox.grid(row=11, column=1, padx=5, pady=5)
+                            self.display_view_combobox.bind("<<ComboboxSelected>>", self.change_view)
+
+                            self.search_bar = SearchBar(self.backend_frame, 12, self.receive_view_backend, self.receive_log,
+                                                        self.receive_index)
+
                             self.backend_frame.protocol("WM_DELETE_WINDOW", self.close_backend_window)
-                            self.start_monitoring_data()
             else:
                 tk.messagebox.showerror("Error", "Invalid password, Please Insert Again")
             break
@@ -349,33 +1416,29 @@ class SerialCommunicationApp:
     def close_backend_window(self):
         self.backend_frame.destroy()  # Destroy the window
         self.backend_frame = None 
+        self.receive_view_backend = None
+        self.send_view = None
+        self.search_bar = None
 
     def clear_log_backend(self):
-        self.data_receive_monitor_backend.delete('1.0', tk.END)
-        self.data_send_monitor_backend.delete('1.0', tk.END)
+        self.receive_log.clear()
+        self.receive_index.clear()
+        self.send_log.clear()
+        self.receive_view_backend.clear()
+        self.send_view.clear()
+        self.search_bar.search()  # Nothing left to match
 
     def send_data(self):
         if self.serial_port and self.serial_port.is_open:
             data = self.send_data_entry.get()
             if data:
-                if self.add_crlf_var.get():
-                    data += "\r\n"
-                data_format = self.data_format_var.get()
-
-                # Convert data to the selected format
-                if data_format == "Hex":
-                    data = bytes.fromhex(data)
-                elif data_format == "Binary":
-                    data = int(data, 2).to_bytes((len(data) + 7) // 8, byteorder="big")
-                elif data_format == "Octal":
-                    data = int(data, 8).to_bytes((len(data) + 2) // 3, byteorder="big")
-                elif data_format == "String":
-                    data = data.encode()
-
-                self.serial_port.write(data)
-                self.data_send_monitor.insert(tk.END, f">> Sent: {data}\n")
-                self.data_send_monitor.see(tk.END)
-                self.sending_data = True  # Set the flag to True while sending data
+                try:
+                    data = encode_payload(data, self.data_format_var.get(), self.add_crlf_var.get())
+                except ValueError as error:
+                    tk.messagebox.showerror("Error", f"Invalid {self.data_format_var.get()} data: {error}")
+                    return
+                if self.queue_transmit(data):
+                    self.sending_data = True  # Set the flag to True while sending data
 
     def create_backend_widgets(self):
         # Data Sending Monitor
@@ -404,13 +1467,111 @@ class SerialCommunicationApp:
 #data send
     def process_incoming_data(self, incoming_data):
         # Add logic to process incoming_data and generate response_data
-            response_data = b'\x1B\x1B\x1B\x1B\x1B'
+            response_data = LISTENING_REPLY
             if self.serial_port and self.serial_port.is_open:
-                self.serial_port.write(response_data)
-                self.data_send_monitor.insert(tk.END, f">> Sent: {response_data}\n")
-                self.data_send_monitor.see(tk.END)
-                self.sending_data = True  # Set the data sending flag
-                tk.messagebox.showinfo("Success", "MCU in listening mode!")
+                if self.queue_transmit(response_data):
+                    self.sending_data = True  # Set the data sending flag
+                # Logged rather than a messagebox, which would stall the drain and any running sequence
+                self.log_send_event("-- MCU in listening mode!")
+
+    def open_sequence_window(self):
+        if self.sequence_window is None:
+            self.sequence_window = SequenceWindow(self.root, self)
+            self.sequence_window.window.protocol("WM_DELETE_WINDOW", self.close_sequence_window)
+        else:
+            tk.messagebox.showinfo("Info", "Sequence runner is already open.")
+
+    def close_sequence_window(self):
+        self.sequence_window.close()
+        self.sequence_window = None
+
+    def open_upload_window(self):
+        if self.upload_window is None:
+            self.upload_window = UploadWindow(self.root, self)
+            self.upload_window.window.protocol("WM_DELETE_WINDOW", self.close_upload_window)
+        else:
+            tk.messagebox.showinfo("Info", "Bulk upload is already open.")
+
+    def close_upload_window(self):
+        self.upload_window.close()
+        self.upload_window = None
+
+    def open_multi_port_window(self):
+        if self.multi_port_window is None:
+            self.multi_port_window = MultiPortWindow(self.root, self)
+            self.multi_port_window.window.protocol("WM_DELETE_WINDOW", self.close_multi_port_window)
+        else:
+            tk.messagebox.showinfo("Info", "Multi-port monitor is already open.")
+
+    def close_multi_port_window(self):
+        self.multi_port_window.close()
+        self.multi_port_window = None
+
+    def open_stats_window(self):
+        if self.stats_window is None:
+            self.stats_window = StatsWindow(self.root, self)
+            self.stats_window.window.protocol("WM_DELETE_WINDOW", self.close_stats_window)
+        else:
+            tk.messagebox.showinfo("Info", "Link statistics are already open.")
+
+    def close_stats_window(self):
+        self.stats_window.close()
+        self.stats_window = None
+
+    def open_plot_window(self):
+        if self.plot_window is None:
+            self.plot_window = PlotWindow(self.root, self)
+            self.plot_window.window.protocol("WM_DELETE_WINDOW", self.close_plot_window)
+        else:
+            tk.messagebox.showinfo("Info", "Telemetry plot is already open.")
+
+    def close_plot_window(self):
+        self.plot_window.close()
+        self.plot_window = None
+
+    def open_decoder_window(self):
+        if self.decoder_window is None:
+            self.decoder_window = DecoderWindow(self.root, self)
+            self.decoder_window.window.protocol("WM_DELETE_WINDOW", self.close_decoder_window)
+        else:
+            tk.messagebox.showinfo("Info", "Protocol decoder is already open.")
+
+    def close_decoder_window(self):
+        self.decoder_window.close()
+        self.decoder_window = None
+
+    def open_replay_window(self):
+        if self.replay_window is None:
+            self.replay_window = ReplayWindow(self.root, self)
+            self.replay_window.window.protocol("WM_DELETE_WINDOW", self.close_replay_window)
+        else:
+            tk.messagebox.showinfo("Info", "Replay is already open.")
+
+    def close_replay_window(self):
+        self.replay_window.close()
+        self.replay_window = None
+
+    def toggle_capture(self):
+        if self.capture_writer is None:
+            self.capture_writer = capture.CaptureWriter(
+                self.settings.capture_directory,
+                max_bytes=self.settings.capture_max_bytes,
+                max_seconds=self.settings.capture_max_seconds,
+            )
+        else:
+            capture_writer = self.capture_writer
+            self.capture_writer = None
+            capture_writer.close()
+        # The session records to whatever writer it holds
+        if self.receive_session is not None:
+            self.receive_session.capture_writer = self.capture_writer
+        self.update_capture_button()
+
+    def update_capture_button(self):
+        if self.capture_writer is None:
+            self.capture_button.configure(text="Start Capture")
+        else:
+            self.capture_button.configure(text="Stop Capture")
 
     def open_configuration_window(self):
         if self.configuration_window is None:
@@ -424,18 +1585,21 @@ class SerialCommunicationApp:
         self.configuration_window = None
 
     def load_serial_settings(self):
-        config = configparser.ConfigParser()
-        config.read("settings.ini")
+        self.settings = Settings("settings.ini")
         self.serial_config = {
-            "baud_rate": tk.StringVar(value=config.get("Serial", "baud_rate")),
-            "data_bits": tk.StringVar(value=config.get("Serial", "data_bits")),
-            "stop_bits": tk.StringVar(value=config.get("Serial", "stop_bits")),
-            "parity": tk.StringVar(value=config.get("Serial", "parity"))
+            "baud_rate": tk.StringVar(value=self.settings.baud_rate),
+            "data_bits": tk.StringVar(value=self.settings.data_bits),
+            "stop_bits": tk.StringVar(value=self.settings.stop_bits),
+            "parity": tk.StringVar(value=self.settings.parity)
         }
         
     def confirm_exit(self):
         result = tk.messagebox.askyesno("Confirm Exit", "Are you sure you want to exit?")
         if result:
+            if self.capture_writer is not None:
+                self.capture_writer.close()  # Flush the tail of the capture
+            self.stop_stats_export()
+            self.port_watcher.stop()
             self.root.destroy()
 
 if __name__ == "__main__":
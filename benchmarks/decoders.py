@@ -0,0 +1,76 @@
+# Per-stage cost of the protocol decoder pipelines.
+#
+#   python benchmarks/decoders.py --messages 100000
+#
+# Encodes the same synthetic 3:XXX replies for each framing, feeds the
+# stream to the pipeline in --chunk byte reads like the reader thread does
+# with [Receive] frame_mode = raw, and prints what each stage cost.
+import argparse
+import os
+import struct
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import decoders  # noqa: E402
+
+
+def slip(message):
+    return b"\xC0" + message.replace(b"\xDB", b"\xDB\xDD").replace(b"\xC0", b"\xDB\xDC") + b"\xC0"
+
+
+def cobs(message):
+    encoded = bytearray()
+    for block in message.split(b"\x00"):
+        while len(block) >= 254:
+            encoded += b"\xFF" + block[:254]
+            block = block[254:]
+        encoded += bytes([len(block) + 1]) + block
+    return bytes(encoded) + b"\x00"
+
+
+def modbus(seq):
+    body = b"\x01\x03\x08" + struct.pack(">4H", seq & 0xFFFF, 1, 2, 3)
+    crc = decoders.crc16(body)
+    return body + bytes([crc & 0xFF, crc >> 8])
+
+
+def make_messages(count):
+    kinds = [b"FWV:1.0.%d", b"PRD:SerialGUI-%d", b"IRDEV:OK:%d", b"sensor %d ready"]
+    return [kinds[seq % len(kinds)] % seq for seq in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--chunk", type=int, default=4096, help="bytes per read")
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    streams = {
+        "line | fields": b"".join(message + b"\r\n" for message in messages),
+        "slip | fields": b"".join(slip(message) for message in messages),
+        "cobs | fields": b"".join(cobs(message) for message in messages),
+        "length:2 | fields": b"".join(struct.pack(">H", len(message)) + message for message in messages),
+        "modbus-rtu": b"".join(modbus(seq) for seq in range(args.messages)),
+    }
+    print(f"{'pipeline':<20} {'stage':<12} {'in':>8} {'out':>8} {'total':>9} {'us/item':>8} {'MB/s':>7}")
+    for spec, stream in streams.items():
+        pipeline = decoders.Pipeline.from_spec(spec)
+        chunks = [stream[offset:offset + args.chunk] for offset in range(0, len(stream), args.chunk)]
+        start = time.perf_counter()
+        for chunk in chunks:
+            pipeline.process([chunk], time.monotonic())
+        elapsed = time.perf_counter() - start
+        for name, seconds, items_in, items_out in pipeline.costs():
+            print(f"{spec:<20} {name:<12} {items_in:>8} {items_out:>8} {seconds * 1000:7.1f}ms "
+                  f"{seconds / max(1, items_in) * 1e6:8.2f} {len(stream) / max(seconds, 1e-9) / 1e6:7.1f}")
+        print(f"{spec:<20} {'(pipeline)':<12} {'':>8} {'':>8} {elapsed * 1000:7.1f}ms {'':>8} "
+              f"{len(stream) / elapsed / 1e6:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# End-to-end benchmarks against the simulated MCU (simulator.py), for Linux
+# CI boxes without serial hardware.
+#
+#   python benchmarks/end_to_end.py
+#   python benchmarks/end_to_end.py --soak 600 --json results.json
+#   python benchmarks/end_to_end.py --baseline results.json --tolerance 0.25
+#
+# The port is opened through Settings.create_session like the GUI, and the
+# consumer mimics the GUI drain: it wakes when a reader reports data, is
+# capped at [Display] refresh_rate, decodes the frames and stores them in a
+# LogBuffer. Scenarios:
+#   rx    stream from the device as fast as the pty allows
+#   tx    command/response round trips (3:FWV?) and time until written
+#   soak  a steady stream for --soak seconds, sampling RSS once a second
+#   upload  a --upload-kb payload through the block/ACK protocol, with
+#           --block-error-rate of the blocks rejected by the device
+# With --baseline the run exits with status 1 if a metric is worse than the
+# baseline by more than --tolerance.
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import serial_core  # noqa: E402
+import simulator  # noqa: E402
+import upload  # noqa: E402
+from formatting import decode_text  # noqa: E402
+
+# Metric name -> True when higher is better
+CHECKED_METRICS = {
+    "rx_bytes_per_s": True,
+    "rx_drain_lag_p99_ms": False,
+    "tx_round_trip_p99_ms": False,
+    "soak_growth_mb_per_min": False,
+    "upload_bytes_per_s": True,
+}
+# Differences below these are noise, whatever the tolerance says
+ABSOLUTE_SLACK = {"rx_drain_lag_p99_ms": 5.0, "tx_round_trip_p99_ms": 2.0, "soak_growth_mb_per_min": 0.5}
+
+
+def rss_mb():
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class DrainConsumer:
+    # The GUI's drain loop without Tk
+    def __init__(self, settings):
+        self.settings = settings
+        self.log = serial_core.LogBuffer(settings.log_max_lines, settings.log_max_bytes)
+        self.ready = threading.Event()
+        self.lags = []
+        self.latencies = []
+        self.frames = 0
+        self.drains = 0
+
+    def on_data(self, session):
+        self.ready.set()
+
+    def drain(self, session):
+        frames = session.drain()
+        if not frames:
+            return
+        self.drains += 1
+        self.lags.append(session.link_stats.drain_lag)
+        now = time.perf_counter()
+        lines = decode_text(frames)
+        self.log.extend(lines)
+        self.frames += len(frames)
+        # Stream lines carry the device's send time in the second field
+        self.latencies.append(now - float(frames[-1].split(b",", 2)[1]))
+
+    def run(self, session, until):
+        interval = 1.0 / self.settings.refresh_rate
+        last = 0.0
+        while time.monotonic() < until and session.running:
+            if not self.ready.wait(timeout=0.1):
+                continue
+            delay = interval - (time.monotonic() - last)
+            if delay > 0:
+                time.sleep(delay)
+            self.ready.clear()
+            last = time.monotonic()
+            self.drain(session)
+        self.drain(session)
+
+
+def bench_rx(settings, seconds, line_length):
+    with simulator.SimulatedMCU() as device:
+        consumer = DrainConsumer(settings)
+        session = settings.create_session(device.port_name, consumer.on_data)
+        session.open()
+        try:
+            device.start_stream(0, line_length, duration=seconds)
+            start = time.monotonic()
+            consumer.run(session, start + seconds)
+            elapsed = time.monotonic() - start
+        finally:
+            device.stop_stream()
+            session.close()
+        return {
+            "rx_bytes_per_s": session.link_stats.rx_bytes / elapsed,
+            "rx_frames_per_s": session.link_stats.rx_frames / elapsed,
+            "rx_dropped_batches": session.dropped_batches,
+            "rx_drains_per_s": consumer.drains / elapsed,
+            "rx_drain_lag_p50_ms": percentile(consumer.lags, 0.5) * 1000,
+            "rx_drain_lag_p99_ms": percentile(consumer.lags, 0.99) * 1000,
+            "rx_latency_p50_ms": percentile(consumer.latencies, 0.5) * 1000,
+        }
+
+
+def bench_tx(settings, count):
+    with simulator.SimulatedMCU() as device:
+        replies = []
+        replied = threading.Event()
+
+        def on_frames(frames):
+            if any(frame.startswith(b"FWV:") for frame in frames):
+                replies.append(time.perf_counter())
+                replied.set()
+
+        session = settings.create_session(device.port_name, lambda session: None)
+        session.frame_listeners.append(on_frames)
+        session.open()
+        round_trips = []
+        write_times = []
+        try:
+            for _ in range(count):
+                replied.clear()
+                sent_at = time.time()
+                start = time.perf_counter()
+                job = session.send(b"3:FWV?\r\n")
+                if not replied.wait(timeout=2.0):
+                    continue
+                round_trips.append(replies[-1] - start)
+                session.wait_sent()
+                write_times.append(job.finished_at - sent_at)
+        finally:
+            session.close()
+        return {
+            "tx_round_trips": len(round_trips),
+            "tx_lost_replies": count - len(round_trips),
+            "tx_round_trip_p50_ms": percentile(round_trips, 0.5) * 1000,
+            "tx_round_trip_p99_ms": percentile(round_trips, 0.99) * 1000,
+            "tx_write_p50_ms": percentile(write_times, 0.5) * 1000,
+        }
+
+
+def bench_soak(settings, seconds, rate, line_length):
+    with simulator.SimulatedMCU() as device:
+        consumer = DrainConsumer(settings)
+        session = settings.create_session(device.port_name, consumer.on_data)
+        session.open()
+        samples = []
+        stop = threading.Event()
+
+        def sample():
+            start = time.monotonic()
+            while not stop.wait(1.0):
+                samples.append((time.monotonic() - start, rss_mb()))
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        try:
+            device.start_stream(rate, line_length, duration=seconds)
+            sampler.start()
+            consumer.run(session, time.monotonic() + seconds)
+        finally:
+            stop.set()
+            device.stop_stream()
+            session.close()
+        # The first quarter fills the LogBuffer; growth after that is a leak
+        steady = [point for point in samples if point[0] >= seconds / 4] or samples
+        growth = 0.0
+        if len(steady) >= 2:
+            growth = (steady[-1][1] - steady[0][1]) / max(1e-9, steady[-1][0] - steady[0][0]) * 60
+        return {
+            "soak_seconds": seconds,
+            "soak_rss_start_mb": samples[0][1] if samples else rss_mb(),
+            "soak_rss_end_mb": samples[-1][1] if samples else rss_mb(),
+            "soak_rss_peak_mb": max((point[1] for point in samples), default=rss_mb()),
+            "soak_growth_mb_per_min": growth,
+            "soak_dropped_batches": session.dropped_batches,
+            "soak_drain_lag_p99_ms": percentile(consumer.lags, 0.99) * 1000,
+        }
+
+
+def bench_upload(settings, size, block_error_rate):
+    payload = os.urandom(size)
+    with simulator.SimulatedMCU(block_error_rate=block_error_rate) as device:
+        session = settings.create_session(device.port_name, lambda session: session.drain())
+        send = functools.partial(session.send, timeout=None)
+        uploader = upload.BulkUploader(payload, send, link_up=session.connected.is_set, **settings.upload_options())
+        session.frame_listeners.append(uploader.feed_frames)
+        session.open()
+        try:
+            start = time.monotonic()
+            uploader.start()
+            uploader.thread.join()
+            elapsed = time.monotonic() - start
+        finally:
+            session.close()
+        verified = bool(device.uploaded) and device.uploaded[-1] == payload
+        return {
+            "upload_bytes_per_s": size / elapsed if verified else 0.0,
+            "upload_blocks_resent": uploader.retransmits,
+            "upload_naks": uploader.naks,
+            "upload_ok": float(verified),
+        }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, higher_is_better in CHECKED_METRICS.items():
+        if name not in results or name not in baseline:
+            continue
+        current, before = results[name], baseline[name]
+        slack = max(abs(before) * tolerance, ABSOLUTE_SLACK.get(name, 0.0))
+        worse = before - current if higher_is_better else current - before
+        if worse > slack:
+            regressions.append(f"{name}: {current:.2f} vs baseline {before:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--settings", default=os.path.join(ROOT, "settings.ini"))
+    parser.add_argument("--seconds", type=float, default=5, help="length of the rx scenario")
+    parser.add_argument("--round-trips", type=int, default=200, help="commands sent in the tx scenario")
+    parser.add_argument("--soak", type=float, default=30, help="length of the soak scenario in seconds")
+    parser.add_argument("--soak-rate", type=float, default=100000, help="soak stream rate in bytes/s")
+    parser.add_argument("--line-length", type=int, default=64)
+    parser.add_argument("--upload-kb", type=int, default=256, help="payload size of the upload scenario (0 skips it)")
+    parser.add_argument("--block-error-rate", type=float, default=0.01, help="upload blocks rejected by the device")
+    parser.add_argument("--json", metavar="FILE", help="write the results here")
+    parser.add_argument("--baseline", metavar="FILE", help="fail if results regress against this file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    settings = serial_core.Settings(args.settings)
+    results = {}
+    results.update(bench_rx(settings, args.seconds, args.line_length))
+    results.update(bench_tx(settings, args.round_trips))
+    if args.soak > 0:
+        results.update(bench_soak(settings, args.soak, args.soak_rate, args.line_length))
+    if args.upload_kb > 0:
+        results.update(bench_upload(settings, args.upload_kb * 1024, args.block_error_rate))
+
+    for name, value in results.items():
+        print(f"{name:<26} {value:12.2f}")
+
+    if args.json:
+        with open(args.json, "w") as result_file:
+            json.dump(results, result_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
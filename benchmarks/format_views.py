@@ -0,0 +1,79 @@
+# Cost of rendering received data in each monitor view.
+#
+#   python benchmarks/format_views.py --megabytes 1 --frame-size 64
+#
+# Formats the same random payload as many short frames (typical line traffic)
+# and as one large blob (a binary dump), and compares formatting.py against a
+# straightforward per-byte Python loop. Also round-trips encode_payload for
+# the Hex, Binary and Octal send formats.
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import formatting  # noqa: E402
+
+
+def naive_rows(data, view):
+    # What a per-byte loop looks like, for comparison
+    width = formatting.ROW_WIDTH.get(view, 16)
+    rows = []
+    for offset in range(0, len(data), width):
+        cells = []
+        for value in data[offset:offset + width]:
+            if view == "Binary":
+                cells.append(format(value, "08b"))
+            elif view == "Octal":
+                cells.append(format(value, "03o"))
+            elif view == "ASCII":
+                cells.append(chr(value) if 32 <= value < 127 else ".")
+            else:
+                cells.append(format(value, "02X"))
+        rows.append(f"{offset:04X}: " + ("" if view == "ASCII" else " ").join(cells))
+    return rows
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, default=1.0)
+    parser.add_argument("--frame-size", type=int, default=64)
+    args = parser.parse_args()
+
+    size = int(args.megabytes * 1024 * 1024)
+    data = os.urandom(size)
+    frames = [data[offset:offset + args.frame_size] for offset in range(0, size, args.frame_size)]
+    print(f"{size} bytes, {len(frames)} frames of {args.frame_size} bytes")
+    print(f"{'view':<9} {'frames':>10} {'blob':>10} {'naive blob':>11} {'speedup':>8}")
+
+    for view in formatting.VIEWS:
+        frame_seconds, _ = timed(formatting.format_frames, frames, view)
+        blob_seconds, _ = timed(formatting.format_frames, [data], view)
+        if view in formatting.CELL_FORMATTERS:
+            naive_seconds, _ = timed(naive_rows, data, view)
+            naive = f"{naive_seconds * 1000:9.1f}ms {naive_seconds / blob_seconds:7.1f}x"
+        else:
+            naive = f"{'-':>11} {'-':>8}"
+        print(f"{view:<9} {frame_seconds * 1000:8.1f}ms {blob_seconds * 1000:8.1f}ms {naive}")
+
+    for data_format, text in (
+        ("Hex", formatting.to_hex(data)),
+        ("Binary", formatting.to_binary(data)),
+        ("Octal", formatting.to_octal(data)),
+    ):
+        seconds, encoded = timed(formatting.encode_payload, text, data_format, False)
+        assert encoded == data, data_format
+        print(f"encode {data_format:<7} {seconds * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Per-port latency with many simulated ports.
+#
+#   python benchmarks/multiport_latency.py --ports 16 --rate 200 --seconds 5
+#
+# Each port is a pyserial loop:// device opened through SessionManager, so
+# every port has its own reader thread and bounded queue as in the GUI. A
+# writer thread per port sends timestamped lines at --rate lines/s. The
+# consumer mimics the GUI drain: it wakes only when a reader reports data,
+# is capped at --refresh-hz, and visits only the ports that have data.
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import serial_core  # noqa: E402
+
+
+def writer(session, rate, seconds, stop):
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    seq = 0
+    while not stop.is_set() and time.perf_counter() - start < seconds:
+        session.serial_port.write(f"{seq},{time.perf_counter():.6f},SENSOR=1234\n".encode())
+        seq += 1
+        delay = start + seq * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ports", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=200, help="lines per second per port")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--refresh-hz", type=float, default=30)
+    args = parser.parse_args()
+
+    lock = threading.Lock()
+    wake = threading.Event()
+    dirty = set()
+
+    def on_data(session):
+        with lock:
+            dirty.add(session)
+        wake.set()
+
+    manager = serial_core.SessionManager(on_data)
+    sessions = [manager.open(f"loop://#{index}", 115200) for index in range(args.ports)]
+    latencies = {session.port_name: [] for session in sessions}
+    frames_seen = {session.port_name: 0 for session in sessions}
+
+    stop = threading.Event()
+    writers = [threading.Thread(target=writer, args=(session, args.rate, args.seconds, stop), daemon=True)
+               for session in sessions]
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for thread in writers:
+        thread.start()
+
+    interval = 1.0 / args.refresh_hz
+    drains = 0
+    drain_time = 0.0
+    last_drain = 0.0
+    while any(thread.is_alive() for thread in writers) or wake.is_set():
+        if not wake.wait(timeout=0.1):
+            continue
+        delay = interval - (time.perf_counter() - last_drain)
+        if delay > 0:
+            time.sleep(delay)
+        wake.clear()
+        last_drain = time.perf_counter()
+        with lock:
+            pending = list(dirty)
+            dirty.clear()
+        for session in pending:
+            frames = session.drain()
+            if not frames:
+                continue
+            now = time.perf_counter()
+            frames_seen[session.port_name] += len(frames)
+            for frame in frames:
+                latencies[session.port_name].append(now - float(frame.split(b",", 2)[1]))
+        drains += 1
+        drain_time += time.perf_counter() - last_drain
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    print(f"{args.ports} ports x {args.rate:.0f} lines/s, UI drain capped at {args.refresh_hz:.0f} Hz")
+    for port_name, values in latencies.items():
+        values.sort()
+        print(f"  {port_name:<16} frames {frames_seen[port_name]:6d}  "
+              f"p50 {statistics.median(values) * 1000:6.2f} ms  p99 {values[int(len(values) * 0.99)] * 1000:6.2f} ms  "
+              f"dropped batches {manager.sessions[port_name].dropped_batches}")
+    print(f"drains {drains} ({drains / wall:.1f}/s), mean drain cost {drain_time / max(1, drains) * 1e6:.0f} us, "
+          f"process CPU {cpu / wall:.1%} of one core")
+    manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
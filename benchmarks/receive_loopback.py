@@ -0,0 +1,93 @@
+# Loopback throughput test for the chunked receive path.
+#
+#   python benchmarks/receive_loopback.py                      (pyserial loop://)
+#   python benchmarks/receive_loopback.py --port COM5          (TX jumpered to RX)
+#
+# Lines carrying a send timestamp are written at the wire rate of each baud
+# rate and read back through SerialReader/FrameSplitter, the same classes the
+# GUI receive thread uses.
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import serial
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import serial_core  # noqa: E402
+
+
+def writer(port, baud, seconds, line_length, stop):
+    bytes_per_second = baud / 10  # 8N1: ten bits on the wire per byte
+    padding = "x" * max(0, line_length - 28)
+    sent = 0
+    seq = 0
+    start = time.perf_counter()
+    while not stop.is_set() and time.perf_counter() - start < seconds:
+        block = []
+        for _ in range(32):
+            block.append(f"{seq:08d},{time.perf_counter():.6f},{padding}\n")
+            seq += 1
+        data = "".join(block).encode()
+        port.write(data)
+        sent += len(data)
+        # Pace to the wire rate so loop:// behaves like a real link
+        ahead = sent / bytes_per_second - (time.perf_counter() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+    return sent
+
+
+def run(url, baud, seconds, line_length):
+    port = serial.serial_for_url(url, baudrate=baud, timeout=0.02)
+    reader = serial_core.SerialReader(port, serial_core.FrameSplitter(delimiter=b"\n"))
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(port, baud, seconds, line_length, stop), daemon=True)
+
+    frames = 0
+    received = 0
+    batches = 0
+    latencies = []
+    start = time.perf_counter()
+    thread.start()
+    while thread.is_alive() or port.in_waiting:
+        batch = reader.read_frames()
+        if not batch:
+            continue
+        now = time.perf_counter()
+        batches += 1
+        frames += len(batch)
+        received += sum(len(frame) + 1 for frame in batch)
+        sent_at = batch[-1].split(b",", 2)[1]
+        latencies.append(now - float(sent_at))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    port.close()
+
+    wire_rate = baud / 10
+    latencies.sort()
+    print(f"{baud:>7} baud: {received / elapsed:10.0f} B/s ({received / elapsed / wire_rate:6.1%} of wire), "
+          f"{frames / elapsed:8.0f} frames/s, {frames / max(1, batches):5.1f} frames/batch, "
+          f"latency p50 {statistics.median(latencies) * 1000:6.2f} ms "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", default="loop://", help="port name or pyserial URL with TX looped to RX")
+    parser.add_argument("--bauds", type=int, nargs="+", default=[115200, 921600])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--line-length", type=int, default=64)
+    args = parser.parse_args()
+
+    for baud in args.bauds:
+        run(args.port, baud, args.seconds, args.line_length)
+
+
+if __name__ == "__main__":
+    main()
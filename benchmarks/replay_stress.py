@@ -0,0 +1,82 @@
+# Replay throughput into the GUI's receive path.
+#
+#   python benchmarks/replay_stress.py --lines 1000000 --speed 0
+#
+# Writes a synthetic capture of --lines received lines spread over --seconds
+# of recorded time, then replays it into a PortSession that is never opened,
+# the way the Replay window does, and drains it at [Display] refresh_rate
+# into a LogBuffer and search index like the GUI. At speed 0 the replay waits
+# for the drain instead of dropping batches, so the result is how much faster
+# than real time the receive path keeps up.
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import capture  # noqa: E402
+import replay  # noqa: E402
+import search  # noqa: E402
+import serial_core  # noqa: E402
+
+
+def write_capture(directory, lines, seconds, batch):
+    writer = capture.CaptureWriter(directory, queue_size=lines // batch + 1)
+    start = time.time()
+    for offset in range(0, lines, batch):
+        frames = [b"%08d,SENSOR=%d TEMP=%d" % (seq, seq % 4096, seq % 100) for seq in range(offset, min(lines, offset + batch))]
+        writer.write(capture.RX, frames, start + seconds * offset / lines)
+    writer.close()
+    return writer.files
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--settings", default=os.path.join(ROOT, "settings.ini"))
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--seconds", type=float, default=600, help="recorded time the lines are spread over")
+    parser.add_argument("--batch", type=int, default=16, help="lines per recorded reader batch")
+    parser.add_argument("--speed", type=float, default=0, help="multiple of real time; 0 as fast as possible")
+    args = parser.parse_args()
+
+    settings = serial_core.Settings(args.settings)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_capture(directory, args.lines, args.seconds, args.batch)
+        ready = threading.Event()
+        session = settings.create_session("replay", lambda session: ready.set())
+        log = serial_core.LogBuffer(settings.log_max_lines, settings.log_max_bytes)
+        index = search.LogIndex()
+
+        def deliver(direction, frames):
+            if not replayer.speed:
+                while session.queue.full() and not replayer.stop_event.is_set():
+                    time.sleep(0.001)
+            session.deliver(frames)
+
+        replayer = replay.Replayer(paths, deliver, args.speed)
+        interval = 1.0 / settings.refresh_rate
+        drains = 0
+        replayer.start()
+        while replayer.result is None or session.queue.qsize():
+            if not ready.wait(timeout=0.1):
+                continue
+            time.sleep(interval)  # The GUI drains at most refresh_rate times a second
+            ready.clear()
+            frames = session.drain()
+            index.add(frames, log.next_seq)
+            log.extend(frames)
+            index.discard_before(log.first_seq)
+            drains += 1
+
+    print(f"{replayer.result[1]}: {replayer.summary()}")
+    print(f"{log.next_seq} lines drained in {drains} drains, {session.dropped_batches} batches dropped, "
+          f"{log.next_seq / replayer.elapsed:,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Ingest and query cost of the received-log search index.
+#
+#   python benchmarks/search_index.py --lines 1000000
+#
+# Builds a LogBuffer and LogIndex from synthetic sensor lines with rare
+# errors and warnings, the way the GUI does on every drain, then times
+# counting, jump-to-next and newest-matches queries of each kind.
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import search  # noqa: E402
+import serial_core  # noqa: E402
+
+RULES = [("error", "red", r"(?i)\berr(or)?\b"), ("warning", "orange", r"(?i)\bwarn(ing)?\b")]
+QUERIES = ["overheat", "error", "rule:error", "sensor=4095 temp=5", "re:TEMP=99$", "not-present"]
+
+
+def make_lines(count, seed=1):
+    rng = random.Random(seed)
+    lines = []
+    for seq in range(count):
+        roll = rng.random()
+        suffix = b" ERROR overheat" if roll < 0.0005 else b" warning: fan" if roll < 0.002 else b""
+        lines.append(b"%08d,%.3f,SENSOR=%d TEMP=%d%s" % (seq, seq * 0.001, rng.randint(0, 4095), rng.randint(0, 99), suffix))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=256, help="frames per drain")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    log = serial_core.LogBuffer(args.lines, 1 << 40)
+    index = search.LogIndex(search.HighlightRules(RULES))
+    start = time.perf_counter()
+    for offset in range(0, len(lines), args.batch):
+        batch = lines[offset:offset + args.batch]
+        index.add(batch, log.next_seq)
+        log.extend(batch)
+        index.discard_before(log.first_seq)
+    elapsed = time.perf_counter() - start
+    print(f"ingest {len(lines)} lines: {elapsed:.2f} s ({len(lines) / elapsed:,.0f} lines/s)")
+
+    middle = args.lines // 2
+    print(f"{'query':<22} {'matches':>8} {'count':>9} {'next+prev':>10} {'newest 2000':>12}")
+    for text in QUERIES:
+        query = search.Query(text, index.rules)
+        start = time.perf_counter()
+        matches = index.count(query)
+        count_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index.next_match(query, middle)
+        index.previous_match(query, middle)
+        jump_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index.search(query, limit=2000)
+        tail_seconds = time.perf_counter() - start
+        print(f"{text:<22} {matches:>8} {count_seconds * 1000:7.1f}ms {jump_seconds * 1000:8.2f}ms "
+              f"{tail_seconds * 1000:10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Startup time and peak memory of the headless engine versus the Tk GUI.
+#
+#   python benchmarks/startup.py --runs 5
+#
+# Each measurement runs in a fresh interpreter. "headless" imports the CLI and
+# loads settings.ini the way serial_cli.py does before opening a port. "gui"
+# additionally builds the Tk root and SerialCommunicationApp and draws one
+# frame; it is skipped when no display is available.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+PROLOGUE = """
+import resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+"""
+
+EPILOGUE = """
+elapsed = time.perf_counter() - start
+print({{"seconds": elapsed, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}})
+"""
+
+SCENARIOS = {
+    "baseline": "",
+    "headless": """
+import serial_cli
+settings = serial_cli.Settings("settings.ini")
+""",
+    "gui": """
+import importlib.util
+import tkinter as tk
+spec = importlib.util.spec_from_file_location("serial_gui", "Serial GUI.py")
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+root = tk.Tk()
+app = module.SerialCommunicationApp(root)
+root.update()
+root.destroy()
+""",
+}
+
+
+def measure(name):
+    code = PROLOGUE.format(root=ROOT) + SCENARIOS[name] + EPILOGUE.format()
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1].replace("'", '"'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name in SCENARIOS:
+        runs = [measure(name) for _ in range(args.runs)]
+        if None in runs:
+            print(f"{name:<9} skipped (failed to start; no display?)")
+            continue
+        seconds = statistics.median(run["seconds"] for run in runs)
+        rss = statistics.median(run["max_rss_kb"] for run in runs)
+        print(f"{name:<9} in-process startup {seconds * 1000:7.1f} ms   peak RSS {rss / 1024:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
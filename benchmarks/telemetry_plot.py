@@ -0,0 +1,61 @@
+# Parse and redraw cost of the telemetry plot.
+#
+#   python benchmarks/telemetry_plot.py --rate 10000
+#
+# Feeds one second of three-channel sensor lines at --rate lines/s through
+# Telemetry the way the GUI does on every drain, then times min/max
+# decimation of a full buffer to an 800 pixel wide canvas for each capacity,
+# from the bucket summaries as the plot does and from the raw samples.
+import argparse
+import math
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import telemetry  # noqa: E402
+
+
+def make_lines(count):
+    return [b"%d,%.3f,%.3f,%d" % (seq, math.sin(seq / 100), math.cos(seq / 70), seq % 4096)
+            for seq in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=10000, help="lines per second")
+    parser.add_argument("--batch", type=int, default=256, help="frames per drain")
+    parser.add_argument("--width", type=int, default=800, help="canvas width in pixels")
+    args = parser.parse_args()
+
+    lines = make_lines(args.rate)
+    plot = telemetry.Telemetry(telemetry.FieldParser(), 100000)
+    start = time.perf_counter()
+    for offset in range(0, len(lines), args.batch):
+        plot.add(lines[offset:offset + args.batch])
+    elapsed = time.perf_counter() - start
+    print(f"parse {len(lines)} lines: {elapsed * 1000:.1f} ms ({elapsed * 100:.1f}% of one core at {args.rate}/s)")
+
+    print(f"{'capacity':>10} {'fill':>9} {'decimate':>10} {'raw':>10} {'points':>7}")
+    for capacity in (10000, 100000, 1000000):
+        plot = telemetry.Telemetry(telemetry.FieldParser(), capacity)
+        start = time.perf_counter()
+        for offset in range(0, capacity, len(lines)):
+            plot.add(lines[:min(len(lines), capacity - offset)])
+        fill_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        points = [channel.decimate(capacity, args.width) for channel in plot.channels]
+        decimate_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for channel in plot.channels:
+            telemetry.min_max_decimate(channel.last(), args.width)
+        raw_seconds = time.perf_counter() - start
+        print(f"{capacity:>10} {fill_seconds:8.2f}s {decimate_seconds * 1000:8.1f}ms {raw_seconds * 1000:8.1f}ms "
+              f"{sum(len(channel) for channel in points) // 2:>7}")
+
+
+if __name__ == "__main__":
+    main()
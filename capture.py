@@ -0,0 +1,241 @@
+# Streaming capture of serial traffic to disk.
+#
+# A capture file is append-only:
+#   header  : MAGIC, start time (float64)
+#   records : timestamp (float64, epoch seconds), direction (uint8), length (uint32), payload
+# Next to every capture file an .idx file holds (timestamp, offset) pairs for
+# roughly every index_every bytes of records, so a reader can jump close to a
+# point in time and scan forward from there.
+import bisect
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"SGCAP\x00\x01\x00"
+HEADER = struct.Struct("<8sd")
+RECORD = struct.Struct("<dBI")
+INDEX_ENTRY = struct.Struct("<dQ")
+
+RX = 0
+TX = 1
+DIRECTION_NAMES = {RX: "RX", TX: "TX"}
+
+_STOP = object()
+
+
+class CaptureWriter:
+    # Records are queued by the I/O threads and written on a background thread
+    # in buffered bulk writes. Files rotate by size and/or age.
+    def __init__(self, directory, prefix="capture", max_bytes=256 * 1024 * 1024, max_seconds=3600,
+                 buffer_size=256 * 1024, flush_interval=1.0, index_every=64 * 1024, queue_size=10000):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.index_every = index_every
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped_batches = 0
+        self.files = []
+
+        self.file = None
+        self.index_file = None
+        self.file_size = 0
+        self.file_opened = 0.0
+        self.last_indexed = None
+        self.pending = bytearray()
+        self.pending_index = bytearray()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, direction, frames, timestamp=None):
+        # Safe to call from any thread; never blocks the caller
+        try:
+            self.queue.put_nowait((timestamp or time.time(), direction, frames))
+        except queue.Full:
+            self.dropped_batches += 1
+
+    def close(self, timeout=5.0):
+        # Waits up to timeout seconds for what is queued to be written; a
+        # writer thread that is stuck (or died on a disk error) must not
+        # hang the port or the app on its way out
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(max(0.0, deadline - time.monotonic()))
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                timestamp, direction, frames = item
+                for frame in frames:
+                    self.add_record(timestamp, direction, frame)
+            now = time.monotonic()
+            if len(self.pending) >= self.buffer_size or (self.pending and now - last_flush >= self.flush_interval):
+                self.flush()
+                last_flush = now
+        self.close_file()
+
+    def add_record(self, timestamp, direction, frame):
+        if self.file is None or self.should_rotate():
+            self.close_file()
+            self.open_file(timestamp)
+        offset = self.file_size + len(self.pending)
+        if self.last_indexed is None or offset - self.last_indexed >= self.index_every:
+            self.pending_index += INDEX_ENTRY.pack(timestamp, offset)
+            self.last_indexed = offset
+        self.pending += RECORD.pack(timestamp, direction, len(frame))
+        self.pending += frame
+
+    def should_rotate(self):
+        if self.max_bytes and self.file_size + len(self.pending) >= self.max_bytes:
+            return True
+        return bool(self.max_seconds) and time.monotonic() - self.file_opened >= self.max_seconds
+
+    def open_file(self, timestamp):
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(timestamp))
+        path = os.path.join(self.directory, f"{self.prefix}_{stamp}_{len(self.files):03d}.sgcap")
+        self.file = open(path, "wb")
+        self.index_file = open(path + ".idx", "wb")
+        self.files.append(path)
+        self.pending += HEADER.pack(MAGIC, timestamp)
+        self.file_size = 0
+        self.file_opened = time.monotonic()
+        self.last_indexed = None
+
+    def flush(self):
+        if self.file is None:
+            return
+        self.file.write(self.pending)
+        self.index_file.write(self.pending_index)
+        self.file.flush()
+        self.index_file.flush()
+        self.file_size += len(self.pending)
+        self.pending.clear()
+        self.pending_index.clear()
+
+    def close_file(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.index_file.close()
+        self.file = None
+        self.index_file = None
+
+
+class CaptureReader:
+    # Memory-maps a capture so multi-GB files can be searched by time without
+    # reading them in. Without a usable index (missing, written ahead of a
+    # truncated capture, or damaged) records are found by scanning from the
+    # first record or from the last entry that still checks out.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            # mmap cannot map an empty file, so check the size first
+            if os.fstat(self.file.fileno()).st_size < HEADER.size:
+                raise ValueError
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.start_time = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC:
+                self.map.close()
+                raise ValueError
+        except (OSError, ValueError):
+            self.file.close()
+            raise ValueError(f"{path} is not a capture file") from None
+        self.index_times, self.index_offsets = self.load_index()
+
+    def load_index(self):
+        times = []
+        offsets = []
+        try:
+            with open(self.path + ".idx", "rb") as index_file:
+                data = index_file.read()
+        except OSError:
+            data = b""
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        for timestamp, offset in INDEX_ENTRY.iter_unpack(data[:usable]):
+            if offset >= len(self.map):
+                break  # Index written ahead of a truncated capture
+            if offset < (offsets[-1] + RECORD.size if offsets else HEADER.size) or (times and timestamp < times[-1]):
+                break  # Damaged; entries only ever move forward
+            times.append(timestamp)
+            offsets.append(offset)
+        if not offsets:
+            offsets = [HEADER.size]
+            times = [self.start_time]
+        return times, offsets
+
+    def records(self, start=None, end=None):
+        # Yields (timestamp, direction, payload) for start <= timestamp <= end
+        offset = HEADER.size
+        if start is not None:
+            # Scan from the last entry before start that checks out
+            position = bisect.bisect_right(self.index_times, start) - 1
+            while position >= 0 and not self.entry_checks_out(position):
+                position -= 1
+            if position >= 0:
+                offset = self.index_offsets[position]
+        size = len(self.map)
+        while offset + RECORD.size <= size:
+            timestamp, direction, length = RECORD.unpack_from(self.map, offset)
+            payload_start = offset + RECORD.size
+            offset = payload_start + length
+            if offset > size:
+                break  # Partially written last record
+            if end is not None and timestamp > end:
+                break
+            if start is None or timestamp >= start:
+                yield timestamp, direction, self.map[payload_start:offset]
+
+    def entry_checks_out(self, position):
+        # An index entry must point at a record carrying its timestamp
+        offset = self.index_offsets[position]
+        if offset + RECORD.size > len(self.map):
+            return False
+        return RECORD.unpack_from(self.map, offset)[0] == self.index_times[position]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv):
+    # python capture.py FILE [START_EPOCH [END_EPOCH]]
+    if not argv:
+        print("usage: capture.py FILE [START_EPOCH [END_EPOCH]]")
+        return 2
+    start = float(argv[1]) if len(argv) > 1 else None
+    end = float(argv[2]) if len(argv) > 2 else None
+    with CaptureReader(argv[0]) as reader:
+        for timestamp, direction, payload in reader.records(start, end):
+            stamp = time.strftime("%H:%M:%S", time.localtime(timestamp))
+            print(f"{stamp}.{int(timestamp % 1 * 1e6):06d} {DIRECTION_NAMES.get(direction, '??')} {payload!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
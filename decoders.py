@@ -0,0 +1,462 @@
+# Protocol decoder pipeline for received data.
+#
+# A pipeline is a chain of stages given as names separated by "|", e.g.
+# "fields" for the 3:XXX replies on the default line framing, or
+# "slip | fields" and "modbus-rtu" for binary links. Arguments follow the
+# name after colons ("length:2:little", "line:\x03"). Stages:
+#   line[:DELIM]            split a byte stream on DELIM (default \n)
+#   slip                    SLIP (RFC 1055) packets
+#   cobs                    COBS packets delimited by zero bytes
+#   length[:SIZE[:ORDER]]   payloads behind a SIZE byte length (1, 2 or 4; big or little)
+#   modbus-rtu              Modbus RTU responses, checked against their CRC
+#   fields                  3:XXX replies such as "FWV:1.0.0" or "IRDEV:OK:212"
+# Framers read whatever they are given as a stream, so they can be stacked,
+# and decoders turn the frames they recognise into Records and pass anything
+# else on. A framer as the first stage needs the raw byte stream, i.e.
+# [Receive] frame_mode = raw.
+#
+# New protocols plug in by adding a Stage subclass to STAGES. Every stage
+# keeps its own time and item counters, so a slow decoder shows up on its
+# own rather than as a slow pipeline.
+import queue
+import struct
+import threading
+import time
+
+from serial_core import FrameSplitter
+
+MAX_FRAME = 65536
+
+
+class Record:
+    # One decoded message: protocol name, fields in decoding order, and the
+    # frame it came from
+    __slots__ = ("protocol", "fields", "frame", "error")
+
+    def __init__(self, protocol, fields=None, frame=b"", error=None):
+        self.protocol = protocol
+        self.fields = fields or {}
+        self.frame = frame
+        self.error = error
+
+    def __str__(self):
+        parts = [self.protocol]
+        parts += [f"{name}={value}" for name, value in self.fields.items()]
+        if self.error is not None:
+            parts.append(f"error={self.error} frame={self.frame.hex(' ').upper()}")
+        return " ".join(parts)
+
+    def __repr__(self):
+        return f"Record({self.protocol!r}, {self.fields!r})"
+
+
+class Stage:
+    name = ""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.items_in = 0
+        self.items_out = 0
+
+    def process(self, items, now):
+        return items
+
+    def flush(self, now):
+        # Frames held back waiting for more data, once the link has gone quiet
+        return []
+
+
+class Framer(Stage):
+    # Subclasses implement split(data) -> list of frames or Records
+    def process(self, items, now):
+        output = []
+        for item in items:
+            if isinstance(item, Record):
+                output.append(item)
+            else:
+                output.extend(self.split(item))
+        return output
+
+
+class LineFramer(Framer):
+    name = "line"
+
+    def __init__(self, delimiter="\\n"):
+        super().__init__()
+        delimiter = delimiter.encode("latin-1").decode("unicode_escape").encode("latin-1")
+        self.splitter = FrameSplitter(delimiter=delimiter, max_frame=MAX_FRAME)
+        self.now = 0.0
+
+    def process(self, items, now):
+        self.now = now
+        return super().process(items, now)
+
+    def split(self, data):
+        return self.splitter.feed(data, self.now)
+
+    def flush(self, now):
+        return self.splitter.flush_idle(now)
+
+
+class SlipFramer(Framer):
+    name = "slip"
+    END = b"\xC0"
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+
+    def split(self, data):
+        self.buffer += data
+        if self.END not in data:
+            if len(self.buffer) > MAX_FRAME:
+                self.buffer.clear()  # No END in sight; this is not SLIP
+            return []
+        packets = self.buffer.split(self.END)
+        self.buffer = packets.pop()
+        # Every ESC starts an escape, so two replace() calls undo them in C
+        return [bytes(packet).replace(b"\xDB\xDC", b"\xC0").replace(b"\xDB\xDD", b"\xDB")
+                for packet in packets if packet]
+
+
+def cobs_decode(data):
+    # Raises ValueError for a malformed packet
+    output = bytearray()
+    index = 0
+    while index < len(data):
+        code = data[index]
+        end = index + code
+        if code == 0 or end > len(data):
+            raise ValueError("bad COBS code")
+        output += data[index + 1:end]
+        index = end
+        if code != 0xFF and index < len(data):
+            output.append(0)
+    return bytes(output)
+
+
+class CobsFramer(Framer):
+    name = "cobs"
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+
+    def split(self, data):
+        self.buffer += data
+        if b"\x00" not in data:
+            if len(self.buffer) > MAX_FRAME:
+                self.buffer.clear()
+            return []
+        packets = self.buffer.split(b"\x00")
+        self.buffer = packets.pop()
+        frames = []
+        for packet in packets:
+            if not packet:
+                continue
+            try:
+                frames.append(cobs_decode(packet))
+            except ValueError as error:
+                frames.append(Record("cobs", frame=bytes(packet), error=error))
+        return frames
+
+
+class LengthPrefixFramer(Framer):
+    name = "length"
+    FORMATS = {1: "B", 2: "H", 4: "I"}
+
+    def __init__(self, size="2", byteorder="big"):
+        super().__init__()
+        size = int(size)
+        if size not in self.FORMATS or byteorder not in ("big", "little"):
+            raise ValueError(f"length prefix must be 1, 2 or 4 bytes, big or little, not {size}:{byteorder}")
+        self.header = struct.Struct((">" if byteorder == "big" else "<") + self.FORMATS[size])
+        self.buffer = bytearray()
+        self.resyncs = 0
+
+    def split(self, data):
+        self.buffer += data
+        frames = []
+        start = 0
+        header = self.header.size
+        while len(self.buffer) - start >= header:
+            (length,) = self.header.unpack_from(self.buffer, start)
+            if length > MAX_FRAME:
+                start += 1  # Out of step; look for the next plausible header
+                self.resyncs += 1
+                continue
+            end = start + header + length
+            if end > len(self.buffer):
+                break
+            frames.append(bytes(self.buffer[start + header:end]))
+            start = end
+        del self.buffer[:start]
+        return frames
+
+    def flush(self, now):
+        # Called once the link has gone quiet. A frame still waiting for its
+        # payload then started at a header out of step with the stream (line
+        # noise, or a read that began mid-frame, e.g. b"AB" promising 16706
+        # bytes); skip it a byte at a time so the frames behind it come out
+        # now rather than after thousands more bytes
+        frames = []
+        while self.buffer:
+            del self.buffer[:1]
+            self.resyncs += 1
+            frames += self.split(b"")
+        return frames
+
+
+def make_crc16_table():
+    table = []
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = crc >> 1 ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+CRC16_TABLE = make_crc16_table()
+
+
+def crc16(data):
+    crc = 0xFFFF
+    for byte in data:
+        crc = crc >> 8 ^ CRC16_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+class ModbusRtuFramer(Framer):
+    # Responses only: the length follows from the function code, so frames
+    # are found without relying on the 3.5 character gap, which USB adapters
+    # do not preserve. A frame that fails its CRC costs one byte of resync.
+    name = "modbus-rtu"
+    FIXED_LENGTH = {5: 8, 6: 8, 15: 8, 16: 8}
+    COUNTED = (1, 2, 3, 4, 23)
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+        self.resyncs = 0
+
+    def frame_length(self, start):
+        # Length of the frame at start, None if more data is needed, 0 if the
+        # function code is not one we know
+        if len(self.buffer) - start < 3:
+            return None
+        function = self.buffer[start + 1]
+        if function & 0x80:
+            return 5
+        if function in self.COUNTED:
+            return 5 + self.buffer[start + 2]
+        return self.FIXED_LENGTH.get(function, 0)
+
+    def split(self, data):
+        self.buffer += data
+        records = []
+        start = 0
+        while True:
+            length = self.frame_length(start)
+            if length is None or len(self.buffer) - start < length:
+                break
+            frame = bytes(self.buffer[start:start + length])
+            if not length or crc16(frame[:-2]) != frame[-2] | frame[-1] << 8:
+                start += 1
+                self.resyncs += 1
+                continue
+            start += length
+            records.append(self.decode(frame))
+        del self.buffer[:start]  # Once per read, not once per frame
+        return records
+
+    def flush(self, now):
+        # Called once the link has gone quiet. A frame still waiting for bytes
+        # then was a false start after line noise (e.g. a byte count of 0x4B
+        # promising 80 bytes); skip it a byte at a time so the responses
+        # behind it come out now rather than after the next 255 bytes
+        records = []
+        while self.buffer:
+            del self.buffer[:1]
+            self.resyncs += 1
+            records += self.split(b"")
+        return records
+
+    def decode(self, frame):
+        unit, function = frame[0], frame[1]
+        fields = {"unit": unit, "function": function & 0x7F}
+        body = frame[2:-2]
+        if function & 0x80:
+            fields["exception"] = body[0]
+        elif function in (1, 2):
+            # Coil or input 0 first
+            fields["bits"] = "".join(format(byte, "08b")[::-1] for byte in body[1:])
+        elif function in (3, 4, 23):
+            data = body[1:]
+            fields["registers"] = list(struct.unpack(f">{len(data) // 2}H", data[:len(data) // 2 * 2]))
+        else:
+            address, value = struct.unpack(">HH", body)
+            fields["address"] = address
+            fields["count" if function in (15, 16) else "value"] = value
+        return Record("modbus", fields, frame)
+
+
+class FieldDecoder(Stage):
+    # Replies to the command panel's 3:XXX commands: "NAME:value[:value...]",
+    # plus the bare "ERR" and the "." listening prompt. Other frames pass on.
+    name = "fields"
+    FIELD_NAMES = {
+        "PRD": ("product",),
+        "FWV": ("version",),
+        "IRDEV": ("status", "bytes"),
+        "UPL": ("status",),
+        "END": ("status",),
+        "ACK": ("block",),
+        "NAK": ("block",),
+    }
+
+    def process(self, items, now):
+        output = []
+        for item in items:
+            if isinstance(item, Record):
+                output.append(item)
+                continue
+            line = item.strip()
+            name, colon, rest = line.partition(b":")
+            if colon and name.isalpha() and name.isupper() and len(name) <= 8:
+                name = name.decode("ascii")
+                values = rest.decode("utf-8", errors="replace").split(":")
+                labels = self.FIELD_NAMES.get(name, ())
+                fields = {labels[index] if index < len(labels) else f"value{index + 1}": value
+                          for index, value in enumerate(values)}
+                output.append(Record(name, fields, item))
+            elif line == b"ERR":
+                output.append(Record("ERR", frame=item))
+            elif line == b".":
+                output.append(Record("PROMPT", frame=item))
+            else:
+                output.append(item)
+        return output
+
+
+STAGES = {
+    LineFramer.name: LineFramer,
+    SlipFramer.name: SlipFramer,
+    CobsFramer.name: CobsFramer,
+    LengthPrefixFramer.name: LengthPrefixFramer,
+    ModbusRtuFramer.name: ModbusRtuFramer,
+    FieldDecoder.name: FieldDecoder,
+}
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+
+    @classmethod
+    def from_spec(cls, spec):
+        # Raises ValueError for an unknown stage or bad arguments
+        stages = []
+        for part in spec.split("|"):
+            name, *args = part.strip().split(":")
+            if not name:
+                continue
+            if name not in STAGES:
+                raise ValueError(f"unknown decoder stage {name!r} (known: {', '.join(STAGES)})")
+            try:
+                stages.append(STAGES[name](*args))
+            except TypeError:
+                raise ValueError(f"wrong number of arguments for decoder stage {name!r}") from None
+        return cls(stages)
+
+    @property
+    def spec(self):
+        return " | ".join(stage.name for stage in self.stages)
+
+    def process(self, items, now):
+        return self.run(0, items, now)
+
+    def flush(self, now):
+        # Flushing a stage runs its frames through the stages after it
+        items = []
+        for index, stage in enumerate(self.stages):
+            items += self.run(index + 1, stage.flush(now), now)
+        return items
+
+    def run(self, first, items, now):
+        for stage in self.stages[first:]:
+            if not items:
+                break
+            start = time.perf_counter()
+            stage.items_in += len(items)
+            items = stage.process(items, now)
+            stage.items_out += len(items)
+            stage.seconds += time.perf_counter() - start
+        return items
+
+    def costs(self):
+        # Cumulative (name, seconds, items_in, items_out) per stage
+        return [(stage.name, stage.seconds, stage.items_in, stage.items_out) for stage in self.stages]
+
+
+class DecoderWorker:
+    # Runs a Pipeline on its own thread, between a PortSession and the UI.
+    # feed_frames() is meant to be registered as a PortSession frame
+    # listener; it only queues the batch, so the reader is never held up by
+    # a decoder. Like a PortSession, on_data(worker) is called after each
+    # decoded batch and drain() returns what has been decoded so far:
+    # Records, plus the frames no stage recognised.
+    def __init__(self, pipeline, on_data, queue_size=1024, idle_gap=0.05):
+        self.pipeline = pipeline
+        self.on_data = on_data
+        self.idle_gap = idle_gap
+        self.input = queue.Queue(maxsize=queue_size)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped_batches = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="decoder", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    def feed_frames(self, frames):
+        try:
+            self.input.put_nowait(frames)
+        except queue.Full:
+            self.dropped_batches += 1  # Decoding is behind; the raw monitors still get everything
+
+    def run(self):
+        while self.running:
+            try:
+                frames = self.input.get(timeout=self.idle_gap)
+            except queue.Empty:
+                self.publish(self.pipeline.flush(time.monotonic()))
+                continue
+            self.publish(self.pipeline.process(frames, time.monotonic()))
+
+    def publish(self, records):
+        if not records:
+            return
+        try:
+            self.queue.put_nowait((time.monotonic(), records))
+        except queue.Full:
+            self.dropped_batches += 1
+            return
+        self.on_data(self)
+
+    def drain(self):
+        records = []
+        try:
+            while True:
+                records.extend(self.queue.get_nowait()[1])
+        except queue.Empty:
+            pass
+        return records
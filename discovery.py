@@ -0,0 +1,97 @@
+# Background serial port discovery.
+#
+# PortWatcher lists the ports on its own thread every scan_interval and
+# reports additions and removals, so a USB adapter plugged in after startup
+# shows up without anyone calling comports() on the UI thread. It also
+# keeps the USB metadata of each port, so a device that re-enumerates
+# under a different name (ttyUSB0 -> ttyUSB1, COM5 -> COM7) can be found
+# again by its identity.
+import threading
+
+import serial.tools.list_ports
+
+
+class PortInfo:
+    def __init__(self, device, description="", vid=None, pid=None, serial_number=None, location=None):
+        self.device = device
+        self.description = description
+        self.vid = vid
+        self.pid = pid
+        self.serial_number = serial_number
+        self.location = location
+
+    @classmethod
+    def from_list_ports(cls, port):
+        return cls(port.device, port.description, port.vid, port.pid, port.serial_number, port.location)
+
+    @property
+    def identity(self):
+        # The USB serial number survives re-enumeration; without one the
+        # physical hub/port location is the next best thing
+        if self.vid is None:
+            return ("device", self.device)
+        if self.serial_number:
+            return (self.vid, self.pid, "serial", self.serial_number)
+        if self.location:
+            return (self.vid, self.pid, "location", self.location)
+        return ("device", self.device)
+
+
+class PortWatcher:
+    # on_change(added, removed) runs on the watcher thread with lists of
+    # PortInfo; the first scan reports every port as added.
+    def __init__(self, on_change=None, scan_interval=1.0, list_ports=serial.tools.list_ports.comports):
+        self.on_change = on_change or (lambda added, removed: None)
+        self.scan_interval = scan_interval
+        self.list_ports = list_ports
+        self.lock = threading.Lock()
+        self.ports = {}  # device -> PortInfo currently present
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="port-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.scan_interval + 1.0)
+
+    def run(self):
+        while True:
+            self.scan()
+            if self.stop_event.wait(self.scan_interval):
+                break
+
+    def scan(self):
+        try:
+            current = {port.device: PortInfo.from_list_ports(port) for port in self.list_ports()}
+        except OSError:
+            return  # Transient failure while a device is being enumerated
+        with self.lock:
+            added = [info for device, info in current.items() if device not in self.ports]
+            removed = [info for device, info in self.ports.items() if device not in current]
+            self.ports = current
+        if added or removed:
+            self.on_change(added, removed)
+
+    def snapshot(self):
+        with self.lock:
+            return sorted(self.ports.values(), key=lambda info: info.device)
+
+    def identity_of(self, device):
+        with self.lock:
+            info = self.ports.get(device)
+        return info.identity if info is not None else ("device", device)
+
+    def find(self, identity):
+        # Current device name for a physical device, or None while it is unplugged
+        with self.lock:
+            if identity[0] == "device":
+                return identity[1]  # Nothing better to go on; let the open attempt decide
+            for info in self.ports.values():
+                if info.identity == identity:
+                    return info.device
+        return None
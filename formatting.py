@@ -0,0 +1,146 @@
+# Conversions between raw bytes and the Text/ASCII/Hex/Binary/Octal views.
+#
+# Everything here works on whole buffers: bytes.hex(), bytes.translate() and
+# map() over 256-entry lookup tables keep the per-byte work in C, so
+# formatting and encoding cost does not grow with Python-level loops.
+
+VIEWS = ["Text", "ASCII", "Hex", "Hex Dump", "Binary", "Octal"]
+SEND_FORMATS = ["Hex", "Binary", "Octal", "String"]
+
+BINARY_TABLE = tuple(f"{value:08b}" for value in range(256))
+OCTAL_TABLE = tuple(f"{value:03o}" for value in range(256))
+OCTAL_VALUES = {text: value for value, text in enumerate(OCTAL_TABLE)}
+# Printable ASCII stays, everything else becomes "."
+ASCII_TABLE = bytes(value if 32 <= value < 127 else ord(".") for value in range(256))
+
+ROW_WIDTH = {"Hex": 16, "Hex Dump": 16, "Binary": 8, "Octal": 16, "ASCII": 64}
+
+
+def to_ascii(data):
+    return data.translate(ASCII_TABLE).decode("ascii")
+
+
+def to_hex(data):
+    return data.hex(" ").upper()
+
+
+def to_binary(data):
+    return " ".join(map(BINARY_TABLE.__getitem__, data))
+
+
+def to_octal(data):
+    return " ".join(map(OCTAL_TABLE.__getitem__, data))
+
+
+CELL_FORMATTERS = {"ASCII": to_ascii, "Hex": to_hex, "Binary": to_binary, "Octal": to_octal}
+LINE_BREAKS = str.maketrans({"\r": "\\r", "\n": "\\n"})
+
+
+def decode_text(frames):
+    # Decode the whole batch in one call; invalid bytes are replaced, not fatal
+    text = b"\n".join(frame.rstrip(b"\r") for frame in frames).decode("utf-8", errors="replace")
+    return text.split("\n")
+
+
+def decode_sent(frames):
+    # One line per sent payload: its line ending is dropped and any other CR
+    # or LF is shown escaped, so a send never spans lines in the log
+    return [frame.rstrip(b"\r\n").decode("utf-8", errors="replace").translate(LINE_BREAKS) for frame in frames]
+
+
+def format_rows(data, view, width=None):
+    # One row per width bytes, prefixed with the offset into data
+    width = width or ROW_WIDTH[view]
+    view_data = memoryview(data)
+    rows = []
+    if view == "Hex Dump":
+        for offset in range(0, len(data), width):
+            chunk = view_data[offset:offset + width].tobytes()
+            rows.append(f"{offset:08X}  {to_hex(chunk):<{width * 3 - 1}}  |{to_ascii(chunk)}|")
+    else:
+        cells = CELL_FORMATTERS[view]
+        for offset in range(0, len(data), width):
+            rows.append(f"{offset:04X}: {cells(view_data[offset:offset + width].tobytes())}")
+    return rows or [f"{0:04X}:"]
+
+
+def format_frames(items, view="Text", prefix=""):
+    # items are received/sent frames (bytes) mixed with notes (str), which
+    # are passed through untouched. A prefix marks a log of sent payloads,
+    # which shows each payload as one line in the Text view.
+    lines = []
+    run = []
+    for item in items:
+        if isinstance(item, str):
+            if run:
+                lines.extend(format_run(run, view, prefix))
+                run = []
+            lines.append(item)
+        else:
+            run.append(item)
+    if run:
+        lines.extend(format_run(run, view, prefix))
+    return lines
+
+
+def format_run(frames, view, prefix):
+    if view == "Text":
+        if prefix:
+            return [prefix + line for line in decode_sent(frames)]
+        return decode_text(frames)
+    lines = []
+    for frame in frames:
+        rows = format_rows(frame, view)
+        if prefix:
+            rows[0] = prefix + rows[0]
+        lines.extend(rows)
+    return lines
+
+
+def encode_payload(text, data_format="String", add_crlf=True):
+    # Raises ValueError for text that is not valid in data_format.
+    # CR LF is appended after conversion so it works in every format.
+    if data_format == "Hex":
+        data = bytes.fromhex(text)
+    elif data_format == "Binary":
+        data = parse_binary(text)
+    elif data_format == "Octal":
+        data = parse_octal(text)
+    else:
+        data = text.encode()
+    if add_crlf:
+        data += b"\r\n"
+    return data
+
+
+def parse_binary(text):
+    # "01000001 01000010" or "0100000101000010"; a run that is not a whole
+    # number of bytes is read as one big-endian number
+    tokens = text.split()
+    digits = "".join(tokens)
+    if not digits:
+        return b""
+    if len(tokens) > 1 and any(len(token) > 8 for token in tokens):
+        raise ValueError("binary bytes must be at most 8 digits")
+    if len(tokens) > 1:
+        digits = "".join(token.zfill(8) for token in tokens)
+    value = int(digits, 2)
+    return value.to_bytes((len(digits) + 7) // 8, byteorder="big")
+
+
+def parse_octal(text):
+    # One byte per token of 1 to 3 digits, separated by whitespace or commas
+    # ("101 102", "12,7"), or runs of three digits per byte with nothing in
+    # between ("101102"), the way bytes.fromhex reads two digits per byte
+    tokens = text.replace(",", " ").split()
+    if any(len(token) != 3 for token in tokens):
+        groups = []
+        for token in tokens:
+            if len(token) % 3 and len(token) > 3:
+                raise ValueError(f"octal run {token!r} is not a whole number of 3-digit bytes")
+            groups += [token[start:start + 3].zfill(3) for start in range(0, len(token), 3)]
+        tokens = groups
+    try:
+        return bytes(map(OCTAL_VALUES.__getitem__, tokens))
+    except KeyError as error:
+        raise ValueError(f"invalid octal byte {error.args[0]!r}") from None
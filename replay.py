@@ -0,0 +1,250 @@
+# Timed replay of capture files (see capture.py).
+#
+#   python replay.py captures/capture_20261018_101500_000.sgcap
+#   python replay.py captures --pty --start-delay 10     replay RX into a new pseudo-terminal
+#   python replay.py captures --port /dev/ttyUSB1 --speed 10
+#   python replay.py captures --port loop:// --speed 0   as fast as possible
+#
+# Records keep their recorded spacing, divided by speed; speed 0 plays them
+# as fast as the sink takes them. Everything recorded with the same timestamp
+# and direction (one reader batch or one sent job) is delivered together,
+# and once playback falls behind schedule every record already due goes out
+# in the same batch, so fast playback is not limited by one call per record.
+#
+# The GUI feeds replayed RX into a PortSession that is never opened, so it
+# takes the same on_data/drain path into update_received_data as live data.
+# A port or pty gets the RX bytes the device sent; frames were recorded
+# after splitting, so in delimiter mode the delimiter is put back. Opening
+# a port flushes its input, so give whoever reads the pty time to open it
+# with --start-delay.
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+import capture
+from formatting import decode_text
+from serial_core import Settings
+
+try:
+    import tty
+except ImportError:  # Windows
+    tty = None
+
+DIRECTIONS = {"rx": (capture.RX,), "tx": (capture.TX,), "both": (capture.RX, capture.TX)}
+
+
+def capture_paths(paths):
+    # Directories expand to their capture files; rotated files sort by name,
+    # which starts with the time they were opened
+    result = []
+    for path in paths:
+        if os.path.isdir(path):
+            result += sorted(glob.glob(os.path.join(path, "*.sgcap")))
+        else:
+            result.append(path)
+    return result
+
+
+def read_records(paths, directions):
+    for path in paths:
+        with capture.CaptureReader(path) as reader:
+            for timestamp, direction, payload in reader.records():
+                if direction in directions:
+                    yield timestamp, direction, payload
+
+
+class Replayer:
+    # Plays capture records on its own thread. deliver(direction, frames) is
+    # called with each batch and may block to slow playback down. speed is a
+    # multiple of real time, 0 for as fast as possible. on_done(replayer) is
+    # called from the replay thread at the end.
+    def __init__(self, paths, deliver, speed=1.0, directions=(capture.RX,), on_done=None, batch_frames=256):
+        self.paths = paths
+        self.deliver = deliver
+        self.speed = speed
+        self.directions = directions
+        self.on_done = on_done or (lambda replayer: None)
+        self.batch_frames = batch_frames
+        self.stop_event = threading.Event()
+        self.records = 0
+        self.bytes = 0
+        self.batches = 0
+        self.max_lag = 0.0  # Worst delivery delay behind schedule, in wall-clock seconds
+        self.first_timestamp = None
+        self.position = None  # Recorded time of the last delivered record
+        self.started_at = None
+        self.finished_at = None
+        self.result = None  # (completed, message) once finished
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="replay", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def achieved_speed(self):
+        # Recorded time covered per wall-clock second
+        if self.position is None or self.elapsed <= 0:
+            return 0.0
+        return (self.position - self.first_timestamp) / self.elapsed
+
+    def run(self):
+        try:
+            self.started_at = time.monotonic()
+            batch = []
+            batch_direction = None
+            batch_due = 0.0
+            for timestamp, direction, payload in read_records(self.paths, self.directions):
+                if self.stop_event.is_set():
+                    break
+                if self.first_timestamp is None:
+                    self.first_timestamp = timestamp
+                due = self.started_at + (timestamp - self.first_timestamp) / self.speed if self.speed else 0.0
+                now = time.monotonic()
+                if batch and (direction != batch_direction or len(batch) >= self.batch_frames or due > now):
+                    self.flush(batch_direction, batch, batch_due)
+                    batch = []
+                if due > now and self.stop_event.wait(due - now):
+                    break
+                if not batch:
+                    batch_direction = direction
+                    batch_due = due
+                batch.append(payload)
+                self.position = timestamp
+            if batch and not self.stop_event.is_set():
+                self.flush(batch_direction, batch, batch_due)
+            self.finish(not self.stop_event.is_set(), "Stopped" if self.stop_event.is_set() else "Finished")
+        except Exception as error:  # A broken capture or sink; report it rather than never finishing
+            self.finish(False, f"Error: {error}")
+
+    def flush(self, direction, frames, due):
+        if self.speed:
+            self.max_lag = max(self.max_lag, time.monotonic() - due)
+        self.deliver(direction, frames)
+        self.records += len(frames)
+        self.bytes += sum(len(frame) for frame in frames)
+        self.batches += 1
+
+    def finish(self, completed, message):
+        self.finished_at = time.monotonic()
+        self.result = (completed, message)
+        self.on_done(self)
+
+    def summary(self):
+        return (f"{self.records} records, {self.bytes} bytes in {self.elapsed:.2f} s "
+                f"({self.achieved_speed:.1f}x real time, max lag {self.max_lag * 1000:.1f} ms)")
+
+
+def frame_joiner(settings):
+    # Puts back the delimiter the receive path split off
+    if settings.frame_mode == "delimiter":
+        delimiter = settings.frame_delimiter
+        return lambda frames: b"".join(frame + delimiter for frame in frames)
+    return b"".join
+
+
+class PtySink:
+    # A pseudo-terminal whose other end is what the replay is written to
+    def __init__(self):
+        if tty is None:
+            raise RuntimeError("--pty needs a POSIX pseudo-terminal")
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port_name = os.ttyname(self.slave)
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            try:
+                count = os.write(self.master, view)
+            except BlockingIOError:
+                time.sleep(0.001)
+                continue
+            view = view[count:]
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            os.close(fd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay capture files with their original timing.")
+    parser.add_argument("paths", nargs="+", help="capture files or directories of them")
+    parser.add_argument("--speed", type=float, default=1.0, help="multiple of real time; 0 plays as fast as possible")
+    parser.add_argument("--direction", choices=sorted(DIRECTIONS), default="rx", help="which records to replay")
+    parser.add_argument("--port", help="write the replay to this port name or pyserial URL")
+    parser.add_argument("--pty", action="store_true", help="write the replay to a new pseudo-terminal")
+    parser.add_argument("--start-delay", type=float, default=0, metavar="SECONDS",
+                        help="wait before playing, e.g. until the pty has been opened")
+    parser.add_argument("--settings", default="settings.ini", help="framing and port options (default: settings.ini)")
+    args = parser.parse_args(argv)
+
+    paths = capture_paths(args.paths)
+    if not paths:
+        print("No capture files found", file=sys.stderr)
+        return 2
+    settings = Settings(args.settings)
+    join = frame_joiner(settings)
+    sink = None
+    session = None
+    if args.pty:
+        sink = PtySink()
+        print(sink.port_name, flush=True)
+        write = sink.write
+    elif args.port:
+        session = settings.create_session(args.port, lambda session: session.drain())
+        session.open()
+
+        def write(data):
+            return session.send(data, timeout=None)
+    else:
+        write = None
+
+    def deliver(direction, frames):
+        if write is None:
+            name = capture.DIRECTION_NAMES[direction]
+            sys.stdout.write("".join(f"{name} {line}\n" for line in decode_text(frames)))
+        else:
+            write(join(frames) if direction == capture.RX else b"".join(frames))
+
+    replayer = Replayer(paths, deliver, args.speed, DIRECTIONS[args.direction])
+    try:
+        time.sleep(args.start_delay)
+        replayer.start()
+        while replayer.thread.is_alive():
+            replayer.thread.join(0.2)
+        if sink is not None:
+            # Closing the pty would throw away whatever the reader has not read yet
+            print(f"{replayer.result[1]}; press Ctrl-C to close {sink.port_name}", file=sys.stderr, flush=True)
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        if replayer.thread is None:
+            return 1  # Interrupted before it started
+        replayer.stop()
+        replayer.thread.join()
+    finally:
+        if session is not None:
+            session.wait_sent()
+            session.close()
+        if sink is not None:
+            sink.close()
+    print(f"{replayer.result[1]}: {replayer.summary()}", file=sys.stderr)
+    return 0 if replayer.result[0] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
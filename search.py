@@ -0,0 +1,225 @@
+# Incremental search index over received frames.
+#
+# Frames are grouped into blocks of BLOCK_LINES. Each block keeps a bitmap of
+# the (hashed, lower-cased) character trigrams that occur in it, so a plain
+# text query only scans blocks that contain all of its trigrams; everything
+# else is skipped without looking at a single line. Memory is a fixed
+# BLOOM_BITS / 8 bytes per block on top of the frames, which are shared with
+# the LogBuffer rather than copied.
+#
+# Highlight rules are compiled into one regex and applied once per frame at
+# ingest time; each block also records which rules matched in it, so
+# "rule:NAME" queries are indexed as well.
+#
+# Query syntax:
+#   words...     lines containing every word (case-insensitive substrings)
+#   re:REGEX     lines matching REGEX (case-sensitive; use (?i)); scans all lines
+#   rule:NAME    lines tagged by highlight rule NAME
+import collections
+import itertools
+import re
+
+BLOCK_LINES = 64
+BLOOM_BITS = 1 << 14
+
+# A leading (?i) is only allowed at the start of the whole pattern, so it is
+# turned into a scoped group before the rules are joined
+GLOBAL_FLAGS = re.compile(rb"^\(\?([imsx]+)\)")
+
+
+def trigram_mask(trigrams):
+    # Set bits in a bytearray and convert once; OR-ing into a 16 kbit int
+    # per trigram would copy the whole int every time
+    bits = bytearray(BLOOM_BITS // 8)
+    for a, b, c in trigrams:
+        bit = (a << 9 ^ b << 4 ^ c) & (BLOOM_BITS - 1)
+        bits[bit >> 3] |= 1 << (bit & 7)
+    return int.from_bytes(bits, "little")
+
+
+class HighlightRules:
+    # rules: (name, color, regex) in priority order; a frame is tagged with
+    # the rule that matches first in it
+    def __init__(self, rules=()):
+        self.names = [name for name, _color, _pattern in rules]
+        self.colors = {name: color for name, color, _pattern in rules}
+        parts = []
+        for index, (name, _color, pattern) in enumerate(rules):
+            pattern = pattern.encode()
+            re.compile(pattern)  # Report a bad rule on its own
+            flags = GLOBAL_FLAGS.match(pattern)
+            if flags is not None:
+                pattern = b"(?%s:%s)" % (flags.group(1), pattern[flags.end():])
+            parts.append(b"(?P<r%d>%s)" % (index, pattern))
+        self.matcher = re.compile(b"|".join(parts)) if parts else None
+
+    def tag(self, frame):
+        # Index of the matching rule, or None
+        if self.matcher is None:
+            return None
+        match = self.matcher.search(frame)
+        if match is None:
+            return None
+        return int(match.lastgroup[1:])
+
+
+class Query:
+    def __init__(self, text, rules=None):
+        self.text = text
+        self.regex = None
+        self.rule = None
+        self.terms = []
+        self.mask = 0
+        if text.startswith("re:"):
+            self.regex = re.compile(text[3:].encode())  # re.error for a bad pattern
+        elif text.startswith("rule:"):
+            name = text[5:].strip()
+            if rules is None or name not in rules.names:
+                raise ValueError(f"unknown highlight rule {name!r}")
+            self.rule = rules.names.index(name)
+        else:
+            self.terms = [term.encode().lower() for term in text.split()]
+            for term in self.terms:
+                self.mask |= trigram_mask(zip(term, term[1:], term[2:]))
+
+    def matches(self, frame, tag=None):
+        if self.regex is not None:
+            return self.regex.search(frame) is not None
+        if self.rule is not None:
+            return tag == self.rule
+        lowered = frame.lower()
+        return all(term in lowered for term in self.terms)
+
+    def block_may_match(self, block):
+        if self.rule is not None:
+            return bool(block.rule_mask >> self.rule & 1)
+        return block.bloom & self.mask == self.mask
+
+
+class Block:
+    # Up to BLOCK_LINES consecutive frames starting at sequence number start
+    __slots__ = ("start", "frames", "tags", "trigrams", "bloom", "rule_mask")
+
+    def __init__(self, start):
+        self.start = start
+        self.frames = []
+        self.tags = []
+        self.trigrams = set()  # Folded into bloom when the block is full
+        self.bloom = 0
+        self.rule_mask = 0
+
+    def seal(self):
+        self.bloom = trigram_mask(self.trigrams)
+        self.trigrams = None
+
+
+class LogIndex:
+    # Mirrors a LogBuffer of received frames: call add() with the frames and
+    # the buffer's next_seq before extending it, and discard_before() with the
+    # buffer's first_seq afterwards.
+    def __init__(self, rules=None):
+        self.rules = rules or HighlightRules()
+        self.blocks = collections.deque()
+        self.oldest = 0  # Lines before this were dropped from the LogBuffer
+
+    def add(self, frames, first_seq):
+        # Returns the highlight rule index (or None) of every frame
+        tags = []
+        block = self.blocks[-1] if self.blocks else None
+        if block is not None and block.start + len(block.frames) != first_seq:
+            self.clear()  # The buffer was cleared; start over
+            block = None
+        for frame in frames:
+            if block is None or len(block.frames) == BLOCK_LINES:
+                if block is not None:
+                    block.seal()
+                block = Block(block.start + BLOCK_LINES if block is not None else first_seq)
+                self.blocks.append(block)
+            lowered = frame.lower()
+            block.trigrams.update(zip(lowered, lowered[1:], lowered[2:]))
+            tag = self.rules.tag(frame)
+            if tag is not None:
+                block.rule_mask |= 1 << tag
+            block.frames.append(frame)
+            block.tags.append(tag)
+            tags.append(tag)
+        return tags
+
+    def discard_before(self, seq):
+        # Whole blocks only; the few stale lines in the first block are
+        # filtered out by the seq checks below
+        while self.blocks and self.blocks[0].start + len(self.blocks[0].frames) <= seq:
+            self.blocks.popleft()
+        self.oldest = seq
+
+    def clear(self):
+        self.blocks.clear()
+
+    def candidate(self, query, block):
+        # The open block has no bloom yet, so it is always scanned
+        return block.trigrams is not None or query.block_may_match(block)
+
+    def block_matches(self, query, block):
+        for offset, frame in enumerate(block.frames):
+            seq = block.start + offset
+            if seq >= self.oldest and query.matches(frame, block.tags[offset]):
+                yield seq
+
+    def search(self, query, limit=None):
+        # Sequence numbers of matching frames, oldest first; with limit, only
+        # the newest limit matches (found by walking backwards)
+        if limit is None:
+            return [seq for block in self.blocks if self.candidate(query, block)
+                    for seq in self.block_matches(query, block)]
+        found = []
+        for block in reversed(self.blocks):
+            if self.candidate(query, block):
+                found[:0] = list(self.block_matches(query, block))
+                if len(found) >= limit:
+                    return found[-limit:]
+        return found
+
+    def count(self, query):
+        return len(self.search(query))
+
+    def count_between(self, query, start, end):
+        # Matches among the frames start <= seq < end that are still held,
+        # e.g. the ones about to be discarded
+        return sum(1 for _seq, frame, tag in self.frames(start, end) if query.matches(frame, tag))
+
+    def next_match(self, query, after_seq):
+        start = self.block_position(after_seq + 1)
+        for block in itertools.islice(self.blocks, start, None):
+            if self.candidate(query, block):
+                for seq in self.block_matches(query, block):
+                    if seq > after_seq:
+                        return seq
+        return None
+
+    def previous_match(self, query, before_seq):
+        start = self.block_position(before_seq - 1)
+        for block in itertools.islice(reversed(self.blocks), len(self.blocks) - 1 - start, None):
+            if self.candidate(query, block):
+                for seq in reversed(list(self.block_matches(query, block))):
+                    if seq < before_seq:
+                        return seq
+        return None
+
+    def block_position(self, seq):
+        # Every block but the last is full, so the position follows directly
+        if not self.blocks:
+            return 0
+        return max(0, min(len(self.blocks) - 1, (seq - self.blocks[0].start) // BLOCK_LINES))
+
+    def frames(self, start, end):
+        # (seq, frame, tag) for start <= seq < end that are still held
+        oldest = max(start, self.oldest)
+        result = []
+        for block in itertools.islice(self.blocks, self.block_position(oldest), None):
+            if block.start >= end:
+                break
+            for offset, frame in enumerate(block.frames):
+                seq = block.start + offset
+                if oldest <= seq < end:
+                    result.append((seq, frame, block.tags[offset]))
+        return result
@@ -0,0 +1,298 @@
+# Command/expect sequences for unattended test runs.
+#
+# A sequence file has one step per line; blank lines and "#" comments are
+# skipped. Arguments are split like a shell command line, so quote anything
+# containing spaces. Backslashes are kept as-is for regular expressions.
+#
+#   send TEXT                 send TEXT followed by CR LF
+#   send_hex AABBCC           send raw bytes
+#   command NAME              send a command panel entry, e.g. command "Product Info"
+#   expect PATTERN... [timeout=MS] [retries=N] [on_timeout=LABEL]
+#                             wait for a received line matching any PATTERN.
+#                             PATTERN is re:REGEX or prefix:TEXT, optionally
+#                             followed by ->LABEL to branch when it matches.
+#                             On timeout the last send is repeated up to N
+#                             times, then the run jumps to on_timeout or fails.
+#   wait MS                   pause
+#   label NAME                jump target
+#   goto NAME                 jump
+#   log TEXT                  report TEXT
+#   pass / fail [TEXT]        end the run
+#
+# Example:
+#   label start
+#   command "Firmware Version"
+#   expect re:^FWV:(\d+\.\d+) prefix:ERR->failed timeout=1000 retries=2
+#   pass
+#   label failed
+#   fail "MCU reported an error"
+import collections
+import re
+import shlex
+import threading
+import time
+
+from formatting import decode_text
+from serial_core import COMMANDS
+
+DEFAULT_TIMEOUT = 2.0
+# A leading (?i) is only allowed at the start of the whole pattern, so it is
+# turned into a scoped group before the branches are joined (as in search.py)
+GLOBAL_FLAGS = re.compile(r"^\(\?([imsx]+)\)")
+BRANCH_GROUP = re.compile(r"b\d+")  # Names compile_patterns gives the branches
+# Arguments each step takes as (minimum, maximum); None for no maximum
+STEP_ARGUMENTS = {
+    "send": (0, None),
+    "send_hex": (1, None),
+    "command": (1, None),
+    "expect": (1, None),
+    "wait": (1, 1),
+    "label": (1, 1),
+    "goto": (1, 1),
+    "log": (0, None),
+    "pass": (0, None),
+    "fail": (0, None),
+}
+
+
+class SequenceError(ValueError):
+    pass
+
+
+class Step:
+    def __init__(self, action, line_number, **values):
+        self.action = action
+        self.line_number = line_number
+        self.__dict__.update(values)
+
+
+def compile_patterns(patterns):
+    # All alternatives of one expect step become a single regex with one
+    # named group per branch, so each received line is searched only once.
+    parts = []
+    for index, (kind, text, _target) in enumerate(patterns):
+        body = text if kind == "re" else re.escape(text)
+        if kind == "prefix":
+            body = "^" + body
+        # Report a bad pattern on its own, not as part of the alternation
+        for name in re.compile(body).groupindex:
+            if BRANCH_GROUP.fullmatch(name):
+                raise re.error(f"group name {name!r} is reserved")
+        flags = GLOBAL_FLAGS.match(body)
+        if flags is not None:
+            body = f"(?{flags.group(1)}:{body[flags.end():]})"
+        parts.append(f"(?P<b{index}>{body})")
+    return re.compile("|".join(parts))
+
+
+def parse_expect(tokens, line_number):
+    patterns = []
+    options = {"timeout": DEFAULT_TIMEOUT, "retries": 0, "on_timeout": None}
+    for token in tokens:
+        key, _, value = token.partition("=")
+        if key in ("timeout", "retries", "on_timeout") and value:
+            if key == "timeout":
+                options["timeout"] = float(value) / 1000
+            elif key == "retries":
+                options["retries"] = int(value)
+            else:
+                options["on_timeout"] = value
+            continue
+        kind, _, rest = token.partition(":")
+        if kind not in ("re", "prefix") or not rest:
+            raise SequenceError(f"line {line_number}: expected re:REGEX or prefix:TEXT, got {token!r}")
+        text, target = rest, None
+        if "->" in rest:
+            text, _, target = rest.rpartition("->")
+        patterns.append((kind, text, target))
+    if not patterns:
+        raise SequenceError(f"line {line_number}: expect needs at least one pattern")
+    try:
+        matcher = compile_patterns(patterns)
+    except re.error as error:
+        raise SequenceError(f"line {line_number}: bad pattern: {error}") from None
+    return Step("expect", line_number, matcher=matcher, targets=[target for _, _, target in patterns], **options)
+
+
+def parse_sequence(text):
+    commands = dict(COMMANDS)
+    steps = []
+    labels = {}
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        lexer = shlex.shlex(line, posix=True)
+        lexer.whitespace_split = True
+        lexer.escape = ""
+        lexer.commenters = ""
+        try:
+            tokens = list(lexer)
+        except ValueError as error:
+            raise SequenceError(f"line {line_number}: {error}") from None
+        action, args = tokens[0].lower(), tokens[1:]
+        if action not in STEP_ARGUMENTS:
+            raise SequenceError(f"line {line_number}: unknown step {action!r}")
+        minimum, maximum = STEP_ARGUMENTS[action]
+        if len(args) < minimum or (maximum is not None and len(args) > maximum):
+            expected = f"{minimum}" if minimum == maximum else f"at least {minimum}"
+            raise SequenceError(f"line {line_number}: {action} takes {expected} argument(s), got {len(args)}")
+        try:
+            if action == "send":
+                steps.append(Step("send", line_number, data=" ".join(args).encode() + b"\r\n"))
+            elif action == "send_hex":
+                steps.append(Step("send", line_number, data=bytes.fromhex("".join(args))))
+            elif action == "command":
+                name = " ".join(args)
+                if name not in commands:
+                    raise SequenceError(f"line {line_number}: unknown command {name!r}")
+                steps.append(Step("send", line_number, data=commands[name]))
+            elif action == "expect":
+                steps.append(parse_expect(args, line_number))
+            elif action == "wait":
+                steps.append(Step("wait", line_number, seconds=float(args[0]) / 1000))
+            elif action == "label":
+                labels[args[0]] = len(steps)
+            elif action == "goto":
+                steps.append(Step("goto", line_number, target=args[0]))
+            else:  # log, pass, fail
+                steps.append(Step(action, line_number, text=" ".join(args)))
+        except SequenceError:
+            raise
+        except ValueError as error:  # A bad number or hex string
+            raise SequenceError(f"line {line_number}: {error}") from None
+
+    for step in steps:
+        targets = [step.target] if step.action == "goto" else []
+        if step.action == "expect":
+            targets = [target for target in step.targets + [step.on_timeout] if target]
+        for target in targets:
+            if target not in labels:
+                raise SequenceError(f"line {step.line_number}: unknown label {target!r}")
+    return steps, labels
+
+
+def load_sequence(path):
+    with open(path, encoding="utf-8") as sequence_file:
+        return parse_sequence(sequence_file.read())
+
+
+class SequenceRunner:
+    # Runs a parsed sequence on its own thread. send(data) must not block for
+    # long (PortSession.send queues the data). feed_frames() is meant to be
+    # registered as a PortSession frame listener, so matching happens on the
+    # reader thread and never on the UI thread.
+    # on_event(kind, text) is called from the runner thread with kind one of
+    # "log", "send", "match", "timeout", "pass", "fail".
+    def __init__(self, steps, labels, send, on_event=None):
+        self.steps = steps
+        self.labels = labels
+        self.send = send
+        self.on_event = on_event or (lambda kind, text: None)
+        self.lock = threading.Lock()
+        self.matched = threading.Event()
+        self.expecting = None  # The expect step being waited on
+        self.match = None
+        self.recent = collections.deque(maxlen=256)  # Lines received since the last send
+        self.stop_requested = False
+        self.result = None  # (passed, message) once finished
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="sequence", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_requested = True
+        self.matched.set()
+
+    def feed_frames(self, frames):
+        if self.thread is None or self.result is not None:
+            return
+        lines = decode_text(frames)
+        with self.lock:
+            # Responses can arrive before the expect step starts waiting
+            self.recent.extend(lines)
+            if self.expecting is not None:
+                self.match_recent(self.expecting)
+
+    def match_recent(self, step):
+        # Caller holds self.lock. Consumes lines up to and including the match.
+        while self.recent:
+            match = step.matcher.search(self.recent.popleft())
+            if match is not None:
+                self.expecting = None
+                self.match = match
+                self.matched.set()
+                return True
+        return False
+
+    def transmit(self, data):
+        with self.lock:
+            self.recent.clear()
+        self.send(data)
+
+    def run(self):
+        index = 0
+        last_send = None
+        try:
+            while index < len(self.steps):
+                if self.stop_requested:
+                    return self.finish(False, "Stopped")
+                step = self.steps[index]
+                index += 1
+                if step.action == "send":
+                    last_send = step.data
+                    self.transmit(step.data)
+                    self.on_event("send", repr(step.data))
+                elif step.action == "expect":
+                    target = self.run_expect(step, last_send)
+                    if target is False:
+                        if self.stop_requested:
+                            return self.finish(False, "Stopped")
+                        return self.finish(False, f"line {step.line_number}: no matching response")
+                    if target is not None:
+                        index = self.labels[target]
+                elif step.action == "wait":
+                    time.sleep(step.seconds)
+                elif step.action == "goto":
+                    index = self.labels[step.target]
+                elif step.action == "log":
+                    self.on_event("log", step.text)
+                elif step.action == "pass":
+                    return self.finish(True, step.text or "Passed")
+                elif step.action == "fail":
+                    return self.finish(False, step.text or f"line {step.line_number}: fail")
+            return self.finish(True, "Passed")
+        except Exception as error:  # Report, don't kill the thread silently
+            return self.finish(False, f"Error: {error}")
+
+    def run_expect(self, step, last_send):
+        # Returns a label to jump to, None to continue, or False on failure
+        for attempt in range(step.retries + 1):
+            if attempt and last_send is not None:
+                self.transmit(last_send)
+                self.on_event("send", f"{last_send!r} (retry {attempt})")
+            with self.lock:
+                self.match = None
+                self.matched.clear()
+                self.expecting = step
+                self.match_recent(step)
+            self.matched.wait(step.timeout)
+            with self.lock:
+                self.expecting = None
+                match = self.match
+            if self.stop_requested:
+                return False
+            if match is not None:
+                self.on_event("match", match.group(0))
+                for branch, target in enumerate(step.targets):
+                    if match.group(f"b{branch}") is not None:
+                        return target
+            self.on_event("timeout", f"line {step.line_number}: no match within {step.timeout:g} s")
+        if step.on_timeout:
+            return step.on_timeout
+        return False
+
+    def finish(self, passed, message):
+        self.result = (passed, message)
+        self.on_event("pass" if passed else "fail", message)
@@ -0,0 +1,310 @@
+# Headless front end for the serial engine: no Tk, suitable for CI runners.
+#
+#   python serial_cli.py --port /dev/ttyUSB0 --duration 10
+#   python serial_cli.py --send script.txt --exit-after-script --capture captures
+#   python serial_cli.py --sequence production.seq      (see sequencer.py)
+#   python serial_cli.py --duration 60 --stats link.csv  (or .json for JSON Lines)
+#   python serial_cli.py --upload firmware.bin          (see upload.py)
+#   python serial_cli.py --decode "slip | fields"       (see decoders.py)
+#
+# Send scripts hold one payload per line, sent with CR LF appended. Blank
+# lines and lines starting with "#" are skipped. Directives:
+#   !wait MS        pause for MS milliseconds
+#   !hex AABBCC     send raw bytes
+#   !command NAME   send one of the command panel entries, e.g. "!command Product Info"
+import argparse
+import sys
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+import capture
+import decoders
+import sequencer
+import stats
+import upload
+from formatting import decode_text
+from serial_core import COMMANDS, LISTENING_REPLY, Settings, is_listening_prompt
+
+EXIT_OK = 0
+EXIT_PORT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PORT_LOST = 3
+EXIT_SCRIPT_ERROR = 4
+EXIT_SEQUENCE_FAILED = 5
+EXIT_UPLOAD_FAILED = 6
+
+
+def load_script(path):
+    commands = dict(COMMANDS)
+    steps = []
+    with open(path, encoding="utf-8") as script:
+        for number, line in enumerate(script, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            if line.startswith("!wait "):
+                steps.append(("wait", float(line[6:]) / 1000))
+            elif line.startswith("!hex "):
+                steps.append(("send", bytes.fromhex(line[5:])))
+            elif line.startswith("!command "):
+                name = line[9:].strip()
+                if name not in commands:
+                    raise ValueError(f"{path}:{number}: unknown command {name!r}")
+                steps.append(("send", commands[name]))
+            else:
+                steps.append(("send", line.encode() + b"\r\n"))
+    return steps
+
+
+class HeadlessRunner:
+    def __init__(self, settings, port_name, output, capture_writer=None, auto_reply=True, stats_exporter=None,
+                 pipeline=None):
+        self.settings = settings
+        self.output = output
+        self.capture_writer = capture_writer
+        self.auto_reply = auto_reply
+        self.stats_exporter = stats_exporter
+        self.data_ready = threading.Event()
+        self.session = settings.create_session(port_name, self.on_data)
+        self.session.capture_writer = capture_writer
+        # With a pipeline the output is decoded records instead of raw text
+        self.decoder = None
+        if pipeline is not None:
+            self.decoder = decoders.DecoderWorker(pipeline, self.on_data, settings.port_queue_size, settings.idle_gap)
+            self.session.frame_listeners.append(self.decoder.feed_frames)
+
+    def on_data(self, session):
+        self.data_ready.set()
+
+    def send(self, data):
+        # Blocks only when the outgoing queue is full, which paces the script
+        return self.session.send(data, timeout=None)
+
+    def play_script(self, steps, done):
+        for action, value in steps:
+            if not self.session.running:
+                break
+            if action == "wait":
+                time.sleep(value)
+            else:
+                self.send(value)
+        self.session.wait_sent()
+        done.set()
+
+    def drain(self):
+        if self.decoder is not None:
+            self.write_records(self.decoder.drain())
+        frames = self.session.drain()
+        if not frames:
+            return
+        if self.decoder is None:
+            lines = decode_text(frames)
+            self.output.write("".join(line + "\n" for line in lines))
+            self.output.flush()
+        if self.auto_reply and is_listening_prompt(frames):
+            self.send(LISTENING_REPLY)
+
+    def write_records(self, records):
+        if not records:
+            return
+        lines = [str(item) if isinstance(item, decoders.Record) else decode_text([item])[0] for item in records]
+        self.output.write("".join(line + "\n" for line in lines))
+        self.output.flush()
+
+    def report_decoder_costs(self):
+        for name, seconds, items_in, items_out in self.decoder.pipeline.costs():
+            cost = seconds / items_in * 1e6 if items_in else 0.0
+            self.report("decode", f"{name}: {items_in} in, {items_out} out, {seconds:.3f} s, {cost:.2f} us/item")
+        if self.decoder.dropped_batches:
+            self.report("decode", f"{self.decoder.dropped_batches} batches dropped")
+
+    def report(self, kind, text):
+        print(f"[{kind}] {text}", file=sys.stderr, flush=True)
+
+    def report_upload(self, uploader):
+        # Uploader thread; a progress line per state change and every 10%
+        step = max(1, uploader.total_blocks // 10)
+        if uploader.state != "Uploading" or uploader.acked % step == 0:
+            self.report("upload", f"{uploader.state}: block {uploader.acked}/{uploader.total_blocks}, "
+                                  f"{uploader.throughput / 1000:.1f} kB/s, {uploader.retransmits} blocks resent")
+
+    def run(self, steps=None, duration=None, exit_after_script=False, sequence=None, payload=None):
+        self.session.open()
+        if self.decoder is not None:
+            self.decoder.start()
+        script_done = threading.Event()
+        if steps:
+            threading.Thread(target=self.play_script, args=(steps, script_done), daemon=True).start()
+        else:
+            script_done.set()
+
+        runner = None
+        if sequence is not None:
+            runner = sequencer.SequenceRunner(sequence[0], sequence[1], self.send, self.report)
+            self.session.frame_listeners.append(runner.feed_frames)
+            runner.start()
+
+        uploader = None
+        if payload is not None:
+            uploader = upload.BulkUploader(payload, self.send, self.report_upload, self.session.connected.is_set,
+                                           **self.settings.upload_options())
+            self.session.frame_listeners.append(uploader.feed_frames)
+            uploader.start()
+
+        deadline = time.monotonic() + duration if duration else None
+        next_sample = time.monotonic() + self.settings.stats_interval
+        try:
+            while self.session.running:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if self.stats_exporter is not None and now >= next_sample:
+                    self.stats_exporter.write(self.session.stats_snapshot())
+                    next_sample = now + self.settings.stats_interval
+                if exit_after_script and script_done.is_set():
+                    time.sleep(self.settings.idle_gap)  # Let the last reply arrive
+                    break
+                if runner is not None and runner.result is not None:
+                    self.session.wait_sent()
+                    break
+                if uploader is not None and uploader.result is not None:
+                    self.report("upload", uploader.result[1])
+                    break
+                if self.data_ready.wait(timeout=0.1):
+                    self.data_ready.clear()
+                    self.drain()
+        except KeyboardInterrupt:
+            pass
+        lost = not self.session.running and self.session.error is not None
+        if runner is not None:
+            runner.stop()
+        if uploader is not None:
+            uploader.stop()
+        self.session.close()
+        if self.decoder is not None:
+            time.sleep(self.decoder.idle_gap * 2)  # Let the worker flush what the reader delivered last
+            self.decoder.stop()
+        self.drain()
+        if self.decoder is not None:
+            self.report_decoder_costs()
+        if self.stats_exporter is not None:
+            self.stats_exporter.write(self.session.stats_snapshot())
+        if lost:
+            return EXIT_PORT_LOST
+        if runner is not None and not (runner.result and runner.result[0]):
+            return EXIT_SEQUENCE_FAILED
+        if uploader is not None and not (uploader.result and uploader.result[0]):
+            return EXIT_UPLOAD_FAILED
+        return EXIT_OK
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless serial monitor using the settings.ini engine.")
+    parser.add_argument("--settings", default="settings.ini", help="settings file (default: settings.ini)")
+    parser.add_argument("--port", help="port name or pyserial URL (default: [Serial] port)")
+    parser.add_argument("--baud", help="override [Serial] baud_rate")
+    parser.add_argument("--capture", metavar="DIR", help="also write RX/TX to capture files in DIR")
+    parser.add_argument("--send", metavar="SCRIPT", help="send script to replay after opening the port")
+    parser.add_argument("--exit-after-script", action="store_true", help="exit once the send script has finished")
+    parser.add_argument("--sequence", metavar="FILE", help="run a command/expect sequence and exit with its result")
+    parser.add_argument("--upload", metavar="FILE", help="upload FILE with the block/ACK protocol and exit with its result")
+    parser.add_argument("--duration", type=float, help="exit after this many seconds")
+    parser.add_argument("--no-reply", action="store_true", help="do not answer the '.' listening prompt")
+    parser.add_argument("--no-reconnect", action="store_true", help="exit when the port is lost instead of reopening it")
+    parser.add_argument("--decode", nargs="?", const="", metavar="PIPELINE",
+                        help="print decoded records instead of text (default pipeline: [Decode] pipeline)")
+    parser.add_argument("--output", metavar="FILE", help="write RX text here instead of stdout")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="append link statistics every [Statistics] interval_ms (.csv, or .json for JSON Lines)")
+    parser.add_argument("--list", action="store_true", help="list serial ports and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for port in serial.tools.list_ports.comports():
+            print(f"{port.device}\t{port.description}")
+        return EXIT_OK
+
+    settings = Settings(args.settings)
+    if args.baud:
+        settings.baud_rate = args.baud
+    if args.no_reconnect:
+        settings.reconnect_delay = 0
+    port_name = args.port or settings.port
+    if not port_name:
+        print("No port given and [Serial] port is empty in settings", file=sys.stderr)
+        return EXIT_USAGE
+
+    steps = None
+    if args.send:
+        try:
+            steps = load_script(args.send)
+        except (OSError, ValueError) as error:
+            print(f"Cannot load send script: {error}", file=sys.stderr)
+            return EXIT_SCRIPT_ERROR
+
+    sequence = None
+    if args.sequence:
+        try:
+            sequence = sequencer.load_sequence(args.sequence)
+        except (OSError, ValueError) as error:
+            print(f"Cannot load sequence: {error}", file=sys.stderr)
+            return EXIT_SCRIPT_ERROR
+
+    pipeline = None
+    if args.decode is not None:
+        try:
+            pipeline = decoders.Pipeline.from_spec(args.decode or settings.decode_pipeline)
+        except ValueError as error:
+            print(f"Invalid decoder pipeline: {error}", file=sys.stderr)
+            return EXIT_USAGE
+
+    payload = None
+    if args.upload:
+        try:
+            with open(args.upload, "rb") as payload_file:
+                payload = payload_file.read()
+        except OSError as error:
+            print(f"Cannot load upload payload: {error}", file=sys.stderr)
+            return EXIT_SCRIPT_ERROR
+
+    stats_file = args.stats or settings.stats_export_file
+    try:
+        stats_exporter = stats.StatsExporter(stats_file) if stats_file else None
+    except OSError as error:
+        print(f"Cannot open statistics file: {error}", file=sys.stderr)
+        return EXIT_USAGE
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    capture_writer = None
+    if args.capture:
+        capture_writer = capture.CaptureWriter(
+            args.capture,
+            max_bytes=settings.capture_max_bytes,
+            max_seconds=settings.capture_max_seconds,
+        )
+    try:
+        try:
+            runner = HeadlessRunner(settings, port_name, output, capture_writer, auto_reply=not args.no_reply,
+                                    stats_exporter=stats_exporter, pipeline=pipeline)
+        except ValueError as error:
+            print(f"Invalid serial settings: {error}", file=sys.stderr)
+            return EXIT_USAGE
+        try:
+            return runner.run(steps, args.duration, args.exit_after_script, sequence, payload)
+        except serial.SerialException as error:
+            print(f"Cannot open {port_name}: {error}", file=sys.stderr)
+            return EXIT_PORT_ERROR
+    finally:
+        if capture_writer is not None:
+            capture_writer.close()
+        if stats_exporter is not None:
+            stats_exporter.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,612 @@
+# Serial engine shared by the GUI and the headless CLI. Nothing in here
+# imports tkinter, so it can run on machines without a display.
+import collections
+import configparser
+import queue
+import threading
+import time
+
+import serial
+
+import capture
+import stats
+
+SETTINGS_FILE = "settings.ini"
+
+# The MCU prints "." when it enters listening mode and expects five ESCs back
+LISTENING_PROMPT = b"."
+LISTENING_REPLY = b"\x1B\x1B\x1B\x1B\x1B"
+
+COMMANDS = [
+    ("Product Info", b"3:PRD?\r\n"),
+    ("Firmware Version", b"3:FWV?\r\n"),
+    ("Set IR Library", b"3:irdev-B079010FE20FE20FE20F000100103600240ED80100000000100010001000320100000200051E0900001003C900860041090800100536008600410910001005360086004100240011DA2700C50000D711DA27004200005411DA270000392000A0000006600000C18000C5151E051501D4D80F051502D4D800081E003840004048D7081E013840104048E70B1003C8CC0A03C8CC0303C8CC0503C8CC071616045F004806043F003606083F04123704153F091E37040C0803CCD00F03CCD00000D4070104000216080605040111232302030217020A1A03B0B40303B0B40403B0B40006B0B406B8C03206B0B402B8C0C0170A1E05010300051E010100147F04090A081205036108064807801603F016010A078089C008890B06200100021B1C4149C13C007800B400F0002C016801A401E0011C0258029402D002010505036109063607801603F016010D078089C009890B061A0100021C1D414991C6038607460B060FC6128616461A061EC6210105060001A11E0001060001B1210084\r\n"),
+]
+
+FLOW_CONTROL = {
+    "None": {},
+    "RTS/CTS": {"rtscts": True},
+    "XON/XOFF": {"xonxoff": True},
+}
+
+PARITIES = {
+    "None": serial.PARITY_NONE,
+    "Even": serial.PARITY_EVEN,
+    "Odd": serial.PARITY_ODD,
+    "Mark": serial.PARITY_MARK,
+    "Space": serial.PARITY_SPACE,
+}
+
+
+def check_option(name, value, known, convert=str):
+    # settings.ini is hand-edited, so name the bad value instead of failing later in pyserial
+    try:
+        checked = convert(value)
+    except (TypeError, ValueError):
+        checked = None
+    if checked not in known:
+        raise ValueError(f"invalid {name} {value!r} (expected {', '.join(map(str, known))})")
+    return checked
+
+
+class Settings:
+    # Plain values from settings.ini; the GUI wraps the [Serial] ones in StringVars
+    def __init__(self, path=SETTINGS_FILE):
+        config = configparser.ConfigParser()
+        config.read(path)
+
+        self.port = config.get("Serial", "port", fallback="")
+        self.baud_rate = config.get("Serial", "baud_rate", fallback="19200")
+        self.data_bits = config.get("Serial", "data_bits", fallback="8")
+        self.stop_bits = config.get("Serial", "stop_bits", fallback="1")
+        self.parity = config.get("Serial", "parity", fallback="None")
+        self.flow_control = config.get("Serial", "flow_control", fallback="None")
+
+        # Upper bound for how often received data is pushed into the monitors
+        self.refresh_rate = max(1, config.getint("Display", "refresh_rate", fallback=30))
+        self.log_max_lines = config.getint("Display", "log_max_lines", fallback=100000)
+        self.log_max_bytes = config.getint("Display", "log_max_bytes", fallback=8 * 1024 * 1024)
+        self.view_lines = config.getint("Display", "view_lines", fallback=2000)
+
+        # Receive framing; delimiter uses Python escapes such as \n or \x03
+        self.frame_mode = config.get("Receive", "frame_mode", fallback="delimiter")
+        delimiter = config.get("Receive", "delimiter", fallback="\\n")
+        self.frame_delimiter = delimiter.encode("latin-1").decode("unicode_escape").encode("latin-1")
+        self.frame_length = config.getint("Receive", "frame_length", fallback=0)
+        self.idle_gap = config.getfloat("Receive", "idle_gap_ms", fallback=50) / 1000
+        self.read_timeout = config.getfloat("Receive", "read_timeout_ms", fallback=20) / 1000
+        self.read_chunk_size = config.getint("Receive", "chunk_size", fallback=16384)
+        self.port_queue_size = config.getint("Receive", "port_queue_size", fallback=1024)
+
+        # Outgoing data is written in chunks, optionally with a pause between them
+        self.tx_queue_size = config.getint("Transmit", "queue_size", fallback=64)
+        self.tx_chunk_size = config.getint("Transmit", "chunk_size", fallback=256)
+        self.tx_pace = config.getfloat("Transmit", "pace_ms", fallback=0) / 1000
+
+        # Capture files rotate when either limit is reached (0 disables it)
+        self.capture_directory = config.get("Capture", "directory", fallback="captures")
+        self.capture_max_bytes = config.getint("Capture", "rotate_mb", fallback=256) * 1024 * 1024
+        self.capture_max_seconds = config.getint("Capture", "rotate_minutes", fallback=60) * 60
+
+        # Link statistics panel refresh and optional export (.csv, or .json for JSON Lines)
+        self.stats_interval = max(0.1, config.getfloat("Statistics", "interval_ms", fallback=1000) / 1000)
+        self.stats_export_file = config.get("Statistics", "export_file", fallback="")
+
+        # Ports are rescanned in the background; a lost port is reopened with
+        # exponential backoff from delay_ms up to max_delay_ms (0 disables it)
+        self.scan_interval = max(0.1, config.getfloat("Discovery", "scan_interval_ms", fallback=1000) / 1000)
+        self.reconnect_delay = config.getfloat("Reconnect", "delay_ms", fallback=500) / 1000
+        self.reconnect_max_delay = config.getfloat("Reconnect", "max_delay_ms", fallback=30000) / 1000
+
+        # Telemetry plot: pattern picks the numeric fields (empty: every number
+        # in the line); capacity is samples kept per channel
+        self.plot_pattern = config.get("Plot", "pattern", fallback="", raw=True)
+        self.plot_capacity = max(1, config.getint("Plot", "capacity", fallback=100000))
+        self.plot_max_channels = config.getint("Plot", "max_channels", fallback=8)
+        self.plot_refresh_rate = max(1, config.getint("Plot", "refresh_rate", fallback=10))
+
+        # Bulk uploads: payload bytes per block, blocks in flight before an
+        # ACK is needed, and how long to wait for one before going back
+        self.upload_block_size = max(1, config.getint("Upload", "block_size", fallback=256))
+        self.upload_window = max(1, config.getint("Upload", "window", fallback=4))
+        self.upload_timeout = config.getfloat("Upload", "timeout_ms", fallback=2000) / 1000
+        self.upload_retries = config.getint("Upload", "retries", fallback=5)
+
+        # Decoder pipeline for the decoder window and the CLI's --decode,
+        # e.g. "fields" or "slip | fields"; decoders.py lists the stages
+        self.decode_pipeline = config.get("Decode", "pipeline", fallback="fields", raw=True)
+
+        # Highlight rules, "name = color regex", applied to received lines in order
+        self.highlight_rules = []
+        if config.has_section("Highlight"):
+            for name, value in config.items("Highlight", raw=True):
+                color, _, pattern = value.strip().partition(" ")
+                if pattern.strip():
+                    self.highlight_rules.append((name, color, pattern.strip()))
+
+    def port_options(self, data_bits=None, stop_bits=None, parity=None, flow_control=None):
+        options = {
+            "bytesize": check_option("data bits", data_bits or self.data_bits, serial.SerialBase.BYTESIZES, int),
+            "stopbits": check_option("stop bits", stop_bits or self.stop_bits, serial.SerialBase.STOPBITS, float),
+            "parity": PARITIES[check_option("parity", parity or self.parity, PARITIES)],
+        }
+        options.update(FLOW_CONTROL[check_option("flow control", flow_control or self.flow_control, FLOW_CONTROL)])
+        return options
+
+    def transmit_options(self):
+        return {
+            "tx_queue_size": self.tx_queue_size,
+            "tx_chunk_size": self.tx_chunk_size,
+            "tx_pace": self.tx_pace,
+        }
+
+    def reconnect_options(self):
+        return {
+            "reconnect_delay": self.reconnect_delay,
+            "reconnect_max_delay": self.reconnect_max_delay,
+        }
+
+    def upload_options(self):
+        return {
+            "block_size": self.upload_block_size,
+            "window": self.upload_window,
+            "timeout": self.upload_timeout,
+            "retries": self.upload_retries,
+        }
+
+    def create_frame_splitter(self):
+        return FrameSplitter(
+            mode=self.frame_mode,
+            delimiter=self.frame_delimiter,
+            frame_length=self.frame_length,
+            idle_gap=self.idle_gap,
+        )
+
+    def create_session(self, port_name, on_data, baud_rate=None, link_stats=None, resolve_port=None):
+        return PortSession(
+            port_name,
+            int(baud_rate or self.baud_rate),
+            self.create_frame_splitter(),
+            on_data,
+            queue_size=self.port_queue_size,
+            read_timeout=self.read_timeout,
+            chunk_size=self.read_chunk_size,
+            port_options=self.port_options(),
+            link_stats=link_stats,
+            resolve_port=resolve_port,
+            **self.transmit_options(),
+            **self.reconnect_options(),
+        )
+
+
+def is_listening_prompt(frames):
+    return any(frame.strip() == LISTENING_PROMPT for frame in frames)
+
+
+class LogBuffer:
+    # In-memory line store behind the monitors, capped in lines and bytes.
+    # Every line gets a sequence number; first_seq is the oldest one kept.
+    def __init__(self, max_lines=100000, max_bytes=8 * 1024 * 1024):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.lines = collections.deque()
+        self.total_bytes = 0
+        self.dropped_lines = 0
+        self.first_seq = 0
+
+    @property
+    def next_seq(self):
+        return self.first_seq + len(self.lines)
+
+    def extend(self, lines):
+        self.lines.extend(lines)
+        self.total_bytes += sum(len(line) for line in lines)
+        self.trim()
+
+    def trim(self):
+        excess = len(self.lines) - self.max_lines
+        while self.lines and (excess > 0 or self.total_bytes > self.max_bytes):
+            self.total_bytes -= len(self.lines.popleft())
+            self.dropped_lines += 1
+            self.first_seq += 1
+            excess -= 1
+
+    def tail(self, count):
+        start = max(0, len(self.lines) - count)
+        return [self.lines[i] for i in range(start, len(self.lines))]
+
+    def clear(self):
+        self.first_seq += len(self.lines)
+        self.lines.clear()
+        self.total_bytes = 0
+
+
+class FrameSplitter:
+    # Splits a raw byte stream into frames incrementally.
+    # mode "delimiter": frames end with delimiter (a partial frame is flushed after idle_gap)
+    # mode "idle": a frame is whatever arrived before a gap of idle_gap seconds
+    # mode "fixed": frames are exactly frame_length bytes
+    # mode "raw": every read is passed on as it is, for a decoder pipeline
+    # that does its own framing (see decoders.py)
+    def __init__(self, mode="delimiter", delimiter=b"\n", frame_length=0, idle_gap=0.05, max_frame=65536):
+        if mode == "fixed" and frame_length <= 0:
+            raise ValueError("frame_length must be positive in fixed mode")
+        self.mode = mode
+        self.delimiter = delimiter
+        self.frame_length = frame_length
+        self.idle_gap = idle_gap
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+        self.scan_from = 0  # Bytes before this offset hold no delimiter
+        self.last_data_time = 0.0
+
+    def feed(self, data, now):
+        if self.mode == "raw":
+            self.last_data_time = now
+            return [bytes(data)]
+        self.buffer.extend(data)
+        self.last_data_time = now
+        frames = []
+        if self.mode == "delimiter":
+            start = 0
+            width = len(self.delimiter)
+            index = self.buffer.find(self.delimiter, self.scan_from)
+            while index != -1:
+                frames.append(bytes(self.buffer[start:index]))
+                start = index + width
+                index = self.buffer.find(self.delimiter, start)
+            # Drop consumed bytes once per chunk rather than once per frame
+            del self.buffer[:start]
+            self.scan_from = max(0, len(self.buffer) - width + 1)
+        elif self.mode == "fixed":
+            usable = len(self.buffer) - len(self.buffer) % self.frame_length
+            for start in range(0, usable, self.frame_length):
+                frames.append(bytes(self.buffer[start:start + self.frame_length]))
+            del self.buffer[:usable]
+        if self.mode != "fixed" and len(self.buffer) >= self.max_frame:
+            frames.append(bytes(self.buffer))
+            self.buffer.clear()
+            self.scan_from = 0
+        return frames
+
+    def flush_idle(self, now):
+        if self.mode == "fixed" or not self.buffer or now - self.last_data_time < self.idle_gap:
+            return []
+        frame = bytes(self.buffer)
+        self.buffer.clear()
+        self.scan_from = 0
+        return [frame]
+
+
+class SerialReader:
+    # Reads everything waiting on the port in one call into a reusable buffer
+    # and returns the complete frames, so callers queue one batch per read.
+    def __init__(self, serial_port, splitter, chunk_size=16384, link_stats=None):
+        self.serial_port = serial_port
+        self.splitter = splitter
+        self.link_stats = link_stats or stats.LinkStats()
+        self.chunk = bytearray(chunk_size)
+        self.view = memoryview(self.chunk)
+
+    def read_frames(self):
+        # When nothing is waiting this blocks for one byte up to the port timeout
+        size = max(1, min(self.serial_port.in_waiting, len(self.chunk)))
+        count = self.serial_port.readinto(self.view[:size])
+        now = time.monotonic()
+        if count:
+            frames = self.splitter.feed(self.view[:count], now)
+            self.link_stats.rx_bytes += count
+        else:
+            frames = self.splitter.flush_idle(now)
+        self.link_stats.rx_frames += len(frames)
+        return frames
+
+
+class TransmitJob:
+    # One payload in the outgoing queue. on_done(job) runs on the writer
+    # thread once the last byte is written or the write failed.
+    def __init__(self, data, on_done=None):
+        self.data = data
+        self.on_done = on_done
+        self.sent = 0
+        self.error = None
+        self.finished_at = None
+
+
+class PortSession:
+    # One open port with its own reader thread and bounded queue of frame batches,
+    # plus a writer thread servicing a bounded queue of TransmitJobs.
+    # on_data(session) is called from the I/O threads after each queued batch,
+    # after each chunk written and when the port is lost or reopened, so
+    # callers can refresh their views.
+    # With reconnect_delay set, a lost port is reopened in the background with
+    # exponential backoff. The queues, the partial frame and the statistics
+    # survive, and queued sends wait for the port to come back. resolve_port()
+    # returns the device name to reopen (a re-enumerated USB adapter may come
+    # back under a new one), or None while the device is absent. port_name
+    # stays the name the session was opened with; device is the current one.
+    def __init__(self, port_name, baud_rate, splitter, on_data, queue_size=1024, read_timeout=0.02, chunk_size=16384,
+                 port_options=None, tx_queue_size=64, tx_chunk_size=256, tx_pace=0.0, link_stats=None,
+                 reconnect_delay=0.0, reconnect_max_delay=30.0, resolve_port=None):
+        self.port_name = port_name
+        self.device = port_name
+        self.baud_rate = baud_rate
+        self.splitter = splitter
+        self.on_data = on_data
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.read_timeout = read_timeout
+        self.chunk_size = chunk_size
+        self.port_options = port_options or {}
+        self.capture_writer = None  # Set to a capture.CaptureWriter to record RX and TX
+        self.frame_listeners = []  # Called with each frame batch on the reader thread
+        self.serial_port = None
+        self.thread = None
+        self.running = False
+        self.dropped_batches = 0
+        self.error = None
+        self.link_stats = link_stats or stats.LinkStats()
+
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.resolve_port = resolve_port or (lambda: self.port_name)
+        self.connected = threading.Event()
+        self.stop_event = threading.Event()  # Interrupts the backoff wait on close()
+
+        self.tx_queue = queue.Queue(maxsize=tx_queue_size)
+        self.tx_chunk_size = tx_chunk_size
+        self.tx_pace = tx_pace
+        self.tx_lock = threading.Lock()
+        self.tx_room = threading.Condition(self.tx_lock)  # Notified when a job leaves tx_queue
+        self.tx_bytes_pending = 0  # Queued plus not yet written of the current job
+        self.writer_thread = None
+
+    def open(self):
+        self.open_port(self.port_name)
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name=f"reader-{self.port_name}", daemon=True)
+        self.thread.start()
+        self.writer_thread = threading.Thread(target=self.run_writer, name=f"writer-{self.port_name}", daemon=True)
+        self.writer_thread.start()
+
+    def open_port(self, port_name):
+        # serial_for_url also accepts plain device names
+        self.serial_port = serial.serial_for_url(port_name, self.baud_rate, timeout=self.read_timeout,
+                                                  **self.port_options)
+        self.device = port_name
+        self.link_stats.record_open(self.serial_port)
+        self.connected.set()
+
+    @property
+    def reconnecting(self):
+        return self.running and not self.connected.is_set()
+
+    def run(self):
+        while self.running:
+            self.read_until_error()
+            if not self.running:
+                break
+            # Whatever was half received belongs to the old connection
+            self.deliver(self.splitter.flush_idle(float("inf")))
+            self.connected.clear()
+            if not self.reconnect_delay:
+                self.running = False
+            self.on_data(self)  # Let the consumer notice the lost port
+            if not self.reconnect_delay or not self.reopen():
+                break
+        self.running = False
+
+    def read_until_error(self):
+        reader = SerialReader(self.serial_port, self.splitter, self.chunk_size, self.link_stats)
+        while self.running:
+            try:
+                frames = reader.read_frames()
+            except (serial.SerialException, OSError, TypeError, AttributeError) as error:
+                # TypeError, AttributeError: pyserial's read() after close() from
+                # another thread (serial ports and socket:// respectively)
+                if self.running:
+                    self.error = error
+                    self.link_stats.read_errors += 1
+                return
+            self.deliver(frames)
+
+    def deliver(self, frames):
+        if not frames:
+            return
+        capture_writer = self.capture_writer
+        if capture_writer is not None:
+            capture_writer.write(capture.RX, frames)
+        for listener in self.frame_listeners:
+            listener(frames)
+        try:
+            self.queue.put_nowait((time.monotonic(), frames))
+        except queue.Full:
+            self.dropped_batches += 1  # UI is behind; keep reading regardless
+            return
+        self.on_data(self)
+
+    def reopen(self):
+        try:
+            self.serial_port.close()
+        except (serial.SerialException, OSError):
+            pass
+        delay = self.reconnect_delay
+        while not self.stop_event.wait(delay):
+            port_name = self.resolve_port()
+            if port_name is not None:
+                try:
+                    self.open_port(port_name)
+                except (serial.SerialException, OSError, ValueError):
+                    pass
+                else:
+                    self.error = None
+                    self.link_stats.reconnects += 1
+                    self.on_data(self)
+                    return True
+            delay = min(delay * 2, self.reconnect_max_delay)
+        return False
+
+    def send(self, data, on_done=None, timeout=0.0):
+        # By default never blocks: raises queue.Full when the outgoing queue is
+        # at capacity. With a timeout in seconds, or None for no limit, waits
+        # that long for room instead, which paces a script or an upload.
+        # Raises SerialException once the session has been closed.
+        job = TransmitJob(data, on_done)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.tx_room:
+            while True:
+                # Checked under the lock, so nothing is queued after the
+                # writer has failed what close() left behind
+                if self.stop_event.is_set():
+                    raise serial.SerialException("Port closed")
+                try:
+                    self.tx_queue.put_nowait(job)
+                    break
+                except queue.Full:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise
+                    self.tx_room.wait(remaining)
+            self.tx_bytes_pending += len(data)
+        return job
+
+    @property
+    def tx_queue_depth(self):
+        return self.tx_queue.qsize()
+
+    def wait_sent(self, timeout=None):
+        # True once every queued job has been written or has failed; False
+        # after timeout seconds, or as soon as there is no writer left to
+        # finish them (never opened, closed, or died)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.tx_queue.all_tasks_done:
+            while self.tx_queue.unfinished_tasks:
+                if self.writer_thread is None or not self.writer_thread.is_alive():
+                    return False
+                wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+                self.tx_queue.all_tasks_done.wait(wait)
+        return True
+
+    def run_writer(self):
+        while not self.stop_event.is_set():
+            try:
+                job = self.tx_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.write_job(job)
+        # Fail whatever is still queued; running is False by now, and send()
+        # sees stop_event, so nothing new arrives
+        while True:
+            try:
+                job = self.tx_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.write_job(job)
+
+    def write_job(self, job):
+        with self.tx_room:
+            self.tx_room.notify_all()
+        view = memoryview(job.data)
+        try:
+            while job.sent < len(view):
+                if not self.running:
+                    raise serial.SerialException("Port closed")
+                if not self.connected.wait(0.1):
+                    continue  # Hold the job until the port is reopened
+                try:
+                    count = self.serial_port.write(view[job.sent:job.sent + self.tx_chunk_size])
+                except (serial.SerialException, OSError, TypeError):
+                    if not self.reconnect_delay:
+                        raise
+                    # The reader notices the loss too and reopens the port
+                    time.sleep(0.05)
+                    continue
+                job.sent += count
+                self.link_stats.tx_bytes += count
+                with self.tx_lock:
+                    self.tx_bytes_pending -= count
+                self.on_data(self)
+                if self.tx_pace and job.sent < len(view):
+                    time.sleep(self.tx_pace)
+        except (serial.SerialException, OSError, TypeError) as error:
+            job.error = error
+            self.link_stats.write_errors += 1
+            with self.tx_lock:
+                self.tx_bytes_pending -= len(view) - job.sent
+        job.finished_at = time.time()
+        if job.error is None:
+            self.link_stats.tx_frames += 1
+        capture_writer = self.capture_writer
+        if capture_writer is not None and job.sent:
+            capture_writer.write(capture.TX, [job.data[:job.sent]], job.finished_at)
+        try:
+            if job.on_done is not None:
+                job.on_done(job)
+        finally:
+            self.tx_queue.task_done()
+
+    def drain(self):
+        frames = []
+        oldest = None
+        try:
+            while True:
+                queued_at, batch = self.queue.get_nowait()
+                if oldest is None:
+                    oldest = queued_at
+                frames.extend(batch)
+        except queue.Empty:
+            pass
+        if oldest is not None:
+            # How long the oldest batch waited for the consumer
+            self.link_stats.record_drain(time.monotonic() - oldest)
+        return frames
+
+    def stats_snapshot(self):
+        return self.link_stats.snapshot(self)
+
+    def close(self):
+        self.running = False
+        with self.tx_room:
+            self.stop_event.set()
+            self.tx_room.notify_all()  # Wake senders waiting for room
+        if self.serial_port is not None:
+            if hasattr(self.serial_port, "cancel_write"):
+                self.serial_port.cancel_write()  # Unblock a write held by flow control
+            self.serial_port.close()
+        # stop_event also ends the writer, which fails whatever is still queued
+        for thread in (self.thread, self.writer_thread):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+
+
+class SessionManager:
+    # Keeps any number of PortSessions, keyed by port name
+    def __init__(self, on_data, splitter_factory=FrameSplitter, **session_options):
+        self.on_data = on_data
+        self.splitter_factory = splitter_factory
+        self.session_options = session_options
+        self.sessions = {}
+
+    def open(self, port_name, baud_rate, resolve_port=None):
+        if port_name in self.sessions:
+            return self.sessions[port_name]
+        session = PortSession(port_name, baud_rate, self.splitter_factory(), self.on_data, resolve_port=resolve_port,
+                              **self.session_options)
+        try:
+            session.open()
+        except BaseException:
+            session.close()  # Release a port that opened before the failure
+            raise
+        self.sessions[port_name] = session
+        return session
+
+    def close(self, port_name):
+        session = self.sessions.pop(port_name, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        for port_name in list(self.sessions):
+            self.close(port_name)
@@ -0,0 +1,249 @@
+# Simulated MCU on a Linux pseudo-terminal, for benchmarks and CI runs
+# without serial hardware.
+#
+#   python simulator.py                      prints the device path, then serves
+#   python simulator.py --stream 200000      also streams lines at 200 kB/s (0: flat out)
+#   python serial_cli.py --port /dev/pts/7 --send script.txt
+#
+# The device answers the command panel entries:
+#   3:PRD?        -> PRD:<product>
+#   3:FWV?        -> FWV:<version>
+#   3:irdev-HEX   -> IRDEV:OK:<bytes>   (IRDEV:ERR for an odd-length or non-hex payload)
+#   3:UPL, 3:BLK, 3:END -> the bulk upload protocol described in upload.py
+#   anything else -> ERR
+# prompt() prints "." and enters listening mode, which ends when five ESCs
+# arrive (counted in listening_replies). A stream sends lines of
+# "seq,perf_counter,padding" at a fixed byte rate, so readers on this
+# machine can measure latency from the timestamp. block_error_rate makes
+# that fraction of upload blocks fail their checksum, to exercise retries.
+import argparse
+import os
+import random
+import select
+import sys
+import threading
+import time
+import zlib
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = None
+
+PRODUCT = b"SerialGUI-SIM"
+FIRMWARE = b"1.0.0"
+ESCAPES = b"\x1B" * 5
+
+
+class SimulatedMCU:
+    def __init__(self, product=PRODUCT, firmware=FIRMWARE, response_delay=0.0, block_error_rate=0.0):
+        if termios is None:
+            raise RuntimeError("the simulator needs a POSIX pseudo-terminal")
+        self.product = product
+        self.firmware = firmware
+        self.response_delay = response_delay
+        self.block_error_rate = block_error_rate
+        self.random = random.Random(0)
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # No echo or CR/LF translation before a client opens it
+        self.port_name = os.ttyname(self.slave)
+        self.write_lock = threading.Lock()
+        self.running = False
+        self.listening = False
+        self.listening_replies = 0
+        self.commands = 0
+        self.upload = None  # Transfer in progress, kept so it can be resumed
+        self.uploaded = []  # Completed payloads
+        self.stream_thread = None
+        self.stream_stop = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="simulator", daemon=True)
+        self.thread.start()
+        return self
+
+    def write(self, data):
+        view = memoryview(data)
+        with self.write_lock:
+            while view:
+                try:
+                    count = os.write(self.master, view)
+                except BlockingIOError:
+                    time.sleep(0.001)
+                    continue
+                except OSError:
+                    return  # Closed underneath us
+                view = view[count:]
+
+    def run(self):
+        buffer = bytearray()
+        while self.running:
+            try:
+                # Wake up regularly so close() does not depend on the pty raising
+                if not select.select([self.master], [], [], 0.1)[0]:
+                    continue
+                data = os.read(self.master, 65536)
+            except OSError:
+                break  # EIO once the pty is closed
+            if not data:
+                break
+            buffer += data
+            if self.listening and ESCAPES in buffer:
+                del buffer[:buffer.index(ESCAPES) + len(ESCAPES)]
+                self.listening = False
+                self.listening_replies += 1
+            while True:
+                end = buffer.find(b"\n")
+                if end == -1:
+                    break
+                line = bytes(buffer[:end]).rstrip(b"\r")
+                del buffer[:end + 1]
+                if line:
+                    self.respond(line)
+
+    def respond(self, line):
+        self.commands += 1
+        if self.response_delay:
+            time.sleep(self.response_delay)
+        if line == b"3:PRD?":
+            reply = b"PRD:" + self.product
+        elif line == b"3:FWV?":
+            reply = b"FWV:" + self.firmware
+        elif line.startswith(b"3:irdev-"):
+            payload = line[8:]
+            try:
+                reply = b"IRDEV:OK:%d" % len(bytes.fromhex(payload.decode("ascii")))
+            except ValueError:
+                reply = b"IRDEV:ERR"
+        elif line.startswith(b"3:UPL ") or line.startswith(b"3:BLK ") or line.startswith(b"3:END "):
+            reply = self.respond_upload(line[2:5], line[6:].split())
+        else:
+            reply = b"ERR"
+        if reply:
+            self.write(reply + b"\r\n")
+
+    def respond_upload(self, command, args):
+        upload = self.upload
+        try:
+            if command == b"UPL":
+                size, block_size, crc = int(args[0]), int(args[1]), int(args[2], 16)
+                if block_size <= 0:
+                    return b"UPL:ERR block size"
+                if upload is None or upload["key"] != (size, block_size, crc):
+                    self.upload = upload = {"key": (size, block_size, crc), "data": bytearray(), "naked": False,
+                                            "blocks": max(1, -(-size // block_size))}
+                return b"UPL:OK %d" % (len(upload["data"]) // block_size)
+            if upload is None:
+                return b"UPL:ERR no upload"
+            block_size = upload["key"][1]
+            expected = len(upload["data"]) // block_size
+            if command == b"BLK":
+                index, data, crc = int(args[0]), bytes.fromhex(args[1].decode("ascii")), int(args[2], 16)
+                if index != expected:
+                    # Duplicate or out of order after an earlier error: restate the position
+                    return b"ACK:%d" % (expected - 1) if index < expected else b""
+                if zlib.crc32(data) != crc or self.random.random() < self.block_error_rate:
+                    upload["naked"] = False  # The block at the current position itself; always answer
+                    raise ValueError("bad block")
+                upload["data"] += data
+                upload["naked"] = False
+                return b"ACK:%d" % index
+            if len(upload["data"]) != upload["key"][0] or zlib.crc32(upload["data"]) != upload["key"][2]:
+                return b"END:ERR"
+            self.uploaded.append(bytes(upload["data"]))
+            self.upload = None
+            return b"END:OK"
+        except (IndexError, ValueError):
+            if command != b"BLK":
+                return b"UPL:ERR syntax"
+            # One NAK per position for unreadable blocks, so the ones already in
+            # flight behind a bad block stay quiet
+            if upload["naked"]:
+                return b""
+            upload["naked"] = True
+            return b"NAK:%d" % expected
+
+    def prompt(self):
+        self.listening = True
+        self.write(b".\r\n")
+
+    def start_stream(self, bytes_per_second, line_length=64, duration=None):
+        # bytes_per_second 0 streams as fast as the pty accepts
+        self.stop_stream()
+        self.stream_stop.clear()
+        self.stream_thread = threading.Thread(target=self.stream, args=(bytes_per_second, line_length, duration),
+                                              name="simulator-stream", daemon=True)
+        self.stream_thread.start()
+
+    def stop_stream(self):
+        if self.stream_thread is not None:
+            self.stream_stop.set()
+            self.stream_thread.join()
+            self.stream_thread = None
+
+    def stream(self, bytes_per_second, line_length, duration):
+        padding = b"x" * max(0, line_length - 28)
+        sent = 0
+        seq = 0
+        start = time.perf_counter()
+        while not self.stream_stop.is_set() and self.running:
+            elapsed = time.perf_counter() - start
+            if duration is not None and elapsed >= duration:
+                break
+            block = bytearray()
+            for _ in range(32):
+                block += b"%08d,%.6f,%s\n" % (seq, time.perf_counter(), padding)
+                seq += 1
+            self.write(block)
+            sent += len(block)
+            if bytes_per_second:
+                ahead = sent / bytes_per_second - (time.perf_counter() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def close(self):
+        self.running = False
+        self.stop_stream()
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated MCU on a pseudo-terminal.")
+    parser.add_argument("--stream", type=float, metavar="BYTES_PER_S", help="stream lines at this rate (0: as fast as possible)")
+    parser.add_argument("--line-length", type=int, default=64)
+    parser.add_argument("--prompt-every", type=float, metavar="SECONDS", help="send the '.' listening prompt periodically")
+    parser.add_argument("--response-delay", type=float, default=0, metavar="MS")
+    parser.add_argument("--block-error-rate", type=float, default=0, help="fraction of upload blocks to reject")
+    args = parser.parse_args(argv)
+
+    with SimulatedMCU(response_delay=args.response_delay / 1000, block_error_rate=args.block_error_rate) as device:
+        print(device.port_name, flush=True)
+        if args.stream is not None:
+            device.start_stream(args.stream, args.line_length)
+        try:
+            while True:
+                time.sleep(args.prompt_every or 3600)
+                if args.prompt_every:
+                    device.prompt()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
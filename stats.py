@@ -0,0 +1,157 @@
+# Link statistics: cheap counters bumped by the I/O threads, turned into
+# rates by whoever takes a snapshot (the GUI stats panel or the CLI).
+#
+# Each counter has a single writer thread (RX counters the reader, TX
+# counters the writer, drain lag the consumer), so no locking is needed.
+import csv
+import json
+import os
+import struct
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Linux TIOCGICOUNT fills struct serial_icounter_struct:
+# cts, dsr, rng, dcd, rx, tx, frame, overrun, parity, brk, buf_overrun, reserved[9]
+TIOCGICOUNT = 0x545D
+ICOUNT = struct.Struct("20i")
+LINE_ERRORS = {"framing_errors": 6, "overruns": 7, "parity_errors": 8, "breaks": 9, "buffer_overruns": 10}
+
+FIELDS = [
+    "time",
+    "port",
+    "rx_bytes_per_s",
+    "rx_frames_per_s",
+    "tx_bytes_per_s",
+    "tx_frames_per_s",
+    "rx_queue_depth",
+    "tx_queue_depth",
+    "drain_lag_ms",
+    "max_drain_lag_ms",
+    "rx_bytes",
+    "tx_bytes",
+    "dropped_batches",
+    "read_errors",
+    "write_errors",
+    "reconnects",
+] + list(LINE_ERRORS)
+
+
+def read_line_errors(serial_port):
+    # Driver error counters for a local UART, or None where the platform or
+    # port type (USB-CDC without support, loop://, socket://) does not have them
+    if fcntl is None:
+        return None
+    try:
+        buffer = fcntl.ioctl(serial_port.fileno(), TIOCGICOUNT, bytes(ICOUNT.size))
+    except (AttributeError, OSError, ValueError):
+        return None
+    counts = ICOUNT.unpack(buffer)
+    return {name: counts[index] for name, index in LINE_ERRORS.items()}
+
+
+class LinkStats:
+    # One per opened port. An automatic reconnect keeps its PortSession, so
+    # totals carry across it; reconnects counts only those reopens.
+    def __init__(self):
+        self.rx_bytes = 0
+        self.rx_frames = 0
+        self.tx_bytes = 0
+        self.tx_frames = 0
+        self.read_errors = 0
+        self.write_errors = 0
+        self.reconnects = 0
+        self.drain_lag = 0.0
+        self.max_drain_lag = 0.0
+        self.line_error_base = None  # Driver counts when the current connection opened
+        self.line_error_last = None  # Latest driver counts read on it
+        self.line_errors_before = None  # Errors seen by the connections before a reconnect
+        self.last_sample = None  # (monotonic, rx_bytes, rx_frames, tx_bytes, tx_frames)
+
+    def record_open(self, serial_port):
+        # The driver counts from boot, and a reconnected adapter may count
+        # from zero again; report what each connection saw while open
+        self.line_errors_before = self.line_error_totals()
+        self.line_error_base = self.line_error_last = read_line_errors(serial_port)
+
+    def line_error_totals(self):
+        # Added up over reconnects, or None without driver counters
+        if self.line_error_base is None:
+            return self.line_errors_before
+        before = self.line_errors_before or {}
+        return {name: before.get(name, 0) + self.line_error_last[name] - self.line_error_base[name]
+                for name in LINE_ERRORS}
+
+    def record_drain(self, lag):
+        self.drain_lag = lag
+        self.max_drain_lag = max(self.max_drain_lag, lag)
+
+    def snapshot(self, session):
+        now = time.monotonic()
+        sample = (now, self.rx_bytes, self.rx_frames, self.tx_bytes, self.tx_frames)
+        previous = self.last_sample or sample
+        self.last_sample = sample
+        elapsed = now - previous[0]
+        rates = [(current - before) / elapsed if elapsed > 0 else 0.0 for current, before in zip(sample[1:], previous[1:])]
+
+        row = {
+            "time": time.time(),
+            "port": session.port_name,
+            "rx_bytes_per_s": rates[0],
+            "rx_frames_per_s": rates[1],
+            "tx_bytes_per_s": rates[2],
+            "tx_frames_per_s": rates[3],
+            "rx_queue_depth": session.queue.qsize(),
+            "tx_queue_depth": session.tx_queue_depth,
+            "drain_lag_ms": self.drain_lag * 1000,
+            "max_drain_lag_ms": self.max_drain_lag * 1000,
+            "rx_bytes": self.rx_bytes,
+            "tx_bytes": self.tx_bytes,
+            "dropped_batches": session.dropped_batches,
+            "read_errors": self.read_errors,
+            "write_errors": self.write_errors,
+            "reconnects": self.reconnects,
+        }
+        self.max_drain_lag = 0.0  # Worst lag per snapshot interval
+
+        if session.serial_port is not None and session.serial_port.is_open and self.line_error_base is not None:
+            self.line_error_last = read_line_errors(session.serial_port) or self.line_error_last
+        totals = self.line_error_totals()
+        for name in LINE_ERRORS:
+            row[name] = totals[name] if totals else None
+        return row
+
+
+class StatsExporter:
+    # Appends snapshots to FILE.csv, or to FILE.json as JSON Lines
+    def __init__(self, path):
+        self.path = path
+        self.json = os.path.splitext(path)[1].lower() in (".json", ".jsonl")
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.writer = None
+        if not self.json:
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.json:
+            self.file.write(json.dumps(row) + "\n")
+        else:
+            self.writer.writerow(row)
+        self.file.flush()  # Keep the file usable while the link is still running
+
+    def close(self):
+        self.file.close()
+
+
+def format_rate(value):
+    for unit in ("", "k", "M"):
+        if value < 1000:
+            return f"{value:.1f} {unit}"
+        value /= 1000
+    return f"{value:.1f} G"
@@ -0,0 +1,289 @@
+# Numeric telemetry from received frames, for the plot window.
+#
+# Each frame that contains numbers becomes one sample per channel. With no
+# pattern every number in the line is a channel ("12.5,3,-0.25" -> three
+# channels); a pattern with groups picks the channels explicitly, e.g.
+# "T=(\S+) P=(\S+)". Samples go into preallocated array('d') ring buffers,
+# so a long run never reallocates. Each channel also keeps the min and max
+# of fixed-size buckets at several sizes, updated as samples arrive, so a
+# redraw reduces whatever is visible to two points per pixel column from a
+# few buckets per column rather than from every visible sample.
+import array
+import re
+
+NUMBER = re.compile(rb"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+SUMMARY_SIZES = (16, 4)  # Smallest bucket size, and the factor between sizes
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.values = array.array("d", bytes(8 * capacity))
+        self.end = 0  # Next write position
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.end] = value
+        self.end = (self.end + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def extend(self, values):
+        values = array.array("d", values)
+        added = len(values)
+        if added >= self.capacity:
+            # Only the newest capacity values survive; write them where they
+            # would have ended up had every value been appended, so sample n
+            # always sits at n % capacity
+            self.end = (self.end + added - self.capacity) % self.capacity
+            values = values[-self.capacity:]
+        first = min(len(values), self.capacity - self.end)
+        self.values[self.end:self.end + first] = values[:first]
+        self.values[:len(values) - first] = values[first:]
+        self.end = (self.end + len(values)) % self.capacity
+        self.count = min(self.capacity, self.count + added)
+
+    def last(self, count=None):
+        # The newest count values, oldest first, as one array
+        count = self.count if count is None else min(count, self.count)
+        start = (self.end - count) % self.capacity
+        if start + count <= self.capacity:
+            return self.values[start:start + count]
+        return self.values[start:] + self.values[:self.end]
+
+    def clear(self):
+        self.end = 0
+        self.count = 0
+
+
+class MinMaxSummary:
+    # Min and max of every size consecutive samples, counted from the first
+    # sample ever added, for the newest buckets buckets. low_first records
+    # whether the min came before the max, so spikes keep their direction.
+    def __init__(self, size, buckets):
+        self.size = size
+        self.buckets = buckets
+        self.lows = array.array("d", bytes(8 * buckets))
+        self.highs = array.array("d", bytes(8 * buckets))
+        self.low_first = bytearray(buckets)
+        self.total = 0  # Samples summarised, including the unfinished bucket
+
+    def extend(self, values):
+        offset = 0
+        excess = len(values) - self.size * self.buckets
+        if excess > 0:
+            # Skip what would be overwritten anyway, up to a bucket boundary
+            skip = min(len(values), -(-(self.total + excess) // self.size) * self.size - self.total)
+            self.total += skip
+            offset = skip
+        while offset < len(values):
+            filled = self.total % self.size
+            take = min(self.size - filled, len(values) - offset)
+            segment = values[offset:offset + take]
+            low = min(segment)
+            high = max(segment)
+            low_first = segment.index(low) <= segment.index(high)
+            slot = self.total // self.size % self.buckets
+            if filled:
+                # Merge with the unfinished bucket; on a tie the earlier sample wins
+                old_low = self.lows[slot]
+                old_high = self.highs[slot]
+                low_is_old = old_low <= low
+                high_is_old = old_high >= high
+                if low_is_old and high_is_old:
+                    low_first = self.low_first[slot]
+                elif low_is_old or high_is_old:
+                    low_first = low_is_old
+                low = min(low, old_low)
+                high = max(high, old_high)
+            self.lows[slot] = low
+            self.highs[slot] = high
+            self.low_first[slot] = low_first
+            self.total += take
+            offset += take
+
+    def window(self, first, count):
+        # (lows, highs, low_first) for buckets first .. first + count - 1
+        start = first % self.buckets
+        if start + count <= self.buckets:
+            end = start + count
+            return self.lows[start:end], self.highs[start:end], self.low_first[start:end]
+        end = start + count - self.buckets
+        return (self.lows[start:] + self.lows[:end], self.highs[start:] + self.highs[:end],
+                self.low_first[start:] + self.low_first[:end])
+
+
+class ChannelBuffer(RingBuffer):
+    # A RingBuffer that keeps MinMaxSummary levels with bucket sizes 16, 64,
+    # 256, ... so decimate() reads at most about four buckets per column
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        self.total = 0  # Samples ever added
+        self.summaries = []
+        size, factor = SUMMARY_SIZES
+        while size * 2 <= capacity:
+            self.summaries.append(MinMaxSummary(size, capacity // size + 2))
+            size *= factor
+
+    def append(self, value):
+        self.extend((value,))
+
+    def extend(self, values):
+        values = array.array("d", values)
+        super().extend(values)
+        for summary in self.summaries:
+            summary.extend(values)
+        self.total += len(values)
+
+    def decimate(self, shown, width):
+        # min_max_decimate() of the newest shown samples, in O(width) time
+        count = min(shown, self.count)
+        summary = None
+        for level in self.summaries:
+            if count // level.size >= width:
+                summary = level
+        if summary is None:
+            return min_max_decimate(self.last(count), width)
+        start = self.total - count
+        first = -(-start // summary.size)  # First bucket that starts inside the window
+        last = (self.total - 1) // summary.size
+        lows, highs, low_first = summary.window(first, last - first + 1)
+        head = self.samples(start, first * summary.size - start)
+        if head:
+            # Samples before the first whole bucket count on their own
+            low = min(head)
+            high = max(head)
+            lows.insert(0, low)
+            highs.insert(0, high)
+            low_first.insert(0, head.index(low) <= head.index(high))
+        return merge_buckets(lows, highs, low_first, width)
+
+    def samples(self, first, count):
+        # count samples starting at sample number first, which must still be held
+        start = first % self.capacity
+        if start + count <= self.capacity:
+            return self.values[start:start + count]
+        return self.values[start:] + self.values[:start + count - self.capacity]
+
+    def clear(self):
+        super().clear()
+        self.total = 0
+        for summary in self.summaries:
+            summary.total = 0
+
+
+class FieldParser:
+    def __init__(self, pattern=""):
+        self.pattern = re.compile(pattern.encode()) if pattern else None
+
+    def parse(self, frame):
+        # The numbers in frame, or None if it has none
+        try:
+            if self.pattern is None:
+                fields = NUMBER.findall(frame)
+            else:
+                match = self.pattern.search(frame)
+                if match is None:
+                    return None
+                fields = match.groups() or (match.group(0),)
+            return [float(field) for field in fields] or None
+        except (TypeError, ValueError):
+            return None  # A group did not capture a number
+
+
+class Telemetry:
+    # Channels appear as they are first seen, up to max_channels. A line
+    # with fewer fields repeats the last value of the missing channels so
+    # every channel stays aligned on the same sample index.
+    def __init__(self, parser, capacity=100000, max_channels=8):
+        self.parser = parser
+        self.capacity = capacity
+        self.max_channels = max_channels
+        self.channels = []
+        self.samples = 0  # Total ever added, for the x axis
+        self.skipped = 0  # Frames without numbers
+
+    def add(self, frames):
+        rows = []
+        for frame in frames:
+            values = self.parser.parse(frame)
+            if values is None:
+                self.skipped += 1
+            else:
+                rows.append(values[:self.max_channels])
+        if not rows:
+            return 0
+        width = max(len(row) for row in rows)
+        while len(self.channels) < width:
+            channel = ChannelBuffer(self.capacity)
+            # A late channel starts at zero for the samples it missed
+            channel.extend([0.0] * min(self.samples, self.capacity))
+            self.channels.append(channel)
+        for index, channel in enumerate(self.channels):
+            previous = channel.last(1)
+            fill = previous[0] if previous else 0.0
+            column = []
+            for row in rows:
+                if index < len(row):
+                    fill = row[index]
+                column.append(fill)
+            channel.extend(column)
+        self.samples += len(rows)
+        return len(rows)
+
+    def clear(self):
+        self.channels = []
+        self.samples = 0
+        self.skipped = 0
+
+
+def min_max_decimate(values, width):
+    # Two points (min, max) per column, so the number of points drawn depends
+    # on width and not on len(values). Returns (column, y) pairs flattened
+    # into [x0, y0, x1, y1, ...] with x in columns.
+    count = len(values)
+    if count == 0 or width <= 0:
+        return []
+    if count <= 2 * width:
+        scale = width / max(1, count - 1)
+        points = []
+        for index, value in enumerate(values):
+            points += (index * scale, value)
+        return points
+    points = []
+    step = count / width
+    for column in range(width):
+        segment = values[int(column * step):int((column + 1) * step)]
+        if not segment:
+            continue
+        low = min(segment)
+        high = max(segment)
+        # Keep the order in which min and max occurred so spikes point the right way
+        if segment.index(low) <= segment.index(high):
+            points += (column, low, column, high)
+        else:
+            points += (column, high, column, low)
+    return points
+
+
+def merge_buckets(lows, highs, low_first, width):
+    # min_max_decimate() for bucket summaries: len(lows) >= width buckets
+    # become two points per column
+    points = []
+    step = len(lows) / width
+    for column in range(width):
+        start = int(column * step)
+        end = int((column + 1) * step)
+        if start == end:
+            continue
+        low_segment = lows[start:end]
+        high_segment = highs[start:end]
+        low = min(low_segment)
+        high = max(high_segment)
+        low_at = low_segment.index(low)
+        high_at = high_segment.index(high)
+        if low_at < high_at or (low_at == high_at and low_first[start + low_at]):
+            points += (column, low, column, high)
+        else:
+            points += (column, high, column, low)
+    return points
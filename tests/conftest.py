@@ -0,0 +1,43 @@
+# Shared fixtures for the test suite.
+#
+#   python -m pytest tests
+#
+# Like the benchmarks, the tests run against loop:// and the pty-backed
+# simulated MCU (simulator.py), so no serial hardware is needed. Tests that
+# need the simulator are skipped where there are no pseudo-terminals.
+import os
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import serial_core  # noqa: E402
+import simulator  # noqa: E402
+
+
+@pytest.fixture
+def settings():
+    return serial_core.Settings(os.path.join(ROOT, "settings.ini"))
+
+
+@pytest.fixture
+def device():
+    try:
+        mcu = simulator.SimulatedMCU()
+    except RuntimeError as error:
+        pytest.skip(str(error))
+    with mcu:
+        yield mcu
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
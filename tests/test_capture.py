@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+import capture
+
+RECORDS = [(1000.0 + index, capture.RX if index % 3 else capture.TX, b"frame %d" % index) for index in range(200)]
+
+
+def write_capture(directory, records, index_every=64):
+    writer = capture.CaptureWriter(str(directory), index_every=index_every)
+    for timestamp, direction, payload in records:
+        writer.write(direction, [payload], timestamp)
+    writer.close()
+    (path,) = writer.files
+    return path
+
+
+def read_all(path, start=None, end=None):
+    with capture.CaptureReader(path) as reader:
+        return [(timestamp, direction, bytes(payload)) for timestamp, direction, payload in reader.records(start, end)]
+
+
+def test_round_trip_and_time_range(tmp_path):
+    path = write_capture(tmp_path, RECORDS)
+    assert read_all(path) == RECORDS
+    assert read_all(path, 1050.0, 1052.0) == RECORDS[50:53]
+
+
+def test_files_rotate_by_size(tmp_path):
+    writer = capture.CaptureWriter(str(tmp_path), max_bytes=1000)
+    for timestamp, direction, payload in RECORDS:
+        writer.write(direction, [payload], timestamp)
+    writer.close()
+    assert len(writer.files) > 1
+    assert [record for path in writer.files for record in read_all(path)] == RECORDS
+
+
+def test_missing_index_falls_back_to_scanning(tmp_path):
+    path = write_capture(tmp_path, RECORDS)
+    os.remove(path + ".idx")
+    assert read_all(path, 1150.0) == RECORDS[150:]
+
+
+def test_stale_index_and_truncated_capture(tmp_path):
+    path = write_capture(tmp_path, RECORDS)
+    # Cut the file inside record 100; the index still points past the end
+    with capture.CaptureReader(path) as reader:
+        offsets = reader.index_offsets
+    size = capture.HEADER.size + sum(capture.RECORD.size + len(payload) for _, _, payload in RECORDS[:100])
+    with open(path, "r+b") as capture_file:
+        capture_file.truncate(size + 5)
+    assert offsets[-1] > size
+    assert read_all(path) == RECORDS[:100]
+    assert read_all(path, 1090.0) == RECORDS[90:100]
+
+
+def test_damaged_index_falls_back_to_scanning(tmp_path):
+    path = write_capture(tmp_path, RECORDS, index_every=256)
+    with capture.CaptureReader(path) as reader:
+        offsets = reader.index_offsets
+        times = reader.index_times
+    # Entries that go backwards, and one whose offset lands inside a record
+    entries = [(times[0], offsets[0]), (times[2], offsets[2] + 3), (times[3], offsets[3]), (times[1], offsets[1])]
+    with open(path + ".idx", "wb") as index_file:
+        index_file.write(b"".join(capture.INDEX_ENTRY.pack(*entry) for entry in entries))
+    with capture.CaptureReader(path) as reader:
+        assert reader.index_offsets == [offsets[0], offsets[2] + 3, offsets[3]]
+    assert read_all(path, 1150.0) == RECORDS[150:]
+    assert read_all(path, times[2] + 1) == [record for record in RECORDS if record[0] >= times[2] + 1]
+
+
+def test_close_gives_up_on_a_stopped_writer(tmp_path):
+    writer = capture.CaptureWriter(str(tmp_path), queue_size=1)
+    writer.close()
+    writer.write(capture.RX, [b"too late"])  # Fills the queue; nothing will drain it
+    started = time.monotonic()
+    writer.close(timeout=0.2)
+    assert time.monotonic() - started < 1.0
+
+
+@pytest.mark.parametrize("content", [b"", b"SGCAP", b"not a capture file at all"])
+def test_not_a_capture_file(tmp_path, content):
+    path = tmp_path / "bad.sgcap"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match="not a capture file"):
+        capture.CaptureReader(str(path))
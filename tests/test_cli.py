@@ -0,0 +1,64 @@
+import pytest
+
+import serial_cli
+
+
+@pytest.fixture
+def settings_file(tmp_path):
+    path = tmp_path / "settings.ini"
+    path.write_text("[Serial]\nport = loop://\n[Receive]\nidle_gap_ms = 20\n")
+    return str(path)
+
+
+def test_script_steps(tmp_path):
+    script = tmp_path / "script.txt"
+    script.write_text("# comment\n\n3:PRD?\n!wait 25\n!hex 1b1b\n!command Firmware Version\n")
+    assert serial_cli.load_script(str(script)) == [
+        ("send", b"3:PRD?\r\n"),
+        ("wait", 0.025),
+        ("send", b"\x1b\x1b"),
+        ("send", b"3:FWV?\r\n"),
+    ]
+
+
+def test_script_is_played_and_echo_written(tmp_path, settings_file):
+    script = tmp_path / "script.txt"
+    script.write_text("hello\n!command Product Info\n")
+    output = tmp_path / "out.txt"
+    status = serial_cli.main(["--settings", settings_file, "--send", str(script), "--exit-after-script",
+                              "--output", str(output)])
+    assert status == serial_cli.EXIT_OK
+    assert output.read_text().splitlines() == ["hello", "3:PRD?"]
+
+
+def test_usage_and_script_errors(tmp_path, settings_file, capsys):
+    empty = tmp_path / "empty.ini"
+    empty.write_text("")
+    assert serial_cli.main(["--settings", str(empty)]) == serial_cli.EXIT_USAGE
+    script = tmp_path / "script.txt"
+    script.write_text("!command No Such Command\n")
+    assert serial_cli.main(["--settings", settings_file, "--send", str(script)]) == serial_cli.EXIT_SCRIPT_ERROR
+    assert "unknown command" in capsys.readouterr().err
+
+
+def test_settings_port_options(settings):
+    settings.data_bits, settings.stop_bits, settings.parity = "7", "2", "Even"
+    assert settings.port_options() == {"bytesize": 7, "stopbits": 2.0, "parity": "E"}
+
+
+def test_settings_port_options_name_bad_values(settings):
+    settings.parity = "Bogus"
+    with pytest.raises(ValueError, match="parity 'Bogus'"):
+        settings.port_options()
+    with pytest.raises(ValueError, match="stop bits '3'"):
+        settings.port_options(stop_bits="3", parity="None")
+
+
+def test_settings_and_stats_errors_are_reported(tmp_path, settings_file, capsys):
+    bad = tmp_path / "bad.ini"
+    bad.write_text("[Serial]\nport = loop://\nparity = Bogus\n")
+    assert serial_cli.main(["--settings", str(bad), "--duration", "0"]) == serial_cli.EXIT_USAGE
+    assert "parity 'Bogus'" in capsys.readouterr().err
+    stats_file = tmp_path / "missing" / "stats.csv"
+    assert serial_cli.main(["--settings", settings_file, "--stats", str(stats_file)]) == serial_cli.EXIT_USAGE
+    assert "Cannot open statistics file" in capsys.readouterr().err
@@ -0,0 +1,119 @@
+import struct
+
+import pytest
+
+import decoders
+from decoders import Pipeline, Record
+
+
+def slip_encode(payload):
+    return b"\xC0" + payload.replace(b"\xDB", b"\xDB\xDD").replace(b"\xC0", b"\xDB\xDC") + b"\xC0"
+
+
+def cobs_encode(payload):
+    output = bytearray()
+    for block in payload.split(b"\x00"):
+        while len(block) >= 254:
+            output += b"\xFF" + block[:254]
+            block = block[254:]
+        output += bytes([len(block) + 1]) + block
+    return bytes(output) + b"\x00"
+
+
+def modbus_frame(body):
+    crc = decoders.crc16(body)
+    return body + bytes([crc & 0xFF, crc >> 8])
+
+
+def feed_bytewise(pipeline, data):
+    items = []
+    for index in range(len(data)):
+        items += pipeline.process([data[index:index + 1]], 0.0)
+    return items
+
+
+def test_slip_unescapes_and_survives_split_reads():
+    payloads = [b"plain", b"\xC0\xDB inside", b"\xDB\xDC literal"]
+    stream = b"".join(slip_encode(payload) for payload in payloads)
+    assert feed_bytewise(Pipeline.from_spec("slip"), stream) == payloads
+    assert Pipeline.from_spec("slip").process([stream], 0.0) == payloads
+
+
+@pytest.mark.parametrize("payload", [b"", b"\x00", b"a\x00b\x00\x00c", bytes(range(1, 256)) * 2, b"\x00" * 300])
+def test_cobs_round_trip(payload):
+    assert decoders.cobs_decode(cobs_encode(payload)[:-1]) == payload
+    assert feed_bytewise(Pipeline.from_spec("cobs"), cobs_encode(payload) + cobs_encode(b"next")) == [payload, b"next"]
+
+
+def test_cobs_reports_malformed_packets():
+    (record,) = Pipeline.from_spec("cobs").process([b"\x05ab\x00"], 0.0)
+    assert isinstance(record, Record) and record.error is not None
+
+
+def test_length_prefix_frames_and_resyncs():
+    stream = struct.pack("<H", 3) + b"abc" + struct.pack("<H", 0) + struct.pack("<H", 2) + b"de"
+    assert feed_bytewise(Pipeline.from_spec("length:2:little"), stream) == [b"abc", b"", b"de"]
+    # A length over MAX_FRAME cannot be a header, so the framer slides past it
+    framer = decoders.LengthPrefixFramer("4", "big")
+    assert framer.split(b"\xFF\xFF\xFF\xFF" + struct.pack(">I", 1) + b"x") == [b"x"]
+    assert framer.resyncs == 4
+
+
+def test_length_prefix_false_start_released_by_idle_flush():
+    # Noise in front of a 2-byte header reads as a length of 0x4142 bytes
+    pipeline = Pipeline.from_spec("length:2")
+    stream = b"AB" + struct.pack(">H", 3) + b"abc" + struct.pack(">H", 2) + b"de"
+    assert pipeline.process([stream], 0.0) == []
+    assert pipeline.flush(1.0) == [b"abc", b"de"]
+    assert pipeline.stages[0].resyncs == 2
+    assert pipeline.flush(2.0) == []
+
+
+def test_modbus_rtu_responses():
+    read = modbus_frame(b"\x11\x03\x04\x00\x0A\x01\x02")
+    write = modbus_frame(b"\x11\x06\x00\x01\x00\x03")
+    error = modbus_frame(b"\x11\x83\x02")
+    records = feed_bytewise(Pipeline.from_spec("modbus-rtu"), read + write + error)
+    assert [record.fields for record in records] == [
+        {"unit": 0x11, "function": 3, "registers": [10, 258]},
+        {"unit": 0x11, "function": 6, "address": 1, "value": 3},
+        {"unit": 0x11, "function": 3, "exception": 2},
+    ]
+
+
+def test_modbus_rtu_crc_resync_released_by_idle_flush():
+    read = modbus_frame(b"\x11\x03\x04\x00\x0A\x01\x02")
+    write = modbus_frame(b"\x11\x06\x00\x01\x00\x03")
+    corrupt = bytearray(read)
+    corrupt[4] ^= 0xFF
+    pipeline = Pipeline.from_spec("modbus-rtu")
+    records = feed_bytewise(pipeline, bytes(corrupt) + read + write)
+    # The resync stops on a false start whose byte count reaches past the
+    # end of the data; the quiet link afterwards releases the frames behind it
+    records += pipeline.flush(1.0)
+    assert [record.fields for record in records] == [
+        {"unit": 0x11, "function": 3, "registers": [10, 258]},
+        {"unit": 0x11, "function": 6, "address": 1, "value": 3},
+    ]
+    assert pipeline.stages[0].resyncs > 0
+
+
+def test_fields_decoder_behind_slip():
+    pipeline = Pipeline.from_spec("slip | fields")
+    records = pipeline.process([slip_encode(b"IRDEV:OK:212") + slip_encode(b"ERR") + slip_encode(b"noise")], 0.0)
+    assert str(records[0]) == "IRDEV status=OK bytes=212"
+    assert records[1].protocol == "ERR"
+    assert records[2] == b"noise"
+    assert [name for name, _seconds, _in, _out in pipeline.costs()] == ["slip", "fields"]
+
+
+def test_line_framer_flushes_after_idle():
+    pipeline = Pipeline.from_spec("line | fields")
+    assert pipeline.process([b"FWV:1.0.0\nPRD:"], 0.0)[0].fields == {"version": "1.0.0"}
+    assert pipeline.flush(1.0)[0].fields == {"product": ""}
+
+
+@pytest.mark.parametrize("spec", ["nope", "length:3", "slip:1"])
+def test_bad_pipeline_specs(spec):
+    with pytest.raises(ValueError):
+        Pipeline.from_spec(spec)
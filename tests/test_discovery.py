@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+from discovery import PortWatcher
+
+
+def usb_port(device, serial_number="A1"):
+    return SimpleNamespace(device=device, description="USB Serial", vid=0x0403, pid=0x6001,
+                           serial_number=serial_number, location="1-1")
+
+
+def test_scan_reports_added_and_removed_ports():
+    listed = [usb_port("/dev/ttyUSB0")]
+    changes = []
+    watcher = PortWatcher(lambda added, removed: changes.append(
+        ([info.device for info in added], [info.device for info in removed])), list_ports=lambda: listed)
+    watcher.scan()
+    listed = [usb_port("/dev/ttyUSB1", "B2")]
+    watcher.scan()
+    watcher.scan()
+    assert changes == [(["/dev/ttyUSB0"], []), (["/dev/ttyUSB1"], ["/dev/ttyUSB0"])]
+    assert [info.device for info in watcher.snapshot()] == ["/dev/ttyUSB1"]
+
+
+def test_find_follows_a_reenumerated_device():
+    listed = [usb_port("/dev/ttyUSB0")]
+    watcher = PortWatcher(list_ports=lambda: listed)
+    watcher.scan()
+    identity = watcher.identity_of("/dev/ttyUSB0")
+    listed = []
+    watcher.scan()
+    assert watcher.find(identity) is None
+    listed = [usb_port("/dev/ttyUSB3")]
+    watcher.scan()
+    assert watcher.find(identity) == "/dev/ttyUSB3"
+    assert watcher.find(watcher.identity_of("loop://")) == "loop://"
@@ -0,0 +1,55 @@
+import pytest
+
+from formatting import encode_payload, format_frames, format_rows
+
+
+def test_views():
+    data = b"AB\x00\xff"
+    assert format_rows(data, "Hex") == ["0000: 41 42 00 FF"]
+    assert format_rows(data, "Binary") == ["0000: 01000001 01000010 00000000 11111111"]
+    assert format_rows(data, "Octal") == ["0000: 101 102 000 377"]
+    assert format_rows(data, "ASCII") == ["0000: AB.."]
+    assert format_rows(b"", "Hex") == ["0000:"]
+
+
+def test_rows_are_cut_at_the_view_width():
+    rows = format_rows(bytes(range(20)), "Hex Dump")
+    assert len(rows) == 2
+    assert rows[1].startswith("00000010  10 11 12 13")
+    assert rows[1].endswith("|....|")
+
+
+def test_text_view_decodes_frames_and_keeps_notes():
+    assert format_frames([b"FWV:1.0.0\r", "-- note --", b"caf\xc3\xa9", b"\xff"], "Text") == [
+        "FWV:1.0.0", "-- note --", "café", "�"]
+    assert format_frames([b"AB", b"C"], "Hex", ">> ") == [">> 0000: 41 42", ">> 0000: 43"]
+
+
+def test_each_sent_payload_is_one_line():
+    assert format_frames([b"3:PRD?\r\n"], "Text", ">> Sent: ") == [">> Sent: 3:PRD?"]
+    assert format_frames([b"a\r\nb\r\n", "note"], "Text", ">> Sent: ") == [">> Sent: a\\r\\nb", "note"]
+    assert format_frames([b"FWV:1.0.0\r", b"PRD:x"], "Text") == ["FWV:1.0.0", "PRD:x"]
+
+
+@pytest.mark.parametrize("text, data_format, expected", [
+    ("3:PRD?", "String", b"3:PRD?\r\n"),
+    ("41 42", "Hex", b"AB\r\n"),
+    ("01000001 1000010", "Binary", b"AB\r\n"),
+    ("0100000101000010", "Binary", b"AB\r\n"),
+    ("101 102", "Octal", b"AB\r\n"),
+    ("101102", "Octal", b"AB\r\n"),
+    ("12", "Octal", b"\n\r\n"),
+    ("012", "Octal", b"\n\r\n"),
+    ("7, 12,377", "Octal", b"\x07\n\xff\r\n"),
+])
+def test_encode_payload(text, data_format, expected):
+    assert encode_payload(text, data_format) == expected
+    assert encode_payload(text, data_format, add_crlf=False) == expected[:-2]
+
+
+@pytest.mark.parametrize("text, data_format", [("4G", "Hex"), ("012 2", "Binary"), ("101 800", "Octal"),
+                                               ("123456789 1", "Binary"), ("1011", "Octal"), ("400", "Octal"),
+                                               ("-1", "Octal")])
+def test_encode_payload_rejects_bad_input(text, data_format):
+    with pytest.raises(ValueError):
+        encode_payload(text, data_format)
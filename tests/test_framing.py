@@ -0,0 +1,59 @@
+import serial
+
+from conftest import wait_for
+from serial_core import FrameSplitter, SerialReader
+
+
+def test_delimiter_frames_split_across_reads():
+    splitter = FrameSplitter(delimiter=b"\r\n")
+    assert splitter.feed(b"FWV:1.0", 0.0) == []
+    assert splitter.feed(b".0\r", 0.0) == []
+    assert splitter.feed(b"\nPRD:x\r\nER", 0.0) == [b"FWV:1.0.0", b"PRD:x"]
+    assert splitter.feed(b"R\r\n", 0.0) == [b"ERR"]
+
+
+def test_delimiter_partial_frame_flushed_after_idle_gap():
+    splitter = FrameSplitter(idle_gap=0.05)
+    assert splitter.feed(b"no newline", 1.0) == []
+    assert splitter.flush_idle(1.01) == []
+    assert splitter.flush_idle(1.1) == [b"no newline"]
+    assert splitter.flush_idle(2.0) == []
+
+
+def test_delimiter_frame_longer_than_max_frame_is_cut():
+    splitter = FrameSplitter(max_frame=8)
+    assert splitter.feed(b"0123456789", 0.0) == [b"0123456789"]
+    assert splitter.feed(b"ab\n", 0.0) == [b"ab"]
+
+
+def test_idle_mode_frames_on_gaps_only():
+    splitter = FrameSplitter(mode="idle", idle_gap=0.05)
+    assert splitter.feed(b"ab\n", 0.0) == []
+    assert splitter.feed(b"cd", 0.01) == []
+    assert splitter.flush_idle(0.1) == [b"ab\ncd"]
+
+
+def test_fixed_mode_keeps_the_remainder():
+    splitter = FrameSplitter(mode="fixed", frame_length=4)
+    assert splitter.feed(b"0123456", 0.0) == [b"0123"]
+    assert splitter.feed(b"789AB", 0.0) == [b"4567", b"89AB"]
+    assert splitter.flush_idle(10.0) == []
+
+
+def test_raw_mode_passes_reads_through():
+    splitter = FrameSplitter(mode="raw")
+    assert splitter.feed(bytearray(b"\xC0\x01\n"), 0.0) == [b"\xC0\x01\n"]
+
+
+def test_reader_returns_whole_frames_per_read():
+    port = serial.serial_for_url("loop://", timeout=0.02)
+    try:
+        reader = SerialReader(port, FrameSplitter(), chunk_size=64)
+        port.write(b"one\ntwo\nthr")
+        frames = []
+        assert wait_for(lambda: frames.extend(reader.read_frames()) or len(frames) >= 2)
+        port.write(b"ee\n")
+        assert wait_for(lambda: frames.extend(reader.read_frames()) or len(frames) >= 3)
+        assert frames == [b"one", b"two", b"three"]
+    finally:
+        port.close()
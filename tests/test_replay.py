@@ -0,0 +1,63 @@
+import capture
+import replay
+from replay import Replayer
+
+
+def write_capture(directory, records):
+    writer = capture.CaptureWriter(str(directory))
+    for timestamp, direction, payload in records:
+        writer.write(direction, [payload], timestamp)
+    writer.close()
+    return writer.files
+
+
+def run_replay(paths, **options):
+    batches = []
+    replayer = Replayer(paths, lambda direction, frames: batches.append((direction, [bytes(frame) for frame in frames])),
+                        **options).start()
+    replayer.thread.join(timeout=10)
+    return replayer, batches
+
+
+def test_fast_replay_delivers_frames_in_order(tmp_path):
+    records = [(100.0 + index * 0.5, capture.RX if index % 4 else capture.TX, b"frame %d" % index)
+               for index in range(100)]
+    replayer, batches = run_replay(write_capture(tmp_path, records), speed=0, batch_frames=16)
+    assert replayer.result == (True, "Finished")
+    assert [frame for _direction, frames in batches for frame in frames] == \
+        [payload for _timestamp, direction, payload in records if direction == capture.RX]
+    assert all(len(frames) <= 16 for _direction, frames in batches)
+    assert replayer.records == 75
+
+
+def test_replay_keeps_recorded_spacing(tmp_path):
+    records = [(50.0 + index * 0.1, capture.RX, b"tick %d" % index) for index in range(4)]
+    replayer, batches = run_replay(write_capture(tmp_path, records), speed=1.0,
+                                   directions=(capture.RX, capture.TX))
+    assert replayer.result[0]
+    assert len(batches) == 4
+    assert replayer.elapsed >= 0.29
+
+
+def test_stop_ends_replay(tmp_path):
+    records = [(10.0 + index, capture.RX, b"slow") for index in range(10)]
+    replayer = Replayer(write_capture(tmp_path, records), lambda direction, frames: None).start()
+    replayer.stop()
+    replayer.thread.join(timeout=5)
+    assert replayer.result == (False, "Stopped")
+
+
+def test_main_prints_records(tmp_path, capsys):
+    records = [(1.0, capture.TX, b"PRD?"), (1.1, capture.RX, b"PRD:Widget")]
+    write_capture(tmp_path, records)
+    assert replay.main([str(tmp_path), "--speed", "0", "--direction", "both"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["TX PRD?", "RX PRD:Widget"]
+
+
+def test_sink_errors_end_the_replay(tmp_path):
+    def broken_sink(direction, frames):
+        raise RuntimeError("sink gone")
+
+    replayer = Replayer(write_capture(tmp_path, [(1.0, capture.RX, b"lost")]), broken_sink, speed=0).start()
+    replayer.thread.join(timeout=10)
+    assert replayer.result == (False, "Error: sink gone")
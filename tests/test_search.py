@@ -0,0 +1,64 @@
+import re
+
+import pytest
+
+from search import BLOCK_LINES, HighlightRules, LogIndex, Query
+
+RULES = HighlightRules([("error", "red", "(?i)error"), ("ok", "green", r"^OK\b")])
+
+
+def build_index(count=5 * BLOCK_LINES):
+    index = LogIndex(RULES)
+    frames = [b"line %d" % n for n in range(count)]
+    frames[10] = b"ERROR: overheated"
+    frames[200] = b"OK 200"
+    frames[count - 1] = b"last error"
+    index.add(frames, 0)
+    return index, frames
+
+
+def test_text_query_matches_every_word():
+    index, frames = build_index()
+    assert index.search(Query("line 1")) == [n for n, frame in enumerate(frames)
+                                             if b"line" in frame and b"1" in frame]
+    assert index.search(Query("ERROR")) == [10, len(frames) - 1]
+    assert index.search(Query("ERROR"), limit=1) == [len(frames) - 1]
+
+
+def test_rules_tag_frames_and_are_queryable():
+    index, _frames = build_index()
+    assert index.search(Query("rule:error", RULES)) == [10, 5 * BLOCK_LINES - 1]
+    assert index.search(Query("rule:ok", RULES)) == [200]
+    assert index.search(Query(r"re:^OK \d+$")) == [200]
+    with pytest.raises(ValueError):
+        Query("rule:missing", RULES)
+    with pytest.raises(re.error):
+        Query("re:(")
+
+
+def test_jumps_and_trimming():
+    index, _frames = build_index()
+    query = Query("error")
+    assert index.next_match(query, 10) == 5 * BLOCK_LINES - 1
+    assert index.previous_match(query, 5 * BLOCK_LINES - 1) == 10
+    assert index.next_match(query, 5 * BLOCK_LINES - 1) is None
+    index.discard_before(100)
+    assert index.search(query) == [5 * BLOCK_LINES - 1]
+    assert [seq for seq, _frame, _tag in index.frames(98, 102)] == [100, 101]
+
+
+def test_count_follows_trimming():
+    index, _frames = build_index()
+    query = Query("error")
+    count = index.count(query)
+    for oldest in (5, 11, 100):
+        count -= index.count_between(query, index.oldest, oldest)
+        index.discard_before(oldest)
+        assert count == index.count(query)
+    assert count == 1
+
+
+def test_add_after_clear_starts_over():
+    index, _frames = build_index()
+    index.add([b"error again"], 0)
+    assert index.search(Query("error")) == [0]
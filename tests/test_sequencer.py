@@ -0,0 +1,61 @@
+import pytest
+
+import sequencer
+from serial_core import FrameSplitter, PortSession
+
+
+def run_on_loop(text, timeout=10):
+    # Runs a sequence against loop://, where every send comes back as the response
+    steps, labels = sequencer.parse_sequence(text)
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: session.drain())
+    events = []
+    runner = sequencer.SequenceRunner(steps, labels, session.send, lambda kind, text: events.append((kind, text)))
+    session.frame_listeners.append(runner.feed_frames)
+    session.open()
+    try:
+        runner.start()
+        runner.thread.join(timeout)
+    finally:
+        session.close()
+    return runner.result, events
+
+
+def test_sequence_parses():
+    steps, labels = sequencer.parse_sequence(
+        '# comment\nlabel start\ncommand "Firmware Version"\n'
+        "expect re:^FWV prefix:ERR->start timeout=500 retries=2\nwait 10\npass")
+    assert [step.action for step in steps] == ["send", "expect", "wait", "pass"]
+    assert labels == {"start": 0}
+    assert steps[0].data == b"3:FWV?\r\n"
+    assert (steps[1].timeout, steps[1].retries, steps[1].targets) == (0.5, 2, [None, "start"])
+
+
+@pytest.mark.parametrize("text", ["bogus", "goto nowhere", "command No Such Command", "expect re:(", "expect",
+                                  "wait", "label", "goto", "goto a b", "send_hex", "wait soon", "send_hex zz",
+                                  "command", "expect re:x timeout=soon", "expect re:(?P<b1>x) re:y"])
+def test_bad_sequences(text):
+    with pytest.raises(sequencer.SequenceError, match="line 1"):
+        sequencer.parse_sequence(text)
+
+
+def test_expect_matches_and_branches():
+    result, events = run_on_loop(
+        "send ERR:busy\nexpect prefix:OK prefix:ERR->failed timeout=2000\npass\nlabel failed\nfail device busy")
+    assert result == (False, "device busy")
+    assert ("match", "ERR") in events
+
+
+def test_expect_pattern_with_global_flags():
+    result, events = run_on_loop("send fwv:1.0\nexpect prefix:ERR->failed re:(?i)^FWV:(?P<version>\\S+)\npass\n"
+                                 "label failed\nfail")
+    assert result == (True, "Passed")
+    assert ("match", "fwv:1.0") in events
+
+
+def test_expect_retries_then_takes_on_timeout():
+    result, events = run_on_loop(
+        "send hello\nexpect re:^never timeout=50 retries=2 on_timeout=gave_up\nfail\n"
+        "label gave_up\nlog retried\npass done")
+    assert result == (True, "done")
+    assert [kind for kind, _text in events].count("timeout") == 3
+    assert ("log", "retried") in events
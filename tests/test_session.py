@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+
+import pytest
+import serial
+
+import stats
+from conftest import wait_for
+from serial_core import FrameSplitter, PortSession, SessionManager
+
+
+def drain_until(session, count):
+    frames = []
+    assert wait_for(lambda: frames.extend(session.drain()) or len(frames) >= count)
+    return frames
+
+
+def test_session_queues_frames_from_its_reader():
+    ready = threading.Event()
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: ready.set())
+    session.open()
+    try:
+        session.serial_port.write(b"PRD:x\nFWV:1.0.0\n")
+        assert ready.wait(5)
+        assert drain_until(session, 2) == [b"PRD:x", b"FWV:1.0.0"]
+    finally:
+        session.close()
+    assert not session.thread.is_alive()
+
+
+def test_full_queue_drops_batches_instead_of_blocking():
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None, queue_size=1)
+    session.open()
+    try:
+        session.serial_port.write(b"first\n")
+        assert wait_for(session.queue.full)
+        session.serial_port.write(b"second\n")
+        assert wait_for(lambda: session.dropped_batches == 1)
+        assert session.drain() == [b"first"]
+        assert session.thread.is_alive()
+    finally:
+        session.close()
+
+
+def test_send_is_written_in_chunks_by_the_writer():
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None, tx_chunk_size=4)
+    session.open()
+    done = []
+    try:
+        job = session.send(b"3:PRD?\r\n3:FWV?\r\n", on_done=done.append)
+        session.wait_sent()
+        assert done == [job] and job.error is None and job.sent == 16
+        assert session.tx_bytes_pending == 0
+        assert drain_until(session, 2) == [b"3:PRD?\r", b"3:FWV?\r"]
+    finally:
+        session.close()
+
+
+def test_send_raises_queue_full_instead_of_blocking():
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None, tx_queue_size=1)
+    session.send(b"queued before open")
+    with pytest.raises(queue.Full):
+        session.send(b"no room")
+    assert session.tx_bytes_pending == len(b"queued before open")
+    started = time.monotonic()
+    with pytest.raises(queue.Full):
+        session.send(b"still no room", timeout=0.2)
+    assert time.monotonic() - started >= 0.2
+    assert not session.wait_sent()  # Nothing will ever write it
+
+
+def test_send_with_timeout_waits_for_room():
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None, tx_queue_size=1,
+                          tx_chunk_size=1, tx_pace=0.01)
+    session.open()
+    try:
+        jobs = [session.send(b"%d\n" % number, timeout=None) for number in range(5)]
+        assert not session.wait_sent(timeout=0.001)
+        assert session.wait_sent(timeout=5)
+        assert [job.sent for job in jobs] == [2] * 5
+        assert drain_until(session, 5) == [b"0", b"1", b"2", b"3", b"4"]
+    finally:
+        session.close()
+
+
+def test_close_fails_queued_sends_and_wakes_blocked_senders():
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None, tx_queue_size=1,
+                          tx_chunk_size=1, tx_pace=0.05)
+    session.open()
+    done = []
+    errors = []
+
+    def blocked_send():
+        try:
+            session.send(b"blocked", timeout=None)
+        except serial.SerialException as error:
+            errors.append(error)
+
+    session.send(b"slow to write", on_done=done.append)
+    session.send(b"queued", on_done=done.append, timeout=1)
+    sender = threading.Thread(target=blocked_send)
+    sender.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    session.close()
+    sender.join(timeout=5)
+    assert time.monotonic() - started < 2.0
+    assert [str(error) for error in errors] == ["Port closed"]
+    assert [job.data for job in done] == [b"slow to write", b"queued"]
+    assert all(str(job.error) == "Port closed" for job in done)
+    assert session.tx_bytes_pending == 0
+    assert session.wait_sent(timeout=0)
+    assert not session.writer_thread.is_alive()
+    with pytest.raises(serial.SerialException):
+        session.send(b"after close")
+
+
+def test_manager_keeps_one_session_per_port():
+    manager = SessionManager(lambda session: None)
+    try:
+        first = manager.open("loop://", 19200)
+        assert manager.open("loop://", 19200) is first
+        assert list(manager.sessions) == ["loop://"]
+    finally:
+        manager.close_all()
+    assert manager.sessions == {}
+    assert not first.running
+
+
+def test_manager_registers_only_opened_sessions(monkeypatch):
+    manager = SessionManager(lambda session: None, port_options={"bytesize": 9})
+    with pytest.raises(ValueError):
+        manager.open("loop://", 19200)
+    assert manager.sessions == {}
+
+    opened = []
+    manager = SessionManager(lambda session: None)
+
+    def fail_after_open(self, port):
+        opened.append(port)
+        raise OSError("cannot read line status")
+
+    monkeypatch.setattr(stats.LinkStats, "record_open", fail_after_open)
+    with pytest.raises(OSError):
+        manager.open("loop://", 19200)
+    assert manager.sessions == {}
+    assert not opened[0].is_open
@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+
+import serial_cli
+import simulator
+from conftest import ROOT, wait_for
+
+
+def test_command_replies(settings, device):
+    session = settings.create_session(device.port_name, lambda session: None)
+    session.open()
+    lines = []
+    try:
+        for command in (b"3:PRD?", b"3:FWV?", b"3:irdev-0A0B0C", b"3:irdev-0A0", b"3:nope"):
+            session.send(command + b"\r\n")
+        assert wait_for(lambda: lines.extend(session.drain()) or len(lines) >= 5)
+    finally:
+        session.close()
+    assert [line.rstrip(b"\r") for line in lines] == [
+        b"PRD:" + simulator.PRODUCT, b"FWV:" + simulator.FIRMWARE, b"IRDEV:OK:3", b"IRDEV:ERR", b"ERR"]
+    assert device.commands == 5
+
+
+def test_cli_answers_the_listening_prompt(tmp_path, device):
+    threading.Timer(0.3, device.prompt).start()
+    output = tmp_path / "out.txt"
+    status = serial_cli.main(["--settings", os.path.join(ROOT, "settings.ini"), "--port", device.port_name,
+                              "--duration", "1", "--output", str(output)])
+    assert status == serial_cli.EXIT_OK
+    assert output.read_text().splitlines() == ["."]
+    assert wait_for(lambda: device.listening_replies == 1)
+    assert not device.listening
+
+
+def test_stream_lines_are_numbered(settings, device):
+    lines = []
+    session = settings.create_session(device.port_name, lambda session: lines.extend(session.drain()))
+    session.open()
+    try:
+        device.start_stream(200000, duration=0.2)
+        device.stream_thread.join()
+        time.sleep(0.2)  # Let the reader catch up with the end of the stream
+    finally:
+        session.close()
+    sequence = [int(line.split(b",")[0]) for line in lines]
+    assert len(sequence) >= 32
+    assert sequence == list(range(len(sequence)))
@@ -0,0 +1,105 @@
+import csv
+import json
+import socket
+import threading
+import time
+
+import stats
+from conftest import wait_for
+from serial_core import FrameSplitter, PortSession
+
+
+def test_counters_and_snapshot_on_loop():
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None)
+    session.open()
+    try:
+        first = session.stats_snapshot()
+        session.send(b"one\ntwo\n")
+        session.send(b"three\n")
+        session.wait_sent()
+        assert wait_for(lambda: session.link_stats.rx_frames == 3)
+        assert len(session.drain()) == 3
+        row = session.stats_snapshot()
+    finally:
+        session.close()
+    assert set(row) == set(stats.FIELDS)
+    assert first["rx_bytes"] == 0
+    assert (row["rx_bytes"], row["tx_bytes"]) == (14, 14)
+    assert session.link_stats.tx_frames == 2
+    assert row["rx_bytes_per_s"] > 0
+    assert row["read_errors"] == row["write_errors"] == 0
+    assert row["framing_errors"] is None  # loop:// has no driver counters
+
+
+def test_line_errors_add_up_across_reconnects(monkeypatch):
+    # Driver counts at each read: open, snapshot, reopen (the adapter counts
+    # from zero again), two snapshots
+    readings = iter([100, 103, 0, 2, 2])
+    monkeypatch.setattr(stats, "read_line_errors",
+                        lambda serial_port: {name: next(readings) if name == "framing_errors" else 0
+                                             for name in stats.LINE_ERRORS})
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None)
+    session.open()
+    try:
+        assert session.stats_snapshot()["framing_errors"] == 3
+        session.link_stats.record_open(session.serial_port)
+        assert session.stats_snapshot()["framing_errors"] == 5
+        assert session.stats_snapshot()["overruns"] == 0
+    finally:
+        session.close()
+
+
+def test_exporter_appends_csv_and_json_lines(tmp_path):
+    row = {field: 0 for field in stats.FIELDS}
+    for name in ("stats.csv", "stats.json"):
+        path = str(tmp_path / name)
+        for _ in range(2):
+            exporter = stats.StatsExporter(path)
+            exporter.write(row)
+            exporter.close()
+        with open(path, newline="", encoding="utf-8") as exported:
+            if name.endswith(".csv"):
+                rows = list(csv.DictReader(exported))
+            else:
+                rows = [json.loads(line) for line in exported]
+        assert len(rows) == 2  # One header only, however often the file is reopened
+        assert list(rows[0]) == stats.FIELDS
+
+
+def test_format_rate():
+    assert stats.format_rate(999) == "999.0 "
+    assert stats.format_rate(1500) == "1.5 k"
+    assert stats.format_rate(2.5e6) == "2.5 M"
+
+
+def test_only_automatic_reopens_count_as_reconnects():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    def serve():
+        for line in (b"first\n", b"second\n"):
+            connection, _address = server.accept()
+            time.sleep(0.2)  # Opening the port flushes whatever arrived first
+            connection.sendall(line)
+            time.sleep(0.1)
+            connection.close()
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    session = PortSession(f"socket://127.0.0.1:{server.getsockname()[1]}", 19200, FrameSplitter(),
+                          lambda session: None, reconnect_delay=0.05)
+    session.open()
+    frames = []
+    try:
+        assert wait_for(lambda: frames.extend(session.drain()) or len(frames) >= 2)
+        assert frames == [b"first", b"second"]
+        assert session.link_stats.reconnects == 1
+    finally:
+        session.close()
+
+    session = PortSession("loop://", 19200, FrameSplitter(), lambda session: None)
+    for _ in range(2):
+        session.open()
+        session.close()
+    assert session.link_stats.reconnects == 0
@@ -0,0 +1,83 @@
+import random
+import re
+
+import pytest
+
+from telemetry import ChannelBuffer, FieldParser, RingBuffer, Telemetry, min_max_decimate
+
+
+def test_ring_buffer_wraps():
+    ring = RingBuffer(5)
+    ring.extend([1, 2, 3])
+    ring.extend([4, 5, 6, 7])
+    ring.append(8)
+    assert list(ring.last()) == [4, 5, 6, 7, 8]
+    assert list(ring.last(2)) == [7, 8]
+    ring.extend(range(100, 112))
+    assert list(ring.last()) == [107, 108, 109, 110, 111]
+
+
+@pytest.mark.parametrize("pattern, frame, expected", [
+    ("", b"12.5,3,-0.25", [12.5, 3.0, -0.25]),
+    ("", b"1e3 .5", [1000.0, 0.5]),
+    ("", b"no numbers", None),
+    (r"T=(\S+) P=(\S+)", b"T=21.5 P=1013", [21.5, 1013.0]),
+    (r"T=(\S+)", b"T=hot", None),
+    (r"T=(\S+)", b"P=1", None),
+])
+def test_field_parser(pattern, frame, expected):
+    assert FieldParser(pattern).parse(frame) == expected
+
+
+def test_field_parser_rejects_bad_pattern():
+    with pytest.raises(re.error):
+        FieldParser("(")
+
+
+def test_channels_stay_aligned():
+    telemetry = Telemetry(FieldParser(), capacity=10)
+    assert telemetry.add([b"1", b"text", b"2"]) == 2
+    assert telemetry.add([b"3,30", b"4"]) == 2
+    assert telemetry.samples == 4
+    assert telemetry.skipped == 1
+    assert [list(channel.last()) for channel in telemetry.channels] == [[1, 2, 3, 4], [0, 0, 30, 30]]
+
+
+def test_min_max_decimate_keeps_spikes():
+    values = [0.0] * 1000
+    values[500] = 9.0
+    values[700] = -9.0
+    points = min_max_decimate(values, 100)
+    assert len(points) == 4 * 100
+    ys = points[1::2]
+    assert max(ys) == 9.0 and min(ys) == -9.0
+    assert min_max_decimate([1.0, 2.0], 100) == [0.0, 1.0, 100.0, 2.0]
+    assert min_max_decimate([], 100) == []
+
+
+def test_decimation_matches_the_samples_shown():
+    rng = random.Random(1)
+    channel = ChannelBuffer(20000)
+    samples = []
+    for _ in range(200):
+        batch = [rng.gauss(0, 1) for _ in range(rng.choice([1, 17, 300, 900]))]
+        channel.extend(batch)
+        samples += batch
+        for shown in (50, 3000, 20000):
+            window = samples[-shown:]
+            points = channel.decimate(shown, 40)
+            values = points[1::2]
+            assert max(values) == max(window) and min(values) == min(window)
+            assert len(points) <= 4 * 40 or len(window) <= 2 * 40
+
+
+def test_batch_larger_than_capacity():
+    channel = ChannelBuffer(1000)
+    channel.extend(range(1005))
+    assert channel.end == 5
+    assert list(channel.last()) == list(range(5, 1005))
+    assert list(channel.samples(5, 1000)) == list(range(5, 1005))
+    channel.extend(range(1005, 3500))
+    assert list(channel.samples(2500, 1000)) == list(range(2500, 3500))
+    values = channel.decimate(1000, 10)[1::2]
+    assert (min(values), max(values)) == (2500, 3499)
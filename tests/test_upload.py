@@ -0,0 +1,76 @@
+import os
+import threading
+
+from upload import BulkUploader
+
+
+def run_upload(settings, device, payload, on_progress=None, **options):
+    # The uploader once finished, with the block numbers it sent in .blocks_sent
+    session = settings.create_session(device.port_name, lambda session: session.drain())
+    blocks_sent = []
+
+    def send_and_record(data):
+        if data.startswith(b"3:BLK "):
+            blocks_sent.append(int(data.split()[1]))
+        return session.send(data, timeout=None)
+
+    uploader = BulkUploader(payload, send_and_record, on_progress, session.connected.is_set,
+                            **{**settings.upload_options(), **options})
+    uploader.blocks_sent = blocks_sent
+    session.frame_listeners.append(uploader.feed_frames)
+    session.open()
+    try:
+        uploader.start()
+        uploader.thread.join(timeout=60)
+    finally:
+        session.close()
+    return uploader
+
+
+def test_upload_completes(settings, device):
+    payload = os.urandom(10000)
+    uploader = run_upload(settings, device, payload, block_size=256, window=4)
+    assert uploader.result == (True, "Uploaded 10000 bytes")
+    assert device.uploaded == [payload]
+    assert uploader.retransmits == 0
+    assert uploader.blocks_sent == list(range(40))
+
+
+def test_bad_blocks_go_back_n(settings, device):
+    device.block_error_rate = 0.1
+    payload = os.urandom(16384)
+    uploader = run_upload(settings, device, payload, block_size=256, window=8, timeout=1.0, retries=10)
+    assert uploader.result[0], uploader.result
+    assert device.uploaded == [payload]
+    assert uploader.naks > 0
+    # Every block in flight behind a rejected one is sent again
+    assert uploader.retransmits >= uploader.naks
+    assert len(uploader.blocks_sent) == 64 + uploader.retransmits
+
+
+def test_stopped_upload_resumes(settings, device):
+    payload = os.urandom(64 * 128)
+    stopped = threading.Event()
+
+    def stop_half_way(uploader):
+        if uploader.acked >= 20 and not stopped.is_set():
+            stopped.set()
+            uploader.stop()
+
+    first = run_upload(settings, device, payload, stop_half_way, block_size=128, window=4)
+    assert not first.result[0]
+    assert device.uploaded == []
+
+    second = run_upload(settings, device, payload, block_size=128, window=4)
+    assert second.result[0], second.result
+    assert second.resumed_from >= 20
+    assert second.blocks_sent == list(range(second.resumed_from, 64))
+    assert device.uploaded == [payload]
+
+
+def test_changed_payload_starts_over(settings, device):
+    first = run_upload(settings, device, b"a" * 1000, block_size=100)
+    second = run_upload(settings, device, b"b" * 1000, block_size=100)
+    assert first.result[0] and second.result[0]
+    assert second.resumed_from == 0
+    assert device.uploaded == [b"a" * 1000, b"b" * 1000]
@@ -0,0 +1,213 @@
+# Reliable bulk upload of large payloads (IR libraries, config blobs,
+# firmware images) over the command link.
+#
+# Every message is one CR LF terminated ASCII line, so blocks pass XON/XOFF
+# flow control and the line framing of the receive path unchanged:
+#   host   3:UPL <size> <block_size> <crc32>   start a transfer, or resume it
+#   device UPL:OK <block>                      first block the device still needs
+#   device UPL:ERR <reason>
+#   host   3:BLK <block> <HEX> <crc32>         one block; crc32 of the raw bytes
+#   device ACK:<block>                         blocks up to and including <block> are stored
+#   device NAK:<block>                         <block> failed its checksum
+#   host   3:END <crc32>                       every block is acknowledged
+#   device END:OK / END:ERR                    checksum of the whole payload
+# Up to window blocks are in flight, so the link does not idle while an ACK
+# is on its way back. A NAK or a timeout resends everything from the oldest
+# unacknowledged block (go-back-N). The device keeps the blocks it stored for
+# a given size and crc32, so after a lost port, a stop or an application
+# restart the next 3:UPL of the same payload continues where it left off.
+import queue
+import threading
+import time
+import zlib
+
+REPLY_PREFIXES = (b"ACK:", b"NAK:", b"UPL:", b"END:")
+
+
+def block_line(index, data):
+    return b"3:BLK %d %s %08X\r\n" % (index, data.hex().upper().encode(), zlib.crc32(data))
+
+
+class BulkUploader:
+    # Runs on its own thread. send(data) may block while the outgoing queue
+    # is full, but must not wait for the data to be written. feed_frames() is
+    # meant to be registered as a PortSession frame listener. link_up()
+    # reports whether the port is connected; timeouts are not counted while
+    # it is down, and the transfer is renegotiated once it is back.
+    # on_progress(uploader) is called from the uploader thread after each
+    # acknowledgement and on every state change.
+    def __init__(self, payload, send, on_progress=None, link_up=None, block_size=256, window=4, timeout=2.0,
+                 retries=5):
+        self.payload = payload
+        self.send = send
+        self.on_progress = on_progress or (lambda uploader: None)
+        self.link_up = link_up or (lambda: True)
+        self.block_size = block_size
+        self.window = max(1, window)
+        self.timeout = timeout
+        self.retries = retries
+        self.total_blocks = max(1, -(-len(payload) // block_size))
+        self.crc = zlib.crc32(payload)
+        self.replies = queue.Queue()
+        self.stop_requested = False
+        self.link_lost = False
+
+        self.acked = 0  # Blocks the device has stored
+        self.resumed_from = 0  # Blocks the device already had when this run started
+        self.sent_blocks = 0
+        self.retransmits = 0
+        self.naks = 0
+        self.started_at = None
+        self.state = "Idle"
+        self.result = None  # (passed, message) once finished
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="upload", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_requested = True
+        self.replies.put(("STOP", None))
+
+    def feed_frames(self, frames):
+        if self.thread is None or self.result is not None:
+            return
+        for frame in frames:
+            line = frame.strip()
+            if line[:4] not in REPLY_PREFIXES:
+                continue
+            kind, _, value = line.partition(b":")
+            self.replies.put((kind.decode("ascii"), value))
+
+    @property
+    def bytes_acked(self):
+        return min(len(self.payload), self.acked * self.block_size)
+
+    @property
+    def throughput(self):
+        # Payload bytes per second acknowledged by this run
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return (self.bytes_acked - min(len(self.payload), self.resumed_from * self.block_size)) / elapsed
+
+    def block(self, index):
+        return self.payload[index * self.block_size:(index + 1) * self.block_size]
+
+    def set_state(self, state):
+        self.state = state
+        self.on_progress(self)
+
+    def wait_reply(self, kinds):
+        # The next reply of one of kinds as (kind, value), or None on timeout.
+        # Waits as long as it takes while the link is down.
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                kind, value = self.replies.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                if not self.link_up():
+                    self.link_lost = True
+                    deadline = time.monotonic() + self.timeout
+                    continue
+                return None
+            if kind == "STOP":
+                return None
+            if kind in kinds:
+                return kind, value
+
+    def handshake(self):
+        # First block the device still needs, or None
+        request = b"3:UPL %d %d %08X\r\n" % (len(self.payload), self.block_size, self.crc)
+        for _attempt in range(self.retries + 1):
+            if self.stop_requested:
+                return None
+            self.set_state("Connecting")
+            self.send(request)
+            reply = self.wait_reply(("UPL",))
+            if reply is None:
+                continue
+            status, _, value = reply[1].partition(b" ")
+            if status != b"OK":
+                raise ValueError(f"device refused the upload: {value.decode('ascii', 'replace')}")
+            return min(int(value or 0), self.total_blocks)
+        return None
+
+    def run(self):
+        try:
+            start_block = self.handshake()
+            if start_block is None:
+                return self.finish(False, "Stopped" if self.stop_requested else "No answer to the upload request")
+            self.acked = self.resumed_from = start_block
+            self.started_at = time.monotonic()
+            if not self.transfer():
+                if self.stop_requested:
+                    return self.finish(False, f"Stopped at block {self.acked}; start again to resume")
+                return self.finish(False, f"No acknowledgement after block {self.acked}; start again to resume")
+            self.set_state("Verifying")
+            for _attempt in range(self.retries + 1):
+                self.send(b"3:END %08X\r\n" % self.crc)
+                reply = self.wait_reply(("END",))
+                if self.stop_requested:
+                    return self.finish(False, "Stopped")
+                if reply is not None:
+                    if reply[1] == b"OK":
+                        return self.finish(True, f"Uploaded {len(self.payload)} bytes")
+                    return self.finish(False, "Device reported a checksum mismatch")
+            return self.finish(False, "No answer to the end of upload")
+        except Exception as error:  # Report, don't kill the thread silently
+            return self.finish(False, f"Error: {error}")
+
+    def transfer(self):
+        next_block = self.acked
+        failures = 0
+        self.set_state("Uploading")
+        while self.acked < self.total_blocks:
+            if self.stop_requested:
+                return False
+            while next_block < self.total_blocks and next_block < self.acked + self.window:
+                if next_block < self.sent_blocks:
+                    self.retransmits += 1
+                self.send(block_line(next_block, self.block(next_block)))
+                next_block += 1
+                self.sent_blocks = max(self.sent_blocks, next_block)
+            reply = self.wait_reply(("ACK", "NAK", "UPL"))
+            if self.stop_requested:
+                return False
+            if self.link_lost:
+                # The port was reopened; the device may have been reset, so ask again
+                self.link_lost = False
+                start_block = self.handshake()
+                if start_block is None:
+                    return False
+                self.acked = next_block = start_block
+                failures = 0
+                self.set_state("Uploading")
+                continue
+            if reply is None:
+                failures += 1
+                if failures > self.retries:
+                    return False
+                next_block = self.acked  # Go back to the oldest unacknowledged block
+                continue
+            kind, value = reply
+            if kind == "UPL" or not value.isdigit():
+                continue  # Late answer to a repeated request, or line noise
+            block = int(value)
+            if kind == "ACK" and block >= self.acked:
+                self.acked = block + 1
+                failures = 0
+                self.on_progress(self)
+            elif kind == "NAK" and block >= self.acked:
+                self.naks += 1
+                self.acked = block
+                next_block = block
+        return True
+
+    def finish(self, passed, message):
+        self.result = (passed, message)
+        self.set_state("Done" if passed else "Failed")
+        return self.result